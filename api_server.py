@@ -1,17 +1,27 @@
 """
 FastAPIサーバー - EV充電器データ収集API
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import subprocess
 import sys
-import os
+import io
+import json
 import logging
 import asyncio
+import contextvars
 import threading
-import queue
+import time
+import uuid
+
+import ev_scraper
+import gogoev_fetch
+import gogoev_metrics
+from gogoev_geocode_cache import get_geocode_cache, normalize_address
+from gogoev_publish import PublishedJson, etag_matches
+from gogoev_storage import get_storage
+from gogoev_station_index import STATION_DATA_PATH, StaleCursorError, get_station_index
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +29,13 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="EV Charger Data Collection API")
 
+MAX_JOB_HISTORY = 20  # 状態を保持するスクレイピングジョブの件数
+SSE_HEARTBEAT_SEC = 5.0  # 出力がない間にSSEのハートビートを送る間隔（秒）
+MAX_GEOCODE_BATCH = 1000  # /geocode/batch で1回に受け付ける住所の数
+GEOCODE_BATCH_CONCURRENCY = 2  # /geocode/batch で同時に問い合わせる数（間隔は gogoev_fetch の上限で制御）
+# /data.json はキャッシュさせたうえで毎回 ETag で更新を確認させる（変更がなければ 304）
+DATA_CACHE_CONTROL = "no-cache"
+
 # CORS設定（Reactからのアクセスを許可）
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Job-Id"],  # /run-scrape のジョブIDを読めるようにする
 )
 
 @app.get("/")
@@ -33,165 +51,320 @@ def read_root():
     """ルートエンドポイント"""
     return {"message": "EV Charger Data Collection API", "status": "running"}
 
-def run_scraper_process(output_queue):
-    """スクレイピングプロセスを実行し、出力をキューに送信"""
-    try:
-        script_path = os.path.join(os.path.dirname(__file__), "ev_scraper.py")
-        logger.info(f"スクレイピングスクリプトを実行します: {script_path}")
-        
-        # Windows環境でのエンコーディングを取得
-        import locale
-        system_encoding = locale.getpreferredencoding() or 'utf-8'
-        
-        # プロセスを開始
-        process = subprocess.Popen(
-            [sys.executable, "-u", script_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=False,  # バイナリモードで読み取る
-            bufsize=0,  # バッファリングなし（バイナリモードでは行バッファリングはサポートされていない）
-            cwd=os.path.dirname(__file__)
-        )
-        
-        # リアルタイムで出力を読み取る
-        logger.info("プロセスの出力を読み取り開始")
-        line_count = 0
-        for line_bytes in iter(process.stdout.readline, b''):
-            if line_bytes:
-                line_count += 1
-                # 複数のエンコーディングを試す
-                line_decoded = None
-                for encoding in ['utf-8', system_encoding, 'cp932', 'shift_jis']:
-                    try:
-                        line_decoded = line_bytes.decode(encoding)
-                        break
-                    except (UnicodeDecodeError, LookupError):
-                        continue
-                
-                # すべて失敗した場合はエラー処理付きでデコード
-                if line_decoded is None:
-                    try:
-                        line_decoded = line_bytes.decode('utf-8', errors='replace')
-                    except Exception:
-                        line_decoded = str(line_bytes)
-                
-                if line_decoded:
-                    cleaned_line = line_decoded.rstrip()
-                    if cleaned_line:  # 空行でない場合のみキューに追加
-                        logger.debug(f"出力行 {line_count}: {cleaned_line[:50]}")
-                        output_queue.put(('output', cleaned_line))
-        
-        logger.info(f"プロセスの出力読み取り完了。合計 {line_count} 行を処理しました。")
-        
-        process.wait()
-        return_code = process.returncode
-        
-        if return_code == 0:
-            output_queue.put(('success', 'スクレイピングが正常に完了しました'))
-        else:
-            output_queue.put(('error', f'スクレイピングがエラーで終了しました (リターンコード: {return_code})'))
-        
-        output_queue.put(('done', str(return_code)))
-    except Exception as e:
-        import traceback
-        error_msg = f'エラーが発生しました: {str(e)}\n{traceback.format_exc()}'
-        logger.error(error_msg)
-        output_queue.put(('error', error_msg))
-        output_queue.put(('done', '1'))
+class ScrapeJob:
+    """スクレイピングの実行1回分（ジョブ）
+
+    ev_scraper.main() の出力を1行ずつ lines に記録し、ステータス取得で参照する。
+    SSE の接続ごとに subscribe() で asyncio.Queue を登録すると、スクレイパーのスレッドから
+    loop.call_soon_threadsafe で出力行がキューに送られる（イベントループを止めずに待てる）。
+    """
+
+    def __init__(self, resume=False):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.resume = resume
+        self.status = 'running'  # running / succeeded / failed / cancelled
+        self.started_at = time.time()
+        self.finished_at = None
+        self.result_count = None
+        self.error = None
+        self.lines = []
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self._subscribers = []  # (イベントループ, asyncio.Queue) の組
+        self._lock = threading.Lock()
+
+    def _publish(self, message):
+        """登録済みのキューにメッセージを送る（呼び出し元のスレッドから各イベントループへ渡す）"""
+        for loop, output_queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(output_queue.put_nowait, message)
+            except RuntimeError:  # イベントループが終了済み
+                pass
+
+    def append_line(self, line):
+        with self._lock:
+            self.lines.append(line)
+            self._publish(('output', line))
+
+    def subscribe(self):
+        """出力を受け取る asyncio.Queue を登録して返す（イベントループのスレッドから呼ぶ）
+
+        キューには登録時点までの出力が入っており、以降の出力と終了通知（'done'）が送られる。
+        """
+        output_queue = asyncio.Queue()
+        with self._lock:
+            for line in self.lines:
+                output_queue.put_nowait(('output', line))
+            if self.done_event.is_set():
+                output_queue.put_nowait(('done', self.status))
+            else:
+                self._subscribers.append((asyncio.get_running_loop(), output_queue))
+        return output_queue
+
+    def unsubscribe(self, output_queue):
+        with self._lock:
+            self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not output_queue]
+
+    def finish(self, status, result_count=None, error=None):
+        with self._lock:
+            self.status = status
+            self.result_count = result_count
+            self.error = error
+            self.finished_at = time.time()
+            self.done_event.set()
+            self._publish(('done', status))
+            self._subscribers = []
+
+    def to_dict(self):
+        with self._lock:
+            line_count = len(self.lines)
+            last_line = self.lines[-1] if self.lines else None
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "resume": self.resume,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result_count": self.result_count,
+            "error": self.error,
+            "cancel_requested": self.cancel_event.is_set(),
+            "line_count": line_count,
+            "last_line": last_line,
+        }
+
+
+# 実行中のスクレイピングジョブ（ジョブのスレッドと、そこから ev_scraper.in_caller_context で
+# 引き継いだスレッドでだけ設定される）
+current_job = contextvars.ContextVar('current_job', default=None)
+
+
+class JobOutput(io.TextIOBase):
+    """標準出力・標準エラーへの書き込みを元のストリームに送り、ジョブの処理中の書き込みはジョブの出力にも送る
+
+    同時に処理している /geocode などのリクエストの出力（gogoev_fetch のリトライ表示など）は
+    current_job が設定されていないため、ジョブの出力には入らない。
+    """
+
+    def __init__(self, job, stream):
+        self.job = job
+        self.stream = stream
+        self._buffer = ''
+        self._lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.stream.write(text)
+        if current_job.get() is not self.job:
+            return len(text)
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            line = line.rstrip()
+            if line:  # 空行は送らない
+                self.job.append_line(line)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ScrapeJobManager:
+    """スクレイピングジョブの管理（同時に実行するジョブは1つだけ）
+
+    実行中に新しい実行を要求された場合は、新しいジョブを作らず実行中のジョブを返す（single-flight）。
+    スクレイパーはサーバーのプロセス内のスレッドで実行するため、インタプリタの起動や
+    pandas・bs4 の読み込みは不要で、HTTPセッション・キャッシュもサーバーと共有する。
+    """
+
+    def __init__(self, max_history=MAX_JOB_HISTORY):
+        self.max_history = max_history
+        self.jobs = {}  # ジョブID → ScrapeJob（古い順）
+        self.current = None
+        self._lock = threading.Lock()
+
+    def start(self, resume=False):
+        """ジョブを開始し (ジョブ, 新しく開始したか) を返す（実行中のジョブがあればそれを返す）"""
+        with self._lock:
+            if self.current is not None and self.current.status == 'running':
+                return self.current, False
+            job = ScrapeJob(resume=resume)
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.max_history:
+                del self.jobs[next(iter(self.jobs))]
+            self.current = job
+        thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+        thread.start()
+        return job, True
+
+    def _run(self, job):
+        logger.info(f"スクレイピングジョブを開始します: {job.job_id}")
+        stdout, stderr = sys.stdout, sys.stderr
+        # 同時に実行するジョブは1つのため、実行中はプロセスの標準出力・標準エラーを差し替え、
+        # このスレッド（と ev_scraper が引き継いだスレッド）の出力だけをジョブに送る
+        sys.stdout = JobOutput(job, stdout)
+        sys.stderr = JobOutput(job, stderr)
+        token = current_job.set(job)
+        try:
+            data = ev_scraper.main(resume=job.resume, cancel_event=job.cancel_event)
+            job.finish('succeeded', result_count=len(data))
+        except ev_scraper.ScrapeCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            job.finish('failed', error=str(e))
+        finally:
+            current_job.reset(token)
+            sys.stdout, sys.stderr = stdout, stderr
+            logger.info(f"スクレイピングジョブが終了しました: {job.job_id} ({job.status})")
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """実行中のジョブに中止を要求する（次のページ・施設の取得前に中止される）"""
+        job = self.get(job_id)
+        if job is not None and job.status == 'running':
+            job.cancel_event.set()
+        return job
+
+
+job_manager = ScrapeJobManager()
+published_data = PublishedJson(STATION_DATA_PATH)
+
+# ジョブ終了時に送るメッセージ
+JOB_RESULT_MESSAGES = {
+    'succeeded': 'スクレイピングが正常に完了しました',
+    'cancelled': 'スクレイピングが中止されました（resume=true で再開できます）',
+}
 
 @app.post("/run-scrape")
-async def run_scrape():
-    """スクレイピングを実行するエンドポイント（SSEでリアルタイム進捗を送信）"""
+async def run_scrape(resume: bool = False):
+    """スクレイピングを実行するエンドポイント（SSEでリアルタイム進捗を送信）
+
+    実行中のジョブがある場合は新しく実行せず、そのジョブの出力（開始時からの全行）を送信する。
+    resume=true の場合は前回中断した実行のチェックポイントから再開する。
+    """
+    job, started = job_manager.start(resume=resume)
+
     async def event_generator():
-        output_queue = queue.Queue()
-        
-        # 最初のメッセージを送信
-        yield "data: スクレイピングを開始します...\n\n"
-        
-        # バックグラウンドスレッドでスクレイピングを実行
-        thread = threading.Thread(target=run_scraper_process, args=(output_queue,))
-        thread.daemon = True
-        thread.start()
-        
+        if started:
+            yield f"data: スクレイピングを開始します...（ジョブID: {job.job_id}）\n\n"
+        else:
+            yield f"data: 実行中のスクレイピングに合流します...（ジョブID: {job.job_id}）\n\n"
+
+        output_queue = job.subscribe()
         try:
-            empty_count = 0
             while True:
                 try:
-                    # キューからメッセージを取得（タイムアウト付き）
-                    message_type, message = output_queue.get(timeout=0.5)
-                    empty_count = 0
-                    
-                    logger.info(f"メッセージ受信: {message_type} - {message[:50]}")
-                    
-                    if message_type == 'done':
-                        # 完了メッセージを送信
-                        yield f"data: {message}\n\n"
-                        break
-                    elif message_type == 'success':
-                        # 成功メッセージを送信
-                        yield f"data: {message}\n\n"
-                    elif message_type == 'error':
-                        # エラーメッセージを送信
-                        yield f"data: エラー: {message}\n\n"
-                    else:
-                        # 進捗メッセージを送信
-                        yield f"data: {message}\n\n"
-                except queue.Empty:
-                    empty_count += 1
-                    # タイムアウト時はハートビートを送信（最初の数回のみ）
-                    if empty_count <= 3:
-                        yield ": heartbeat\n\n"
-                    
-                    # スレッドが終了しているか確認
-                    if not thread.is_alive():
-                        logger.info("スレッドが終了しました。残りのメッセージを確認します...")
-                        # スレッドが終了しているが、doneメッセージが来ていない場合
-                        # 最後のメッセージを待つ
-                        try:
-                            message_type, message = output_queue.get(timeout=0.5)
-                            logger.info(f"最後のメッセージ: {message_type} - {message[:50]}")
-                            if message_type == 'done':
-                                yield f"data: {message}\n\n"
-                            break
-                        except queue.Empty:
-                            logger.info("キューが空です。終了します。")
-                            break
+                    message_type, message = await asyncio.wait_for(output_queue.get(), timeout=SSE_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    # 出力がない間はハートビートを送信
+                    yield ": heartbeat\n\n"
                     continue
+                if message_type == 'done':
+                    break
+                yield f"data: {message}\n\n"
+
+            if job.status == 'failed':
+                yield f"data: エラー: スクレイピングがエラーで終了しました: {job.error}\n\n"
+            else:
+                yield f"data: {JOB_RESULT_MESSAGES[job.status]}\n\n"
+            yield f"data: {0 if job.status == 'succeeded' else 1}\n\n"
         except Exception as e:
             logger.error(f"イベントジェネレーターエラー: {str(e)}")
             yield f"data: エラー: {str(e)}\n\n"
         finally:
-            # スレッドの終了を待つ
-            thread.join(timeout=5)
-            logger.info("イベントジェネレーター終了")
-    
+            # クライアントが切断した場合もキューの登録を解除する（ジョブは実行を続ける）
+            job.unsubscribe(output_queue)
+
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
+            "X-Accel-Buffering": "no",
+            "X-Job-Id": job.job_id,
         }
     )
 
+@app.get("/jobs")
+def list_jobs():
+    """最近のスクレイピングジョブの一覧"""
+    return {"jobs": [job.to_dict() for job in reversed(job_manager.list())]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """スクレイピングジョブの状態"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "ジョブが見つかりません"})
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """実行中のスクレイピングジョブを中止する"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "ジョブが見つかりません"})
+    return job.to_dict()
+
 @app.get("/health")
 def health_check():
     """ヘルスチェックエンドポイント"""
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics():
+    """取得・解析・ジオコーディング・分類の計測値（Prometheus のテキスト形式）
+
+    スクレイピングジョブはこのプロセス内で実行されるため、ジョブの計測値も含まれる。
+    """
+    return Response(content=gogoev_metrics.render(), media_type=gogoev_metrics.CONTENT_TYPE)
+
 class GeocodeRequest(BaseModel):
     address: str
 
-@app.post("/geocode")
-async def geocode_address(request: GeocodeRequest):
-    """住所を緯度・経度に変換するエンドポイント"""
+class GeocodeBatchRequest(BaseModel):
+    addresses: list[str]
+
+def cached_geocode_result(address, cached):
+    """キャッシュの値を /geocode のレスポンス形式にする"""
+    if cached["lat"] is None:
+        return {
+            "success": False,
+            "error": "住所が見つかりませんでした"
+        }
+    return {
+        "success": True,
+        "lat": cached["lat"],
+        "lon": cached["lon"],
+        "display_name": cached["display_name"] or address
+    }
+
+def resolve_address(address):
+    """住所を緯度・経度に変換する（キャッシュになければ Nominatim に問い合わせてキャッシュする）
+
+    Nominatim へのリクエスト間隔は gogoev_fetch で 1件/秒 に制限され待機が発生するため、
+    イベントループのスレッドからは呼ばない（スレッドプールで実行する）。
+    """
     try:
-        import requests as req
+        cache = get_geocode_cache()
+        cached = cache.get(address)
+        if cached is not None:
+            return cached_geocode_result(address, cached)
+        
         # OpenStreetMap Nominatim APIを使用（無料）
         url = "https://nominatim.openstreetmap.org/search"
         params = {
-            "q": request.address,
+            "q": address,
             "format": "json",
             "limit": 1,
             "countrycodes": "jp"  # 日本に限定
@@ -200,19 +373,27 @@ async def geocode_address(request: GeocodeRequest):
             "User-Agent": "EV-Charger-Dashboard/1.0"
         }
         
-        response = req.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
+        response = gogoev_fetch.get_page(url, params=params, headers=headers)
+        if not response:
+            return {
+                "success": False,
+                "error": "ジオコーディングAPIへのリクエストに失敗しました"
+            }
         
         data = response.json()
         if data and len(data) > 0:
             result = data[0]
+            lat, lon = float(result["lat"]), float(result["lon"])
+            display_name = result.get("display_name", address)
+            cache.put(address, lat, lon, display_name)
             return {
                 "success": True,
-                "lat": float(result["lat"]),
-                "lon": float(result["lon"]),
-                "display_name": result.get("display_name", request.address)
+                "lat": lat,
+                "lon": lon,
+                "display_name": display_name
             }
         else:
+            cache.put(address, None, None)
             return {
                 "success": False,
                 "error": "住所が見つかりませんでした"
@@ -224,6 +405,163 @@ async def geocode_address(request: GeocodeRequest):
             "error": str(e)
         }
 
+@app.post("/geocode")
+def geocode_address(request: GeocodeRequest):
+    """住所を緯度・経度に変換するエンドポイント（スクレイパーと共有の永続キャッシュ付き）
+
+    同期関数としてスレッドプールで実行し、Nominatim の待機中もイベントループを止めない。
+    """
+    return resolve_address(request.address)
+
+@app.post("/geocode/batch")
+async def geocode_batch(request: GeocodeBatchRequest):
+    """複数の住所をまとめて緯度・経度に変換するエンドポイント（NDJSONで結果を順次送信）
+
+    同じ住所（正規化後に一致するものを含む）は1回だけ変換する。キャッシュにある住所の結果を
+    最初にまとめて送り、キャッシュにない住所はスレッドプールで Nominatim に問い合わせ
+    （gogoev_fetch の接続プール・1件/秒の上限を使用）、変換できた順に送る。
+    1行は {"address": 住所, "cached": キャッシュの結果か, ...}（以降は /geocode と同じ形式）。
+    住所（重複を除く）が MAX_GEOCODE_BATCH 件を超える場合は 413 を返す（クライアントは分割して送る）。
+    """
+    addresses = list(dict.fromkeys(request.addresses))
+    if len(addresses) > MAX_GEOCODE_BATCH:
+        return JSONResponse(status_code=413, content={
+            "error": f"住所が多すぎます（{len(addresses)}件）。{MAX_GEOCODE_BATCH}件ずつ分割して送ってください",
+            "max_addresses": MAX_GEOCODE_BATCH,
+        })
+    groups = {}  # 正規化した住所 → 元の住所のリスト
+    for address in addresses:
+        groups.setdefault(normalize_address(address), []).append(address)
+
+    def lookup_cache():
+        cache = get_geocode_cache()
+        return {key: cache.get(group[0]) for key, group in groups.items() if key}
+
+    def lines_for(group, result, cached):
+        return ''.join(
+            json.dumps({"address": address, "cached": cached, **result}, ensure_ascii=False) + "\n"
+            for address in group
+        )
+
+    async def result_generator():
+        # キャッシュの参照（SQLite）もイベントループの外で行う
+        cached_results = await asyncio.to_thread(lookup_cache)
+        misses = []
+        for key, group in groups.items():
+            cached = cached_results.get(key)
+            if not key:
+                yield lines_for(group, {"success": False, "error": "住所が空です"}, False)
+            elif cached is not None:
+                yield lines_for(group, cached_geocode_result(group[0], cached), True)
+            else:
+                misses.append(group)
+
+        semaphore = asyncio.Semaphore(GEOCODE_BATCH_CONCURRENCY)
+
+        async def resolve(group):
+            async with semaphore:
+                return group, await asyncio.to_thread(resolve_address, group[0])
+
+        tasks = [asyncio.create_task(resolve(group)) for group in misses]
+        try:
+            for task in asyncio.as_completed(tasks):
+                group, result = await task
+                yield lines_for(group, result, False)
+        finally:
+            # クライアントが切断した場合は未着手の問い合わせを取り消す
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        result_generator(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/stations")
+def list_stations(
+    status_type: str | None = Query(None, alias="type", description="種別（故障 / メンテナンス）"),
+    prefecture: str | None = Query(None, description="都道府県（例: 東京都）"),
+    q: str | None = Query(None, description="施設名・住所・都道府県に含まれる文字列"),
+    bbox: str | None = Query(None, description="表示範囲: 最小経度,最小緯度,最大経度,最大緯度"),
+    cursor: str | None = Query(None, description="前回のレスポンスの next_cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str | None = Query(None, description="返す列（カンマ区切り、例: 施設名,住所,緯度,経度）"),
+):
+    """充電スポット一覧（data.json）を絞り込んで返すエンドポイント
+
+    data.json は列ごとのインデックス（gogoev_station_index）として保持し、更新されると次の検索で読み込み直す。
+    結果が limit 件を超える場合は next_cursor を cursor に渡すと続きを取得できる。
+    """
+    try:
+        box = None
+        if bbox:
+            box = [float(value) for value in bbox.split(",")]
+            if len(box) != 4:
+                raise ValueError("bbox は 最小経度,最小緯度,最大経度,最大緯度 の4つの数値で指定してください")
+        return get_station_index().query(
+            status_type=status_type,
+            prefecture=prefecture,
+            q=q,
+            bbox=box,
+            cursor=cursor,
+            limit=limit,
+            fields=[field for field in fields.split(",") if field] if fields else None,
+        )
+    except StaleCursorError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+@app.get("/stations/changes")
+def list_station_changes(
+    since: int = Query(0, ge=0, description="前回取得した最新の version（初回は 0）"),
+    limit: int = Query(100, ge=1, le=1000, description="返す変更セットの最大数"),
+):
+    """故障・メンテナンス情報の差分を返すエンドポイント
+
+    スクレイピングごとに前回の出力と比べた差分（added / updated / resolved）を変更セットとして保存しており、
+    version が since より大きい変更セットだけを古い順に返す。レスポンスの next_since を次の since に渡す
+    （has_more が true の場合は続きの変更セットがある）。
+    """
+    storage = get_storage()
+    latest_version = storage.latest_change_version()
+    if since > latest_version:
+        return JSONResponse(status_code=409, content={
+            "error": "指定された version がありません（データベースが作り直された可能性があります）。since=0 から取得し直してください",
+            "latest_version": latest_version,
+        })
+    changesets = storage.read_station_changes(since=since, limit=limit)
+    next_since = changesets[-1]["version"] if changesets else since
+    return {
+        "since": since,
+        "next_since": next_since,
+        "latest_version": latest_version,
+        "has_more": next_since < latest_version,
+        "changesets": changesets,
+    }
+
+@app.get("/data.json")
+def get_data_json(request: Request):
+    """ダッシュボード用の data.json を配信するエンドポイント
+
+    内容のハッシュを ETag とし、If-None-Match が一致すれば 304（本文なし）を返す。
+    Accept-Encoding に合わせて、スクレイパーが書き出した brotli・gzip 圧縮版を返す。
+    """
+    if not published_data.refresh():
+        return JSONResponse(status_code=404, content={"error": "data.json がありません。スクレイピングを実行してください"})
+    body, encoding, etag = published_data.get(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": DATA_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
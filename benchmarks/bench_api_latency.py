@@ -0,0 +1,161 @@
+"""
+スクレイピング実行中のAPI応答時間の負荷テスト
+api_server を別スレッドの uvicorn で起動し、複数のクライアントが /run-scrape の進捗（SSE）を
+受信している間に /health と /geocode（キャッシュ済みの住所）へ繰り返しリクエストして応答時間を測る。
+スクレイパーは ev_scraper.main の代わりに、出力と解析相当の処理を一定間隔で行う疑似スクレイパーを使う
+（サイトへのアクセスやデータファイルの書き換えは行わない）。
+
+使い方:
+    python benchmarks/bench_api_latency.py
+    python benchmarks/bench_api_latency.py --clients 20 --lines 2000 --max-p95-ms 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+import uvicorn
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import api_server  # noqa: E402
+import ev_scraper  # noqa: E402
+from gogoev_geocode_cache import GeocodeCache  # noqa: E402
+
+CACHED_ADDRESS = '東京都千代田区丸の内1-9-1'
+
+
+def fake_scrape(lines, interval):
+    """ev_scraper.main の代わりに、出力と解析相当のCPU処理を繰り返す疑似スクレイパー"""
+    def main(resume=False, cancel_event=None):
+        for i in range(1, lines + 1):
+            ev_scraper.check_cancelled(cancel_event)
+            sum(range(2000))  # 1ページ分の解析に相当する処理
+            print(f"[{i}/{lines}] 施設{i} の詳細情報を取得中...")
+            time.sleep(interval)
+        return [{}] * lines
+    return main
+
+
+def start_server(port):
+    config = uvicorn.Config(api_server.app, host='127.0.0.1', port=port, log_level='warning')
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f'APIサーバーを起動できませんでした（ポート {port}）')
+        time.sleep(0.05)
+    return server, thread
+
+
+def sample_latencies(base_url, stop_event, interval=0.02):
+    """stop_event がセットされるまで /health と /geocode を交互に呼び、応答時間（ミリ秒）を返す"""
+    latencies = {'/health': [], '/geocode': []}
+    session = requests.Session()
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        session.get(f'{base_url}/health', timeout=10).raise_for_status()
+        latencies['/health'].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        response = session.post(f'{base_url}/geocode', json={'address': CACHED_ADDRESS}, timeout=10)
+        assert response.json()['success'], response.text
+        latencies['/geocode'].append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def stream_progress(base_url, results):
+    """/run-scrape の進捗を最後まで受信し、(受信行数, 最初の行までの秒数, 全体の秒数) を記録する"""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    with requests.post(f'{base_url}/run-scrape', stream=True, timeout=600) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith('data: '):
+                count += 1
+                if first is None:
+                    first = time.perf_counter() - start
+    results.append((count, first, time.perf_counter() - start))
+
+
+def summarize(name, values):
+    values = sorted(values)
+    p95 = values[int(len(values) * 0.95) - 1] if len(values) >= 20 else values[-1]
+    print(f"  {name:10s} {len(values):5d}回  p50 {statistics.median(values):6.1f}ms  "
+          f"p95 {p95:6.1f}ms  最大 {values[-1]:6.1f}ms")
+    return p95
+
+
+def measure(base_url, duration=None, clients=0):
+    stop_event = threading.Event()
+    latencies = {}
+    sampler = threading.Thread(target=lambda: latencies.update(sample_latencies(base_url, stop_event)))
+    sampler.start()
+    results = []
+    streams = [threading.Thread(target=stream_progress, args=(base_url, results)) for _ in range(clients)]
+    for thread in streams:
+        thread.start()
+    if duration:
+        time.sleep(duration)
+    for thread in streams:
+        thread.join()
+    stop_event.set()
+    sampler.join()
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='スクレイピング実行中のAPI応答時間の負荷テスト')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--clients', type=int, default=10, help='進捗（SSE）を受信するクライアント数')
+    parser.add_argument('--lines', type=int, default=1000, help='疑似スクレイパーの出力行数')
+    parser.add_argument('--interval', type=float, default=0.005, help='疑似スクレイパーの出力間隔（秒）')
+    parser.add_argument('--max-p95-ms', type=float, default=100.0,
+                        help='スクレイピング中の応答時間 p95 の上限（超えた場合は終了コード1）')
+    args = parser.parse_args()
+
+    # 疑似スクレイパーと、テスト用の住所を登録した一時的なジオコーディングキャッシュを使う
+    ev_scraper.main = fake_scrape(args.lines, args.interval)
+    cache_path = os.path.join(ROOT_DIR, 'DB', f'bench_geocode_cache_{os.getpid()}.sqlite3')
+    cache = GeocodeCache(cache_path)
+    cache.put(CACHED_ADDRESS, 35.681, 139.767, CACHED_ADDRESS)
+    api_server.get_geocode_cache = lambda: cache
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    server, thread = start_server(args.port)
+    try:
+        print('スクレイピングなし:')
+        idle, _ = measure(base_url, duration=2.0)
+        for name, values in idle.items():
+            summarize(name, values)
+
+        print(f'スクレイピング中（進捗の受信 {args.clients}クライアント、{args.lines}行）:')
+        busy, results = measure(base_url, clients=args.clients)
+        worst = max(summarize(name, values) for name, values in busy.items())
+        counts = {count for count, _, _ in results}
+        print(f"  進捗: 受信行数 {sorted(counts)}  最初の行まで 最大 {max(r[1] for r in results) * 1000:.1f}ms  "
+              f"完了まで 最大 {max(r[2] for r in results):.2f}秒")
+        jobs = api_server.job_manager.list()
+        print(f"  ジョブ数: {len(jobs)}（{', '.join(job.status for job in jobs)}）")
+    finally:
+        server.should_exit = True
+        thread.join()
+        cache.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+
+    if worst > args.max_p95_ms:
+        print(f"NG: スクレイピング中の応答時間 p95 が上限 {args.max_p95_ms:.0f}ms を超えました")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+詳細ページ抽出処理のベンチマーク
+1回走査の ev_scraper.parse_detail_page と、変更前の複数回走査の実装を同じページで比較し、
+1ページあたりの解析時間と抽出結果が一致するかを表示する。
+
+使い方:
+    python benchmarks/bench_detail.py                      # benchmarks/fixtures の詳細ページを使用
+    python benchmarks/bench_detail.py --archive DB/http_archive.jsonl.gz
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from urllib.parse import urlsplit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import ev_scraper  # noqa: E402
+import gogoev_parser  # noqa: E402
+from gogoev_archive import iter_archive  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# アーカイブ中の一覧・口コミ・利用記録ページ（これ以外の ev.gogo.gs のページを詳細ページとして扱う）
+NON_DETAIL_URL_PATTERN = re.compile(r'accident|maintenance|review|using')
+
+
+def legacy_parse_detail_page(content, detail_url=''):
+    """変更前の詳細ページ抽出処理（文書を複数回走査する）"""
+    detail_info = {
+        'address': '',
+        'charge_type': '',
+        'output': '',
+        'charger_count': '',
+        'maker': ''
+    }
+    
+    try:
+        soup = gogoev_parser.make_soup(content)
+        page_text = soup.get_text()
+        
+        # 住所を再取得（詳細ページの方が正確な場合がある）
+        # 複数のパターンを試す
+        address_patterns = [
+            soup.find('p', class_=lambda x: x and 'text-sm' in x),
+            soup.find('div', string=re.compile('住所|所在地')),
+        ]
+        
+        for pattern in address_patterns:
+            if pattern:
+                if hasattr(pattern, 'get_text'):
+                    address_text = pattern.get_text(strip=True)
+                else:
+                    # 次の要素を取得
+                    next_elem = pattern.find_next_sibling()
+                    if next_elem:
+                        address_text = next_elem.get_text(strip=True)
+                    else:
+                        continue
+                
+                if address_text and len(address_text) > 5:  # 短すぎる場合は無視
+                    detail_info['address'] = address_text
+                    break
+        
+        # テーブルから情報を抽出
+        tables = soup.find_all('table')
+        for table in tables:
+            rows = table.find_all('tr')
+            for row in rows:
+                th = row.find('th')
+                td = row.find('td')
+                if th and td:
+                    label = th.get_text(strip=True)
+                    value = td.get_text(strip=True)
+                    
+                    if ('住所' in label or '所在地' in label) and not detail_info['address']:
+                        detail_info['address'] = value
+                    elif ('出力' in label or 'kW' in label) and not detail_info['output']:
+                        detail_info['output'] = value
+                    elif '充電器' in label and ('数' in label or '口' in label) and not detail_info['charger_count']:
+                        detail_info['charger_count'] = value
+                    elif ('メーカー' in label or '製造' in label) and not detail_info['maker']:
+                        detail_info['maker'] = value
+                    elif '充電' in label and 'タイプ' in label and not detail_info['charge_type']:
+                        detail_info['charge_type'] = value
+        
+        # 定義リスト（dl）から情報を抽出
+        dl_list = soup.find_all('dl')
+        for dl in dl_list:
+            dts = dl.find_all('dt')
+            dds = dl.find_all('dd')
+            for dt, dd in zip(dts, dds):
+                label = dt.get_text(strip=True)
+                value = dd.get_text(strip=True)
+                
+                if ('住所' in label or '所在地' in label) and not detail_info['address']:
+                    detail_info['address'] = value
+                elif ('出力' in label or 'kW' in label) and not detail_info['output']:
+                    detail_info['output'] = value
+                elif '充電器' in label and ('数' in label or '口' in label) and not detail_info['charger_count']:
+                    detail_info['charger_count'] = value
+                elif ('メーカー' in label or '製造' in label) and not detail_info['maker']:
+                    detail_info['maker'] = value
+                elif '充電' in label and 'タイプ' in label and not detail_info['charge_type']:
+                    detail_info['charge_type'] = value
+        
+        # div構造から情報を抽出（より柔軟な検索）
+        # 充電タイプの検出（CHAdeMO、テスラ、普通充電など）
+        if not detail_info['charge_type']:
+            charge_types = []
+            if 'CHAdeMO' in page_text or 'チャデモ' in page_text:
+                charge_types.append('CHAdeMO')
+            if 'テスラ' in page_text or 'Tesla' in page_text:
+                charge_types.append('テスラ')
+            if '普通充電' in page_text or '200V' in page_text:
+                charge_types.append('普通充電')
+            if '急速充電' in page_text:
+                charge_types.append('急速充電')
+            if 'CCS' in page_text or 'ccs' in page_text:
+                charge_types.append('CCS')
+            if 'NACS' in page_text or 'nacs' in page_text:
+                charge_types.append('NACS')
+            if charge_types:
+                detail_info['charge_type'] = '、'.join(charge_types)
+        
+        # 出力の検出（数値 + kWのパターン）
+        if not detail_info['output']:
+            output_matches = re.findall(r'(\d+(?:\.\d+)?)\s*kW', page_text, re.IGNORECASE)
+            if output_matches:
+                # 最大値を取得（複数の出力がある場合）
+                outputs = [float(m) for m in output_matches]
+                max_output = max(outputs)
+                detail_info['output'] = f"{max_output}kW"
+        
+        # 充電器数の検出（○口、○台などのパターン）
+        if not detail_info['charger_count']:
+            charger_matches = re.findall(r'(\d+)\s*[口台]', page_text)
+            if charger_matches:
+                # 最大値を取得
+                counts = [int(m) for m in charger_matches]
+                detail_info['charger_count'] = str(max(counts))
+        
+        # メーカーの検出（一般的なメーカー名のパターン）
+        if not detail_info['maker']:
+            maker_keywords = ['日産', '三菱', 'パナソニック', '東芝', 'ABB', 'シーメンス', 'テスラ', 'Tesla']
+            for keyword in maker_keywords:
+                if keyword in page_text:
+                    detail_info['maker'] = keyword
+                    break
+        
+    except Exception as e:
+        print(f"詳細ページの抽出エラー ({detail_url}): {e}")
+    
+    return detail_info
+
+
+def load_pages(archive_path=None):
+    """(名前, 本文) のリストを読み込む"""
+    pages = []
+    if archive_path:
+        for record in iter_archive(archive_path):
+            url = record['url']
+            if (urlsplit(url).hostname == 'ev.gogo.gs' and not NON_DETAIL_URL_PATTERN.search(url)
+                    and record['status'] == 200):
+                pages.append((record['url'], record['body']))
+    else:
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'detail_*.html'))):
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def measure(func, content, repeat):
+    """1ページあたりの平均処理時間（秒）を返す"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - start) / repeat
+
+
+def measure_extraction(func, content, repeat):
+    """HTMLの解析を除いた抽出処理だけの平均時間（秒）を返す（解析済みの文書を使い回す）"""
+    soup = gogoev_parser.make_soup(content)
+    make_soup = gogoev_parser.make_soup
+    gogoev_parser.make_soup = lambda *args, **kwargs: soup
+    try:
+        return measure(func, content, repeat)
+    finally:
+        gogoev_parser.make_soup = make_soup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='詳細ページ抽出処理のベンチマーク')
+    parser.add_argument('--archive', help='記録済みアーカイブ（GOGOEV_ARCHIVE_MODE=record で作成）')
+    parser.add_argument('--repeat', type=int, default=50, help='1ページあたりの計測回数')
+    args = parser.parse_args()
+
+    pages = load_pages(args.archive)
+    if not pages:
+        print('計測対象の詳細ページがありません。')
+        return 1
+
+    print(f"エンジン: {gogoev_parser.get_engine()}")
+    print(f"{'ページ':<32} {'解析+抽出（変更前 / 1回走査）':>30} {'抽出のみ（変更前 / 1回走査）':>30}")
+    totals = [0.0, 0.0, 0.0, 0.0]
+    mismatches = 0
+    for name, content in pages:
+        same = legacy_parse_detail_page(content) == ev_scraper.parse_detail_page(content)
+        mismatches += not same
+        times = [
+            measure(legacy_parse_detail_page, content, args.repeat),
+            measure(ev_scraper.parse_detail_page, content, args.repeat),
+            measure_extraction(legacy_parse_detail_page, content, args.repeat),
+            measure_extraction(ev_scraper.parse_detail_page, content, args.repeat),
+        ]
+        totals = [total + t for total, t in zip(totals, times)]
+        print(f"{name[-32:]:<32} {times[0] * 1000:>12.2f}ms / {times[1] * 1000:>8.2f}ms "
+              f"{times[2] * 1000:>16.2f}ms / {times[3] * 1000:>8.2f}ms{'' if same else ' !'}")
+    legacy_total, single_total, legacy_extract, single_extract = totals
+    print(f"平均（解析+抽出）: 変更前 {legacy_total / len(pages) * 1000:.2f}ms/ページ, "
+          f"1回走査 {single_total / len(pages) * 1000:.2f}ms/ページ ({legacy_total / single_total:.2f}x)")
+    print(f"平均（抽出のみ）: 変更前 {legacy_extract / len(pages) * 1000:.2f}ms/ページ, "
+          f"1回走査 {single_extract / len(pages) * 1000:.2f}ms/ページ ({legacy_extract / single_extract:.2f}x)")
+    if mismatches:
+        print(f'変更前と抽出結果が異なるページ: {mismatches}件（! 印）')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
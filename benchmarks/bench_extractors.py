@@ -0,0 +1,247 @@
+"""
+抽出処理のマイクロベンチマーク
+benchmarks/fixtures のHTML・テキストで各抽出処理を繰り返し実行し、1ページあたりの時間と
+1秒あたりの抽出件数を表示する。結果は基準値（benchmarks/results/extractors_baseline.json）と比較し、
+抽出件数や抽出結果（のハッシュ）が変わった場合や、1秒あたりの抽出件数が基準値から --threshold を
+超えて下がった場合は終了コード1を返す。
+
+計測値の揺れで失敗しないよう、各抽出処理は1ラウンド --min-time 秒以上（1ページ TINY_CASE_MS 未満の
+抽出処理は --tiny-min-time 秒以上）繰り返した最速のラウンドをその回の結果とし、全抽出処理を
+--runs 回繰り返した中央値を採用する（基準値も同じ方法で作る）。
+基準値より遅かった抽出処理は --retries 回計測し直し、すべての回で遅かった場合だけ失敗とする。
+
+HTMLの解析（BeautifulSoup の作成）は計測に含めず、抽出処理だけを計測する
+（extract_detail_info はページ取得を含むため、取得後の解析・抽出を行う parse_detail_page を計測する）。
+基準値は計測したマシンに依存するため、別のマシンで比較する場合は先に --update-baseline で作り直す。
+
+使い方:
+    python benchmarks/bench_extractors.py                      # 基準値と比較
+    python benchmarks/bench_extractors.py --update-baseline    # 基準値を更新
+    python benchmarks/bench_extractors.py --threshold 0.1 --output DB/bench_extractors.json
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import ev_scraper  # noqa: E402
+import gogoev_parser  # noqa: E402
+import gogoev_review_scraper  # noqa: E402
+import gogoev_using_scraper  # noqa: E402
+from classify_reviews_charging_result import classify_charging_result  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'results', 'extractors_baseline.json')
+TINY_CASE_MS = 1.0  # 1ページがこれより短い抽出処理は揺れが大きいため、1ラウンドを --tiny-min-time 秒以上にする
+
+
+def soup_input(content):
+    return gogoev_parser.make_soup(content)
+
+
+def raw_input(content):
+    return content
+
+
+def lines_input(content):
+    return [line for line in content.decode('utf-8').splitlines() if line.strip()]
+
+
+# (抽出処理, フィクスチャ, 入力の作成, 抽出処理の実行（抽出結果のリストを返す）)
+CASES = [
+    ('extract_list_items', 'accident_list.html', soup_input,
+     lambda soup: ev_scraper.extract_list_items(soup, '故障')),
+    ('extract_list_items', 'maintenance_list_last.html', soup_input,
+     lambda soup: ev_scraper.extract_list_items(soup, 'メンテナンス')),
+    ('extract_detail_info', 'detail_dl.html', raw_input,
+     lambda content: [ev_scraper.parse_detail_page(content)]),
+    ('extract_detail_info', 'detail_table.html', raw_input,
+     lambda content: [ev_scraper.parse_detail_page(content)]),
+    ('extract_detail_info', 'detail_text.html', raw_input,
+     lambda content: [ev_scraper.parse_detail_page(content)]),
+    ('extract_reviews', 'review_list.html', soup_input, gogoev_review_scraper.extract_reviews),
+    ('extract_reviews_from_text', 'review_list.html', soup_input, gogoev_review_scraper.extract_reviews_from_text),
+    ('extract_reviews_alternative', 'review_list.html', soup_input,
+     gogoev_review_scraper.extract_reviews_alternative),
+    ('extract_records_from_blocks', 'using_list.html', soup_input, gogoev_using_scraper.extract_records_from_blocks),
+    ('extract_records_from_text', 'using_list.html', soup_input, gogoev_using_scraper.extract_records_from_text),
+    ('classify_charging_result', 'review_texts.txt', lines_input,
+     lambda texts: [classify_charging_result(text) for text in texts]),
+]
+
+
+def output_hash(output):
+    """抽出結果のハッシュ（抽出件数が同じまま内容が変わったことを検出する）"""
+    text = json.dumps(output, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def measure(run, data, rounds, min_time, tiny_min_time):
+    """(1回あたりの最短秒数, 抽出結果) を返す
+
+    1ラウンドが min_time 秒（1回 TINY_CASE_MS 未満の抽出処理は tiny_min_time 秒）以上になる回数を繰り返し、
+    rounds ラウンドのうち最も速いものを採用する（timeit と同じく、計測中はガベージコレクションを止める）。
+    """
+    output = run(data)
+    loops = 1
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                run(data)
+            elapsed = time.perf_counter() - start
+            if elapsed >= (tiny_min_time if elapsed / loops < TINY_CASE_MS / 1000 else min_time):
+                break
+            loops *= 2
+        best = elapsed / loops
+        for _ in range(rounds - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run(data)
+            best = min(best, (time.perf_counter() - start) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best, output
+
+
+def run_cases(rounds, min_time, tiny_min_time, keys=None):
+    """抽出処理ごとの計測結果 {'抽出処理:フィクスチャ': {...}} を返す（keys を指定した場合はその抽出処理だけ）"""
+    results = {}
+    for name, fixture, prepare, run in CASES:
+        if keys is not None and f'{name}:{fixture}' not in keys:
+            continue
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            data = prepare(f.read())
+        elapsed, output = measure(run, data, rounds, min_time, tiny_min_time)
+        results[f'{name}:{fixture}'] = {
+            'ms_per_page': round(elapsed * 1000, 4),
+            'records_per_sec': round(len(output) / elapsed, 1),
+            'records': len(output),
+            'output_hash': output_hash(output),
+        }
+    return results
+
+
+def run_suite(runs, rounds, min_time, tiny_min_time, keys=None):
+    """run_cases を runs 回繰り返し、抽出処理ごとに1秒あたりの抽出件数が中央値の回の結果を返す
+
+    全抽出処理を順に繰り返すため、同じ抽出処理の計測は時間的に離れ、一時的な負荷は1回分にしか影響しない。
+    """
+    all_results = [run_cases(rounds, min_time, tiny_min_time, keys) for _ in range(runs)]
+    results = {}
+    for key in all_results[0]:
+        ordered = sorted((run[key] for run in all_results), key=lambda result: result['records_per_sec'])
+        results[key] = ordered[len(ordered) // 2]
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'parser': gogoev_parser.get_engine(),
+    }
+
+
+def is_slower(result, base, threshold):
+    return result['records_per_sec'] < base['records_per_sec'] * (1 - threshold)
+
+
+def compare(results, baseline, threshold):
+    """基準値と比較して結果を表示し、問題のあった抽出処理の数を返す"""
+    failures = 0
+    print(f"{'抽出処理:フィクスチャ':<58} {'ms/ページ':>10} {'件/秒':>11} {'件数':>5} {'基準比':>8}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        note = ''
+        if base is None:
+            note = '新規'
+        else:
+            ratio = result['records_per_sec'] / base['records_per_sec']
+            note = f'{ratio:7.2f}x'
+            if result['records'] != base['records']:
+                note += f"  NG: 件数が変わりました（基準 {base['records']}件）"
+                failures += 1
+            elif result['output_hash'] != base.get('output_hash', result['output_hash']):
+                note += "  NG: 抽出結果が変わりました"
+                failures += 1
+            elif is_slower(result, base, threshold):
+                note += f"  NG: {(1 - ratio) * 100:.0f}% 低下"
+                failures += 1
+        print(f"{key:<58} {result['ms_per_page']:>10.3f} {result['records_per_sec']:>11.1f} "
+              f"{result['records']:>5d} {note:>8}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='抽出処理のマイクロベンチマーク')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基準値のファイル')
+    parser.add_argument('--update-baseline', action='store_true', help='今回の結果で基準値を書き換える')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='1秒あたりの抽出件数がこの割合を超えて下がったら失敗とする（0.2 = 20%%）')
+    parser.add_argument('--rounds', type=int, default=7, help='1回の計測のラウンド数（最も速いラウンドを採用）')
+    parser.add_argument('--min-time', type=float, default=0.1, help='1ラウンドの最短秒数（短い抽出処理は繰り返してこの秒数にする）')
+    parser.add_argument('--tiny-min-time', type=float, default=0.5,
+                        help=f'1ページ {TINY_CASE_MS:g}ms 未満の抽出処理に使う --min-time（揺れが大きいため長く繰り返す）')
+    parser.add_argument('--runs', type=int, default=3, help='全抽出処理の計測を繰り返す回数（中央値を採用）')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='基準値より遅かった抽出処理を計測し直す回数（速い方の結果を採用し、すべての回で遅かった場合だけ失敗とする）')
+    parser.add_argument('--output', help='今回の結果を書き出すファイル（JSON）')
+    args = parser.parse_args()
+
+    baseline = {}
+    saved_environment = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            saved = json.load(f)
+        baseline, saved_environment = saved['cases'], saved['environment']
+
+    results = run_suite(args.runs, args.rounds, args.min_time, args.tiny_min_time)
+    for _ in range(args.retries):
+        slower = [key for key, result in results.items()
+                  if key in baseline and is_slower(result, baseline[key], args.threshold)]
+        if not slower:
+            break
+        for key, result in run_suite(args.runs, args.rounds, args.min_time, args.tiny_min_time, keys=slower).items():
+            if result['records_per_sec'] > results[key]['records_per_sec']:
+                results[key] = result
+
+    report = {'environment': environment(), 'cases': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if saved_environment is not None and saved_environment != report['environment']:
+        print(f"注意: 基準値は別の環境で計測されています（{saved_environment}）")
+    failures = compare(results, baseline, args.threshold)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"基準値を更新しました: {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"基準値がありません。--update-baseline で作成してください: {args.baseline}")
+        return 0
+    if failures:
+        print(f"NG: {failures}件の抽出処理で基準値から性能が低下したか、抽出件数・抽出結果が変わりました")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
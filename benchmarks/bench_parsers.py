@@ -0,0 +1,116 @@
+"""
+パーサーエンジン別のページ解析時間ベンチマーク
+html.parser / lxml / lexbor の各エンジンでページを解析し、1ページあたりの解析時間と
+抽出結果が html.parser と一致するかを表示する。
+
+使い方:
+    python benchmarks/bench_parsers.py                      # benchmarks/fixtures のHTMLを使用
+    python benchmarks/bench_parsers.py --archive DB/http_archive.jsonl.gz
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import ev_scraper  # noqa: E402
+import gogoev_parser  # noqa: E402
+import gogoev_review_scraper  # noqa: E402
+import gogoev_using_scraper  # noqa: E402
+from gogoev_archive import iter_archive  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def page_kind(name):
+    """URLまたはファイル名からページの種類を判定"""
+    if 'accident' in name or 'maintenance' in name:
+        return 'list'
+    if 'review' in name:
+        return 'review'
+    if 'using' in name:
+        return 'using'
+    if 'detail' in name:
+        return 'detail'
+    return None
+
+
+def parse(kind, content):
+    """ページの種類に応じた解析処理を実行し、比較用の抽出結果を返す"""
+    if kind == 'list':
+        items, soup = ev_scraper.parse_list_page(content, '故障')
+        return items, ev_scraper.is_last_page(soup, 1)
+    if kind == 'review':
+        return gogoev_review_scraper.parse_reviews_page(content)
+    if kind == 'using':
+        records, soup = gogoev_using_scraper.parse_using_page(content)
+        return records, gogoev_using_scraper.get_has_next_page(soup) if soup else False
+    return ev_scraper.parse_detail_page(content)
+
+
+def load_pages(archive_path=None):
+    """(名前, 種類, 本文) のリストを読み込む"""
+    pages = []
+    if archive_path:
+        for record in iter_archive(archive_path):
+            kind = page_kind(record['url'])
+            if kind and record['status'] == 200:
+                pages.append((record['url'], kind, record['body']))
+    else:
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+            kind = page_kind(os.path.basename(path))
+            if kind:
+                with open(path, 'rb') as f:
+                    pages.append((os.path.basename(path), kind, f.read()))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='パーサーエンジン別のページ解析時間ベンチマーク')
+    parser.add_argument('--archive', help='記録済みアーカイブ（GOGOEV_ARCHIVE_MODE=record で作成）')
+    parser.add_argument('--repeat', type=int, default=20, help='1ページあたりの計測回数')
+    args = parser.parse_args()
+
+    pages = load_pages(args.archive)
+    if not pages:
+        print('計測対象のページがありません。')
+        return 1
+
+    engines = [e for e in gogoev_parser.ENGINES if e != 'lexbor' or gogoev_parser.LexborHTMLParser is not None]
+    expected = {}
+    results = {}
+    for engine in engines:
+        gogoev_parser.PARSER_ENGINE = engine
+        for name, kind, content in pages:
+            output = parse(kind, content)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                parse(kind, content)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            if engine == 'html.parser':
+                expected[name] = output
+            results[(engine, name)] = (elapsed, output == expected[name])
+
+    print(f"{'ページ':<40} {'種類':<7}" + ''.join(f'{e:>16}' for e in engines))
+    mismatches = 0
+    for name, kind, _ in pages:
+        cells = []
+        for engine in engines:
+            elapsed, same = results[(engine, name)]
+            mismatches += not same
+            cells.append(f"{elapsed * 1000:>13.2f}ms{'' if same else '!':1}")
+        print(f'{name[-40:]:<40} {kind:<7}' + ''.join(f'{c:>16}' for c in cells))
+    for engine in engines:
+        total = sum(results[(engine, name)][0] for name, _, _ in pages)
+        print(f'{engine}: 平均 {total / len(pages) * 1000:.2f}ms/ページ')
+    if mismatches:
+        print(f'html.parser と抽出結果が異なるページ: {mismatches}件（! 印）')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
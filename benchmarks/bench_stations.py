@@ -0,0 +1,109 @@
+"""
+充電スポット検索（/stations）のベンチマーク
+指定した件数の疑似データ（data.json と同じ形式）を一時ファイルに書き出して StationIndex に読み込み、
+条件ごとの検索時間（初回 = 絞り込みを計算、2回目以降 = カーソルで続きを取得する場合と同じく結果を再利用）を表示する。
+
+使い方:
+    python benchmarks/bench_stations.py
+    python benchmarks/bench_stations.py --rows 500000 --data ev-charger-dashboard/public/data.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from gogoev_station_index import StationIndex  # noqa: E402
+
+PREFECTURES = [
+    '北海道', '青森県', '岩手県', '宮城県', '秋田県', '山形県', '福島県', '茨城県', '栃木県', '群馬県',
+    '埼玉県', '千葉県', '東京都', '神奈川県', '新潟県', '富山県', '石川県', '福井県', '山梨県', '長野県',
+    '岐阜県', '静岡県', '愛知県', '三重県', '滋賀県', '京都府', '大阪府', '兵庫県', '奈良県', '和歌山県',
+    '鳥取県', '島根県', '岡山県', '広島県', '山口県', '徳島県', '香川県', '愛媛県', '高知県', '福岡県',
+    '佐賀県', '長崎県', '熊本県', '大分県', '宮崎県', '鹿児島県', '沖縄県',
+]
+FACILITIES = ['イオンモール', '日産', 'ローソン', '道の駅', 'セブンイレブン', 'ホテル', '市役所', 'トヨタ']
+
+QUERIES = [
+    ('種別', {'status_type': '故障'}),
+    ('都道府県', {'prefecture': '東京都'}),
+    ('キーワード', {'q': '道の駅'}),
+    ('キーワード(少)', {'q': '東京都市町12'}),
+    ('表示範囲', {'bbox': (139.5, 35.5, 140.0, 36.0)}),
+    ('全条件', {'status_type': '故障', 'prefecture': '東京都', 'q': '道の駅', 'bbox': (139.0, 35.0, 140.5, 36.5)}),
+    ('列の指定', {'fields': ['施設名', '緯度', '経度']}),
+]
+
+
+def generate_rows(count, seed=0):
+    """data.json と同じ形式の疑似データ（1割は緯度・経度なし）"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        prefecture = rng.choice(PREFECTURES)
+        located = i % 10 != 0
+        rows.append({
+            '更新日': f'2026年{rng.randint(1, 12)}月{rng.randint(1, 28)}日',
+            '施設名': f'{rng.choice(FACILITIES)} {i}号店',
+            '都道府県': prefecture,
+            '住所': f'{prefecture}市町{i % 1000}-{i % 97}',
+            '種別': rng.choice(['故障', 'メンテナンス']),
+            '詳細内容': '充電器の不具合により利用できません',
+            '充電タイプ': 'CHAdeMO（急速）',
+            '出力': '50kW',
+            '充電器数': '1',
+            'メーカー': '',
+            '詳細URL': f'https://ev.gogo.gs/detail/{i}',
+            '緯度': rng.uniform(24.0, 45.5) if located else '',
+            '経度': rng.uniform(123.0, 146.0) if located else '',
+        })
+    return rows
+
+
+def measure(index, repeat, **conditions):
+    """(初回のミリ秒, 2回目以降の平均ミリ秒, 件数) を返す"""
+    index._snapshot._filter_cache.clear()
+    start = time.perf_counter()
+    result = index.query(**conditions)
+    cold = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.query(**conditions)
+    warm = (time.perf_counter() - start) * 1000 / repeat
+    return cold, warm, result['total']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='充電スポット検索（/stations）のベンチマーク')
+    parser.add_argument('--rows', type=int, default=300000, help='疑似データの件数')
+    parser.add_argument('--data', help='疑似データの代わりに使う data.json')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_path = None
+    path = args.data
+    if not path:
+        fd, tmp_path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(generate_rows(args.rows), f, ensure_ascii=False)
+        path = tmp_path
+    try:
+        index = StationIndex(path)
+        start = time.perf_counter()
+        index.refresh()
+        print(f"読み込み: {len(index._snapshot.records)}件 {time.perf_counter() - start:.2f}秒")
+        for name, conditions in QUERIES:
+            cold, warm, total = measure(index, args.repeat, **conditions)
+            print(f"  {name:8s} 初回 {cold:7.2f}ms  2回目以降 {warm:6.2f}ms  {total:7d}件")
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+充電記録一覧の取得・解析パイプラインのベンチマーク
+benchmarks/fixtures/using_list.html を返す疑似的な取得処理（一定の待ち時間付き）で
+gogoev_using_scraper.main を実行し、解析プロセス数ごとの処理ページ数/秒を表示する。
+比較用に、取得と解析を同じスレッドで順に行う場合（従来の方式）も計測する。
+出力CSV・チェックポイント・データベースは一時ディレクトリに書き出す（サイトへのアクセスは行わない）。
+
+使い方:
+    python benchmarks/bench_using_pipeline.py
+    python benchmarks/bench_using_pipeline.py --prefectures 8 --pages 20 --workers 1,2,4,8
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import gogoev_storage  # noqa: E402
+import gogoev_using_scraper  # noqa: E402
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'using_list.html')
+EMPTY_PAGE = b'<html><body></body></html>'
+
+
+def fake_fetch(content, pages, latency):
+    """pages ページ目までは content を返し、それ以降は充電記録のないページを返す"""
+    def fetch(url):
+        time.sleep(latency)
+        page = int(url.rsplit('page=', 1)[1]) if 'page=' in url else 1
+        return content if page <= pages else EMPTY_PAGE
+    return fetch
+
+
+def run_sequential(fetch, prefectures, pages):
+    """取得と解析を同じスレッドで順に行う（従来の方式）。処理したページ数を返す"""
+    count = 0
+    for code in prefectures:
+        for page in range(1, pages + 2):
+            records, has_next = gogoev_using_scraper.parse_using_content(
+                fetch(gogoev_using_scraper.using_list_url(code, page)))
+            count += 1
+            if not records or not has_next:
+                break
+    return count
+
+
+def run_pipeline(prefectures, workers, tmp_dir):
+    """gogoev_using_scraper.main を実行し、処理したページ数を返す"""
+    gogoev_using_scraper.PARSE_WORKERS = workers
+    gogoev_using_scraper.CHECKPOINT_FILE = os.path.join(tmp_dir, f'checkpoint_{workers}.jsonl')
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        gogoev_using_scraper.main(prefectures=prefectures)
+    return output.getvalue().count('件取得（累計')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='充電記録一覧の取得・解析パイプラインのベンチマーク')
+    parser.add_argument('--prefectures', type=int, default=4, help='取得する都道府県の数')
+    parser.add_argument('--pages', type=int, default=10, help='都道府県ごとのページ数')
+    parser.add_argument('--latency', type=float, default=0.05, help='1ページの取得にかかる秒数')
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}', help='解析プロセス数（カンマ区切り）')
+    args = parser.parse_args()
+
+    with open(FIXTURE_PATH, 'rb') as f:
+        content = f.read()
+    prefectures = list(range(1, args.prefectures + 1))
+    fetch = fake_fetch(content, args.pages, args.latency)
+
+    tmp_dir = tempfile.mkdtemp()
+    gogoev_storage.STORAGE_PATH = os.path.join(tmp_dir, 'gogoev.sqlite3')
+    gogoev_using_scraper.OUTPUT_DIR = tmp_dir
+    gogoev_using_scraper.fetch_using_content = fetch
+    gogoev_using_scraper.HOST_REQUESTS_PER_SEC = 1000.0
+    gogoev_using_scraper.EXPORT_PARQUET = False
+
+    print(f"{args.prefectures}都道府県 × {args.pages}ページ（取得 {args.latency * 1000:.0f}ms/ページ、"
+          f"CPU {os.cpu_count()}コア）")
+    start = time.perf_counter()
+    count = run_sequential(fetch, prefectures, args.pages)
+    elapsed = time.perf_counter() - start
+    print(f"  従来（取得と解析を順に実行）  {elapsed:6.2f}秒  {count / elapsed:7.1f}ページ/秒")
+    for workers in sorted({int(value) for value in args.workers.split(',')}):
+        start = time.perf_counter()
+        count = run_pipeline(prefectures, workers, tmp_dir)
+        elapsed = time.perf_counter() - start
+        print(f"  パイプライン（解析 {workers:2d}プロセス）  {elapsed:6.2f}秒  {count / elapsed:7.1f}ページ/秒")
+    gogoev_storage.get_storage().close()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
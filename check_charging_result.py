@@ -2,7 +2,8 @@
 """充電結果の記入有無と内容別件数を集計"""
 import pandas as pd
 import sys
-import os
+
+from gogoev_storage import get_storage
 
 if sys.platform == 'win32':
     try:
@@ -11,8 +12,12 @@ if sys.platform == 'win32':
     except Exception:
         pass
 
-p = os.path.join(os.path.dirname(__file__), 'DB', 'gogoev_using_20260208_122138.csv')
-df = pd.read_csv(p, encoding='utf-8-sig')
+# 引数でCSV（例: DB/gogoev_using_20260208_122138.csv）を指定した場合はそのCSV、
+# 指定しない場合はデータベースの充電記録を集計する
+if len(sys.argv) > 1:
+    df = pd.read_csv(sys.argv[1], encoding='utf-8-sig')
+else:
+    df = get_storage().read('using_records')
 total = len(df)
 col = '充電結果'
 filled = df[col].notna() & (df[col].astype(str).str.strip() != '')
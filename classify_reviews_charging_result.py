@@ -7,9 +7,14 @@
 - 充電できなかった
 """
 import pandas as pd
+import argparse
 import re
 import sys
 import os
+import time
+
+import gogoev_metrics
+from gogoev_storage import get_storage
 
 if sys.platform == 'win32':
     try:
@@ -25,6 +30,90 @@ LABEL_OTHER = 'その他（確認のみ等)'
 LABEL_FAILED = '充電できなかった'
 
 
+# 1) 他の車が使用中のため断念（使用中・満車・断念など）
+GIVE_UP_PATTERNS = [
+    r'使用中で\s*充電できず',
+    r'使用中で\s*利用できな',
+    r'全て\s*使用中',
+    r'すべて\s*使用中',
+    r'EV枠は?\s*全て\s*使用中',
+    r'全ての充電器が使用中',
+    r'使用中でした[。、]',  # 「普通充電器は2台とも使用中でした。」
+    r'使用中で空き無',
+    r'一般車のおかげで充電できなかった',
+    r'一般車で埋ま',
+    r'他の車が使用中',
+    r'他車が使用中',
+    r'空きがなく',
+    r'空き無し',
+    r'空き無でした',
+    r'満車で\s*充電できず',
+    r'満車だった',
+    r'EV充電2基とも使用中で充電できず',
+    r'使用中に加えて',
+    r'使用中止に加えて',  # 混在する場合は「使えなく」の方が強そうだが、文脈で使用中
+]
+
+# 「断念」と一緒に使われていれば使用中による断念とみなす語
+GIVE_UP_CONTEXT_PATTERNS = [r'使用中', r'満車', r'空き', r'他の車', r'一般車']
+
+# 「〇〇できない可能性」のみの注意書きはその他（明確な失敗の言及がある場合を除く）
+CAVEAT_PATTERNS = [r'(?:利用|充電)\s*できな(?:い|ず)\s*可能性']
+CAVEAT_EXCEPT_PATTERNS = [
+    r'充電できなかった', r'利用できなかった', r'故障', r'使えな', r'調整中', r'使用中止',
+    r'利用できない状況', r'利用できないとのこと', r'利用できないようです',
+]
+
+# 2) 充電できた（失敗より先に判定し、成功の言及がある口コミを優先）
+SUCCESS_PATTERNS = [
+    r'充電ができました', r'充電できました', r'充電ができた', r'充電できた[ので]', r'充電できた[のは]',
+    r'充電完了', r'充電した[。、]', r'充電しました', r'充電を開始', r'利用できた', r'利用できました',
+    r'利用できるようになっておりました', r'充電ができる[ので]', r'充電できる[ので]', r'充電がお得です',
+    r'使わせてもらっています', r'充電スタート', r'左側の充電口で充電しました',
+]
+
+# 3) 充電できなかった（故障・調整中・利用不可・明確な失敗）
+FAILED_PATTERNS = [
+    r'充電できなかった',
+    r'充電できませんでした',
+    r'充電できません[。、]',  # 貼り紙等「充電できません」
+    r'充電できなくて',
+    r'充電できなくなって',
+    r'利用できなかった',
+    r'利用できませんでした',
+    r'利用できない\s*状況',
+    r'一般の方は?\s*利用できな',
+    r'使えなかった',
+    r'使えなくなり',
+    r'使用中止',
+    # 注: 「カードからは使用できず」は支払い手段の話なので 使えません/使えず は失敗に含めない
+    r'機器調整中のため充電できません',
+    r'調整中のため',
+    r'故障',
+    r'壊れ',
+    r'利用できないようです',
+    r'利用できないとのこと',
+    # 「充電できず」は使用中以外の理由でも使うので、ここで判定（使用中は上で済み）
+    r'充電できず',
+]
+
+
+def compile_patterns(patterns):
+    """パターンのリストを1つの選択（|）の正規表現にまとめてコンパイルする。"""
+    return re.compile('|'.join(f'(?:{pat})' for pat in patterns))
+
+
+# 判定規則（上から順に判定し、最初に当てはまった分類を返す）
+# (分類, すべて一致する必要があるパターン, 一致した場合は対象外とするパターン)
+CLASSIFICATION_RULES = [
+    (LABEL_GAVE_UP_IN_USE, [compile_patterns(GIVE_UP_PATTERNS)], None),
+    (LABEL_GAVE_UP_IN_USE, [re.compile('断念'), compile_patterns(GIVE_UP_CONTEXT_PATTERNS)], None),
+    (LABEL_OTHER, [compile_patterns(CAVEAT_PATTERNS)], compile_patterns(CAVEAT_EXCEPT_PATTERNS)),
+    (LABEL_SUCCESS, [compile_patterns(SUCCESS_PATTERNS)], None),
+    (LABEL_FAILED, [compile_patterns(FAILED_PATTERNS)], None),
+]
+
+
 def classify_charging_result(text: str) -> str:
     """口コミ内容から充電結果を判定する。"""
     if not text or not isinstance(text, str):
@@ -33,100 +122,77 @@ def classify_charging_result(text: str) -> str:
     if not t:
         return LABEL_OTHER
 
-    # 1) 他の車が使用中のため断念（使用中・満車・断念など）
-    give_up_patterns = [
-        r'使用中で\s*充電できず',
-        r'使用中で\s*利用できな',
-        r'全て\s*使用中',
-        r'すべて\s*使用中',
-        r'EV枠は?\s*全て\s*使用中',
-        r'全ての充電器が使用中',
-        r'使用中でした[。、]',  # 「普通充電器は2台とも使用中でした。」
-        r'使用中で空き無',
-        r'一般車のおかげで充電できなかった',
-        r'一般車で埋ま',
-        r'他の車が使用中',
-        r'他車が使用中',
-        r'空きがなく',
-        r'空き無し',
-        r'空き無でした',
-        r'満車で\s*充電できず',
-        r'満車だった',
-        r'EV充電2基とも使用中で充電できず',
-        r'使用中に加えて',
-        r'使用中止に加えて',  # 混在する場合は「使えなく」の方が強そうだが、文脈で使用中
-    ]
-    for pat in give_up_patterns:
-        if re.search(pat, t):
-            return LABEL_GAVE_UP_IN_USE
-
-    if '断念' in t and ('使用中' in t or '満車' in t or '空き' in t or '他の車' in t or '一般車' in t):
-        return LABEL_GAVE_UP_IN_USE
-
-    # 「〇〇できない可能性」のみの注意書きはその他
-    if re.search(r'(利用|充電)\s*できな(い|ず)\s*可能性', t):
-        if not re.search(r'充電できなかった|利用できなかった|故障|使えな|調整中|使用中止|利用できない状況|利用できないとのこと|利用できないようです', t):
-            return LABEL_OTHER
-
-    # 2) 充電できた（失敗より先に判定し、成功の言及がある口コミを優先）
-    success_patterns = [
-        r'充電ができました', r'充電できました', r'充電ができた', r'充電できた[ので]', r'充電できた[のは]',
-        r'充電完了', r'充電した[。、]', r'充電しました', r'充電を開始', r'利用できた', r'利用できました',
-        r'利用できるようになっておりました', r'充電ができる[ので]', r'充電できる[ので]', r'充電がお得です',
-        r'使わせてもらっています', r'充電スタート', r'左側の充電口で充電しました',
-    ]
-    for pat in success_patterns:
-        if re.search(pat, t):
-            return LABEL_SUCCESS
-
-    # 3) 充電できなかった（故障・調整中・利用不可・明確な失敗）
-    failed_patterns = [
-        r'充電できなかった',
-        r'充電できませんでした',
-        r'充電できません[。、]',  # 貼り紙等「充電できません」
-        r'充電できなくて',
-        r'充電できなくなって',
-        r'利用できなかった',
-        r'利用できませんでした',
-        r'利用できない\s*状況',
-        r'一般の方は?\s*利用できな',
-        r'使えなかった',
-        r'使えなくなり',
-        r'使用中止',
-        # 注: 「カードからは使用できず」は支払い手段の話なので 使えません/使えず は失敗に含めない
-        r'機器調整中のため充電できません',
-        r'調整中のため',
-        r'故障',
-        r'壊れ',
-        r'利用できないようです',
-        r'利用できないとのこと',
-    ]
-    for pat in failed_patterns:
-        if re.search(pat, t):
-            return LABEL_FAILED
-
-    # 「充電できず」は使用中以外の理由でも使うので、ここで判定（使用中は上で済み）
-    if re.search(r'充電できず', t):
-        return LABEL_FAILED
+    for label, required, excluded in CLASSIFICATION_RULES:
+        if all(pat.search(t) for pat in required) and not (excluded and excluded.search(t)):
+            return label
 
     # 4) その他
     return LABEL_OTHER
 
 
-def main():
+def classify_series(texts: pd.Series) -> pd.Series:
+    """口コミ内容の列をまとめて判定する（各要素に classify_charging_result を適用した結果と同じ）。
+
+    規則ごとに未判定の行だけを対象に一致判定するため、1行あたりの照合回数は
+    classify_charging_result と変わらず、件数に比例した時間で処理できる。
+    """
+    start = time.perf_counter()
+    result = pd.Series(LABEL_OTHER, index=texts.index, dtype=object)
+    is_text = texts.map(lambda value: isinstance(value, str)).astype(bool)
+    pending = texts[is_text].astype(object).str.strip()
+    pending = pending[pending != '']
+
+    for label, required, excluded in CLASSIFICATION_RULES:
+        if pending.empty:
+            break
+        matched = pd.Series(True, index=pending.index)
+        for pat in required:
+            candidates = pending[matched]
+            matched.loc[candidates.index] = candidates.str.contains(pat)
+        if excluded is not None:
+            candidates = pending[matched]
+            matched.loc[candidates.index] = ~candidates.str.contains(excluded)
+        result.loc[matched.index[matched]] = label
+        pending = pending[~matched]
+
+    gogoev_metrics.CLASSIFY_SECONDS.observe(time.perf_counter() - start)
+    for label, count in result.value_counts().items():
+        gogoev_metrics.CLASSIFIED_REVIEWS.inc(int(count), result=label)
+    return result
+
+
+def main(input_path=None):
+    """口コミを分類して集計する。
+
+    既定ではデータベース（gogoev_storage）の口コミを読み込み、分類結果をデータベースにも保存する。
+    input_path を指定した場合は従来どおりそのCSVを読み込む。
+    """
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(base_dir, 'DB', 'gogoev_reviews_20260208_114046.csv')
-    output_path = os.path.join(base_dir, 'DB', 'gogoev_reviews_20260208_114046_with_charging_result.csv')
-    # 元ファイルに上書きする場合: output_path = input_path
-
-    print('読み込み中:', input_path)
-    df = pd.read_csv(input_path, encoding='utf-8-sig')
+    storage = None
+    if input_path:
+        root, ext = os.path.splitext(input_path)
+        output_path = f'{root}_with_charging_result{ext}'
+        # 元ファイルに上書きする場合: output_path = input_path
+        print('読み込み中:', input_path)
+        df = pd.read_csv(input_path, encoding='utf-8-sig')
+    else:
+        storage = get_storage()
+        output_path = os.path.join(base_dir, 'DB', 'gogoev_reviews_with_charging_result.csv')
+        print('読み込み中:', storage.path)
+        df = storage.read('reviews')
+        if df.empty:
+            print('エラー: データベースに口コミがありません。gogoev_review_scraper.py を実行するか、--csv でCSVを指定してください。')
+            return
     if '口コミ内容' not in df.columns:
         print('エラー: 列「口コミ内容」が見つかりません。')
         return
     total = len(df)
 
-    df['充電結果'] = df['口コミ内容'].astype(str).map(classify_charging_result)
+    df['充電結果'] = classify_series(df['口コミ内容'].astype(str))
+    if storage is not None:
+        storage.set_charging_results(df)
+        print('データベースに分類結果を保存しました:', storage.path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
     df.to_csv(output_path, index=False, encoding='utf-8-sig')
     print('保存しました:', output_path)
 
@@ -158,4 +224,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='口コミの充電結果を分類する')
+    parser.add_argument('--csv', help='データベースの代わりに読み込む口コミCSV（例: DB/gogoev_reviews_20260208_114046.csv）')
+    args = parser.parse_args()
+    main(args.csv)
@@ -12,6 +12,9 @@ L.Icon.Default.mergeOptions({
   shadowUrl: '/leaflet-images/marker-shadow.png',
 })
 
+// /geocode/batch に1回で送る住所の数（サーバーの MAX_GEOCODE_BATCH 以下）
+const GEOCODE_BATCH_SIZE = 1000
+
 function App() {
   const [data, setData] = useState([])
   const [filteredData, setFilteredData] = useState([])
@@ -25,11 +28,25 @@ function App() {
   const [mapMarkers, setMapMarkers] = useState([])
   const [geocodingProgress, setGeocodingProgress] = useState(0)
 
+  // data.json を取得する（APIサーバーから圧縮版を取得し、ETag で未変更なら再ダウンロードしない。
+  // サーバーが起動していない場合は public/data.json を読み込む）
+  const fetchData = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/data.json', { cache: 'no-cache' })
+      if (response.ok) {
+        return response
+      }
+    } catch (error) {
+      console.warn('APIサーバーから data.json を取得できませんでした。public/data.json を読み込みます:', error)
+    }
+    return fetch('/data.json')
+  }
+
   // データを読み込む関数
   const loadData = async () => {
     try {
       setLoading(true)
-      const response = await fetch('/data.json')
+      const response = await fetchData()
       if (response.ok) {
         const jsonData = await response.json()
         setData(jsonData)
@@ -213,27 +230,6 @@ function App() {
     return `https://www.google.com/maps/search/?api=1&query=${encodeURIComponent(address)}`
   }
 
-  // 住所を緯度・経度に変換
-  const geocodeAddress = async (address) => {
-    try {
-      const response = await fetch('http://localhost:8000/geocode', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ address }),
-      })
-      const data = await response.json()
-      if (data.success) {
-        return { lat: data.lat, lon: data.lon, display_name: data.display_name }
-      }
-      return null
-    } catch (error) {
-      console.error('ジオコーディングエラー:', error)
-      return null
-    }
-  }
-
   // 地図マーカーを生成
   const generateMapMarkers = async () => {
     if (filteredData.length === 0) {
@@ -242,37 +238,75 @@ function App() {
     }
 
     setGeocodingProgress(0)
-    const markers = []
-    
-    // バッチ処理でジオコーディング（レート制限を考慮）
-    for (let i = 0; i < filteredData.length; i++) {
-      const item = filteredData[i]
-      const address = item['住所'] || item['都道府県'] || item['施設名']
-      
-      if (address && address.length > 3) {
-        const coords = await geocodeAddress(address)
-        if (coords) {
-          markers.push({
-            id: i,
-            position: [coords.lat, coords.lon],
-            facility: item['施設名'],
-            address: item['住所'],
-            status: item['種別'],
-            detail: item['詳細内容'],
-            updateDate: item['更新日'],
-          })
+    const rows = filteredData
+      .map((item, i) => ({ item, i, address: item['住所'] || item['都道府県'] || item['施設名'] }))
+      .filter(({ address }) => address && address.length > 3)
+    const addresses = [...new Set(rows.map(({ address }) => address))]
+    if (addresses.length === 0) {
+      setMapMarkers([])
+      setGeocodingProgress(100)
+      return
+    }
+
+    const coordsByAddress = {}
+    const buildMarkers = () => rows
+      .filter(({ address }) => coordsByAddress[address])
+      .map(({ item, i, address }) => ({
+        id: i,
+        position: [coordsByAddress[address].lat, coordsByAddress[address].lon],
+        facility: item['施設名'],
+        address: item['住所'],
+        status: item['種別'],
+        detail: item['詳細内容'],
+        updateDate: item['更新日'],
+      }))
+
+    // 住所を GEOCODE_BATCH_SIZE 件ずつまとめて送り、変換できた順に届く結果（NDJSON）でマーカーを追加する
+    // （重複の除去・キャッシュ・レート制限はサーバー側で行う）
+    try {
+      let resolved = 0
+      for (let start = 0; start < addresses.length; start += GEOCODE_BATCH_SIZE) {
+        const response = await fetch('http://localhost:8000/geocode/batch', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ addresses: addresses.slice(start, start + GEOCODE_BATCH_SIZE) }),
+        })
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`)
+        }
+
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+
+          buffer += decoder.decode(value, { stream: true })
+          const lines = buffer.split('\n')
+          buffer = lines.pop() || ''
+
+          for (const line of lines) {
+            if (!line.trim()) continue
+            const result = JSON.parse(line)
+            resolved += 1
+            if (result.success) {
+              coordsByAddress[result.address] = { lat: result.lat, lon: result.lon }
+            }
+          }
+          setMapMarkers(buildMarkers())
+          setGeocodingProgress(Math.round((resolved / addresses.length) * 100))
         }
       }
-      
-      setGeocodingProgress(Math.round(((i + 1) / filteredData.length) * 100))
-      
-      // レート制限を考慮して1秒待機
-      if (i < filteredData.length - 1) {
-        await new Promise(resolve => setTimeout(resolve, 1000))
-      }
+    } catch (error) {
+      console.error('ジオコーディングエラー:', error)
     }
-    
-    setMapMarkers(markers)
+
+    setMapMarkers(buildMarkers())
+    setGeocodingProgress(100)
   }
 
   // 地図表示を切り替え
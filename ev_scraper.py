@@ -1,15 +1,24 @@
 """
 GOGOEV 故障・メンテナンス情報自動収集スクリプト
 """
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
+import argparse
+import contextvars
 import re
-import json
 import os
 import sys
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import Tag
+
+import gogoev_fetch
+import gogoev_metrics
+import gogoev_parser
+from gogoev_checkpoint import Checkpoint
+from gogoev_geocode_cache import get_geocode_cache
+from gogoev_publish import publish_json
+from gogoev_storage import get_storage
 
 # Windows環境での標準出力のエンコーディングをUTF-8に設定
 if sys.platform == 'win32':
@@ -27,27 +36,41 @@ if sys.platform == 'win32':
 BASE_URL = "https://ev.gogo.gs"
 ACCIDENT_URL = "https://ev.gogo.gs/accident"
 MAINTENANCE_URL = "https://ev.gogo.gs/maintenance"
+DETAIL_CONCURRENCY = 4  # 詳細ページを並列に取得するスレッド数
+HOST_REQUESTS_PER_SEC = 2.0  # ev.gogo.gs へのリクエスト上限の初期値（件/秒、サーバー負荷軽減）
+HOST_MAX_REQUESTS_PER_SEC = 4.0  # 速いレスポンスが続いた場合に上げるリクエスト上限の最大値（件/秒）
+PARALLEL_LIST_PAGES = True  # 一覧ページを並列に取得する（False で1ページずつ順に取得）
+LIST_CONCURRENCY = 4  # 一覧ページを並列に取得するスレッド数（一覧ごと）
+MAX_LIST_PAGES = 100  # 無限ループ防止
+# 途中から再開するためのチェックポイント（--resume で使用、正常終了時に削除）
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DB', 'ev_scraper_checkpoint.jsonl')
+
+class ScrapeCancelled(Exception):
+    """cancel_event によりスクレイピングが中止された"""
+
+
+class IncompleteScrape(Exception):
+    """取得に失敗した詳細ページ・住所があり、結果が不完全（チェックポイントは残る）"""
 
-# User-Agent設定（403エラー回避）
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-}
+
+def check_cancelled(cancel_event):
+    """cancel_event がセットされていれば ScrapeCancelled を送出する（ページ・施設ごとに確認する）"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ScrapeCancelled('スクレイピングが中止されました')
+
+def in_caller_context(func):
+    """呼び出し元の contextvars を引き継いで func を実行する関数を返す（ThreadPoolExecutor に渡す）
+
+    APIサーバーはジョブの出力の振り分けに contextvars を使うため、詳細・一覧ページを並列に
+    取得するスレッドの出力もジョブに送られるようにする。
+    """
+    context = contextvars.copy_context()
+    # 同じ Context は複数のスレッドで同時に run できないため、呼び出しごとに複製する
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
 
 def get_page(url, max_retries=3):
-    """ページを取得する（リトライ機能付き）"""
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            return response
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"リトライ中... ({attempt + 1}/{max_retries})")
-                time.sleep(2)
-            else:
-                print(f"エラー: {url} の取得に失敗しました: {e}")
-                return None
-    return None
+    """ページを取得する（共有接続プール・リトライ・条件付きGETキャッシュ付き、失敗時は FetchError を送出）"""
+    return gogoev_fetch.get_page(url, max_retries=max_retries, use_cache=True, raise_on_error=True)
 
 def extract_list_items(soup, status_type):
     """一覧ページから施設情報を抽出"""
@@ -119,8 +142,224 @@ def extract_list_items(soup, status_type):
     
     return items
 
+# lexbor エンジン用のセレクタ（BeautifulSoup のクラス判定と同じく class 属性の部分一致）
+LIST_CARD_SELECTOR = 'div[class*="bg-white"][class*="border"][class*="mt-3"]'
+
+def extract_list_items_lexbor(tree, status_type):
+    """一覧ページから施設情報を抽出（lexbor エンジン用。extract_list_items と同じ結果を返す）"""
+    items = []
+    text = gogoev_parser.node_text
+    
+    for card in tree.css(LIST_CARD_SELECTOR):
+        try:
+            # 施設名と詳細URL
+            facility_link = card.css_first('a.font-bold')
+            if not facility_link:
+                continue
+            
+            facility_name = text(facility_link, strip=True)
+            detail_path = facility_link.attributes.get('href') or ''
+            if detail_path:
+                detail_url = urljoin(BASE_URL, detail_path)
+            else:
+                continue
+            
+            # 住所
+            address_elem = card.css_first('p[class*="text-sm"][class*="mt-1"]')
+            address = text(address_elem, strip=True) if address_elem else ""
+            
+            # 都道府県を抽出（住所から）
+            prefecture = ""
+            prefecture_match = re.search(r'^([^都道府県]*[都道府県])', address)
+            if prefecture_match:
+                prefecture = prefecture_match.group(1)
+            
+            # 故障/メンテナンスの詳細内容
+            detail_content = ""
+            h5 = card.css_first('h5.font-bold')
+            if h5:
+                next_p = gogoev_parser.next_element_sibling(h5, 'p')
+                if next_p:
+                    detail_content = text(next_p, strip=True)
+            
+            # 確認時間（更新日）
+            update_date = ""
+            info_section = card.css_first('div[class*="bg-base_color"][class*="border"]')
+            if info_section:
+                grid = info_section.css_first('div[class*="grid"]')
+                if grid:
+                    cols = gogoev_parser.child_elements(grid, 'div')
+                    if len(cols) >= 2:
+                        time_p = cols[1].css_first('p')
+                        if time_p:
+                            update_date = text(time_p, strip=True)
+            
+            items.append({
+                'facility_name': facility_name,
+                'prefecture': prefecture,
+                'address': address,
+                'status_type': status_type,
+                'detail_content': detail_content,
+                'update_date': update_date,
+                'detail_url': detail_url
+            })
+            
+        except Exception as e:
+            print(f"一覧項目の抽出エラー: {e}")
+            continue
+    
+    return items
+
+@gogoev_metrics.timed_parse('list', lambda result: len(result[0]))
+def parse_list_page(content, status_type):
+    """一覧ページを解析し、(施設リスト, ページネーション判定用のsoup) を返す
+    
+    lexbor エンジンでは施設リストをCSSセレクタで抽出し、
+    ページネーション部分だけを BeautifulSoup で解析する。
+    """
+    if gogoev_parser.get_engine() == 'lexbor':
+        tree = gogoev_parser.make_tree(content)
+        items = extract_list_items_lexbor(tree, status_type)
+        return items, gogoev_parser.pagination_soup(tree)
+    soup = gogoev_parser.make_soup(content)
+    return extract_list_items(soup, status_type), soup
+
 def extract_detail_info(detail_url):
-    """詳細ページから追加情報を抽出"""
+    """詳細ページから追加情報を抽出（取得に失敗した場合は gogoev_fetch.FetchError を送出）"""
+    response = get_page(detail_url)
+    return parse_detail_page(response.content, detail_url)
+
+# 詳細ページのラベル判定テーブル（上から順に判定し、最初に一致した未取得の項目に値を設定）
+DETAIL_LABEL_RULES = [
+    ('address', re.compile(r'住所|所在地')),
+    ('output', re.compile(r'出力|kW')),
+    ('charger_count', re.compile(r'^(?=.*充電器)(?=.*[数口])', re.S)),
+    ('maker', re.compile(r'メーカー|製造')),
+    ('charge_type', re.compile(r'^(?=.*充電)(?=.*タイプ)', re.S)),
+]
+DETAIL_ADDRESS_DIV_PATTERN = re.compile('住所|所在地')
+
+# 本文中のキーワード・出力・充電器数を1回の走査でまとめて検出するパターン
+DETAIL_KEYWORD_PATTERN = re.compile(
+    r'(?P<keyword>CHAdeMO|チャデモ|テスラ|Tesla|普通充電|200V|急速充電|CCS|ccs|NACS|nacs'
+    r'|日産|三菱|パナソニック|東芝|ABB|シーメンス)'
+    r'|(?P<output>\d+(?:\.\d+)?)\s*(?i:kW)'
+    r'|(?P<count>\d+)\s*[口台]'
+)
+# 充電タイプと、その判定に使うキーワード（表示順）
+CHARGE_TYPE_KEYWORDS = [
+    ('CHAdeMO', ('CHAdeMO', 'チャデモ')),
+    ('テスラ', ('テスラ', 'Tesla')),
+    ('普通充電', ('普通充電', '200V')),
+    ('急速充電', ('急速充電',)),
+    ('CCS', ('CCS', 'ccs')),
+    ('NACS', ('NACS', 'nacs')),
+]
+MAKER_KEYWORDS = ['日産', '三菱', 'パナソニック', '東芝', 'ABB', 'シーメンス', 'テスラ', 'Tesla']
+
+
+def apply_detail_label(detail_info, label, value):
+    """ラベル判定テーブルに従って、表・定義リストの値を未取得の項目に設定する"""
+    for field, pattern in DETAIL_LABEL_RULES:
+        if pattern.search(label):
+            if not detail_info[field]:
+                detail_info[field] = value
+                return
+
+
+def scan_detail_soup(soup):
+    """詳細ページの文書を1回だけ走査し、抽出に必要なテキストを集める
+
+    返り値の辞書:
+    - texts: get_text() と同じ規則で集めた本文の文字列
+    - p / div: 住所候補（class に text-sm を含む最初の p、住所・所在地を含む最初の div）
+    - tables: 表ごとの行（各行の最初の th / td のテキスト）
+    - dls: 定義リストごとの dt / dd のテキスト
+    """
+    text_types = soup.interesting_string_types
+    scan = {'texts': [], 'p': None, 'div': None, 'tables': [], 'dls': []}
+    collectors = []   # 現在の位置を含む要素（住所候補・th/td・dt/dd）のテキスト収集先
+    open_tables = []
+    open_rows = []
+    open_dls = []
+
+    def visit(tag):
+        opened = []
+        name = tag.name
+        table = row = dl = None
+        if name == 'p':
+            if scan['p'] is None:
+                classes = tag.get('class')
+                if isinstance(classes, list):
+                    classes = ' '.join(classes)
+                if classes and 'text-sm' in classes:
+                    scan['p'] = []
+                    opened.append(scan['p'])
+        elif name == 'div':
+            if scan['div'] is None:
+                string = tag.string
+                if string is not None and DETAIL_ADDRESS_DIV_PATTERN.search(string):
+                    scan['div'] = string.strip() if type(string) in text_types else ''
+        elif name == 'table':
+            table = []
+            scan['tables'].append(table)
+            open_tables.append(table)
+        elif name == 'tr':
+            if open_tables:
+                row = {'th': None, 'td': None}
+                for t in open_tables:
+                    t.append(row)
+                open_rows.append(row)
+        elif name == 'th' or name == 'td':
+            cell = None
+            for r in open_rows:
+                if r[name] is None:
+                    if cell is None:
+                        cell = []
+                        opened.append(cell)
+                    r[name] = cell
+        elif name == 'dl':
+            dl = {'dt': [], 'dd': []}
+            scan['dls'].append(dl)
+            open_dls.append(dl)
+        elif name == 'dt' or name == 'dd':
+            if open_dls:
+                cell = []
+                opened.append(cell)
+                for d in open_dls:
+                    d[name].append(cell)
+
+        collectors.extend(opened)
+        for child in tag.children:
+            if isinstance(child, Tag):
+                visit(child)
+            elif type(child) in text_types:
+                scan['texts'].append(child)
+                if collectors:
+                    stripped = child.strip()
+                    if stripped:
+                        for c in collectors:
+                            c.append(stripped)
+        if opened:
+            del collectors[-len(opened):]
+        if table is not None:
+            open_tables.pop()
+        if row is not None:
+            open_rows.pop()
+        if dl is not None:
+            open_dls.pop()
+
+    visit(soup)
+    return scan
+
+
+@gogoev_metrics.timed_parse('detail', lambda detail_info: int(any(detail_info.values())))
+def parse_detail_page(content, detail_url=''):
+    """詳細ページのHTMLから追加情報を抽出
+
+    文書は1回だけ走査し、ラベルはラベル判定テーブル、本文中のキーワード・数値は
+    1つの正規表現でまとめて検出する。
+    """
     detail_info = {
         'address': '',
         'charge_type': '',
@@ -130,134 +369,123 @@ def extract_detail_info(detail_url):
     }
     
     try:
-        response = get_page(detail_url)
-        if not response:
-            return detail_info
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        page_text = soup.get_text()
+        soup = gogoev_parser.make_soup(content)
+        scan = scan_detail_soup(soup)
         
         # 住所を再取得（詳細ページの方が正確な場合がある）
         # 複数のパターンを試す
-        address_patterns = [
-            soup.find('p', class_=lambda x: x and 'text-sm' in x),
-            soup.find('div', string=re.compile('住所|所在地')),
+        address_candidates = [
+            ''.join(scan['p']) if scan['p'] is not None else None,
+            scan['div'],
         ]
-        
-        for pattern in address_patterns:
-            if pattern:
-                if hasattr(pattern, 'get_text'):
-                    address_text = pattern.get_text(strip=True)
-                else:
-                    # 次の要素を取得
-                    next_elem = pattern.find_next_sibling()
-                    if next_elem:
-                        address_text = next_elem.get_text(strip=True)
-                    else:
-                        continue
-                
-                if address_text and len(address_text) > 5:  # 短すぎる場合は無視
-                    detail_info['address'] = address_text
-                    break
+        for address_text in address_candidates:
+            if address_text and len(address_text) > 5:  # 短すぎる場合は無視
+                detail_info['address'] = address_text
+                break
         
         # テーブルから情報を抽出
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                th = row.find('th')
-                td = row.find('td')
-                if th and td:
-                    label = th.get_text(strip=True)
-                    value = td.get_text(strip=True)
-                    
-                    if ('住所' in label or '所在地' in label) and not detail_info['address']:
-                        detail_info['address'] = value
-                    elif ('出力' in label or 'kW' in label) and not detail_info['output']:
-                        detail_info['output'] = value
-                    elif '充電器' in label and ('数' in label or '口' in label) and not detail_info['charger_count']:
-                        detail_info['charger_count'] = value
-                    elif ('メーカー' in label or '製造' in label) and not detail_info['maker']:
-                        detail_info['maker'] = value
-                    elif '充電' in label and 'タイプ' in label and not detail_info['charge_type']:
-                        detail_info['charge_type'] = value
+        for table in scan['tables']:
+            for row in table:
+                if row['th'] is not None and row['td'] is not None:
+                    apply_detail_label(detail_info, ''.join(row['th']), ''.join(row['td']))
         
         # 定義リスト（dl）から情報を抽出
-        dl_list = soup.find_all('dl')
-        for dl in dl_list:
-            dts = dl.find_all('dt')
-            dds = dl.find_all('dd')
-            for dt, dd in zip(dts, dds):
-                label = dt.get_text(strip=True)
-                value = dd.get_text(strip=True)
-                
-                if ('住所' in label or '所在地' in label) and not detail_info['address']:
-                    detail_info['address'] = value
-                elif ('出力' in label or 'kW' in label) and not detail_info['output']:
-                    detail_info['output'] = value
-                elif '充電器' in label and ('数' in label or '口' in label) and not detail_info['charger_count']:
-                    detail_info['charger_count'] = value
-                elif ('メーカー' in label or '製造' in label) and not detail_info['maker']:
-                    detail_info['maker'] = value
-                elif '充電' in label and 'タイプ' in label and not detail_info['charge_type']:
-                    detail_info['charge_type'] = value
-        
-        # div構造から情報を抽出（より柔軟な検索）
-        # 充電タイプの検出（CHAdeMO、テスラ、普通充電など）
-        if not detail_info['charge_type']:
-            charge_types = []
-            if 'CHAdeMO' in page_text or 'チャデモ' in page_text:
-                charge_types.append('CHAdeMO')
-            if 'テスラ' in page_text or 'Tesla' in page_text:
-                charge_types.append('テスラ')
-            if '普通充電' in page_text or '200V' in page_text:
-                charge_types.append('普通充電')
-            if '急速充電' in page_text:
-                charge_types.append('急速充電')
-            if 'CCS' in page_text or 'ccs' in page_text:
-                charge_types.append('CCS')
-            if 'NACS' in page_text or 'nacs' in page_text:
-                charge_types.append('NACS')
-            if charge_types:
-                detail_info['charge_type'] = '、'.join(charge_types)
-        
-        # 出力の検出（数値 + kWのパターン）
-        if not detail_info['output']:
-            output_matches = re.findall(r'(\d+(?:\.\d+)?)\s*kW', page_text, re.IGNORECASE)
-            if output_matches:
-                # 最大値を取得（複数の出力がある場合）
-                outputs = [float(m) for m in output_matches]
-                max_output = max(outputs)
-                detail_info['output'] = f"{max_output}kW"
-        
-        # 充電器数の検出（○口、○台などのパターン）
-        if not detail_info['charger_count']:
-            charger_matches = re.findall(r'(\d+)\s*[口台]', page_text)
-            if charger_matches:
-                # 最大値を取得
-                counts = [int(m) for m in charger_matches]
+        for dl in scan['dls']:
+            for dt, dd in zip(dl['dt'], dl['dd']):
+                apply_detail_label(detail_info, ''.join(dt), ''.join(dd))
+        
+        # 本文からの検出（充電タイプ・出力・充電器数・メーカー）
+        if not all(detail_info[field] for field in ('charge_type', 'output', 'charger_count', 'maker')):
+            page_text = ''.join(scan['texts'])
+            keywords = set()
+            outputs = []
+            counts = []
+            for match in DETAIL_KEYWORD_PATTERN.finditer(page_text):
+                kind = match.lastgroup
+                if kind == 'keyword':
+                    keywords.add(match.group('keyword'))
+                elif kind == 'output':
+                    outputs.append(float(match.group('output')))
+                else:
+                    counts.append(int(match.group('count')))
+            
+            # 充電タイプの検出（CHAdeMO、テスラ、普通充電など）
+            if not detail_info['charge_type']:
+                charge_types = [name for name, words in CHARGE_TYPE_KEYWORDS if keywords.intersection(words)]
+                if charge_types:
+                    detail_info['charge_type'] = '、'.join(charge_types)
+            
+            # 出力の検出（数値 + kWのパターン、複数ある場合は最大値）
+            if not detail_info['output'] and outputs:
+                detail_info['output'] = f"{max(outputs)}kW"
+            
+            # 充電器数の検出（○口、○台などのパターン、最大値）
+            if not detail_info['charger_count'] and counts:
                 detail_info['charger_count'] = str(max(counts))
-        
-        # メーカーの検出（一般的なメーカー名のパターン）
-        if not detail_info['maker']:
-            maker_keywords = ['日産', '三菱', 'パナソニック', '東芝', 'ABB', 'シーメンス', 'テスラ', 'Tesla']
-            for keyword in maker_keywords:
-                if keyword in page_text:
-                    detail_info['maker'] = keyword
-                    break
+            
+            # メーカーの検出（一般的なメーカー名のパターン）
+            if not detail_info['maker']:
+                for keyword in MAKER_KEYWORDS:
+                    if keyword in keywords:
+                        detail_info['maker'] = keyword
+                        break
         
     except Exception as e:
         print(f"詳細ページの抽出エラー ({detail_url}): {e}")
     
     return detail_info
 
+def fetch_detail_infos(items, concurrency=DETAIL_CONCURRENCY, checkpoint=None, cancel_event=None):
+    """詳細ページを並列に取得し、items と同じ順序で詳細情報のリストを返す
+    
+    リクエスト間隔は gogoev_fetch のホストごとのリクエスト上限で制御する。
+    checkpoint を渡した場合、記録済みの詳細URLは取得せずに記録を使い、
+    新たに取得できた詳細情報を記録する。取得に失敗した詳細ページは None になる。
+    """
+    total = len(items)
+    if checkpoint is not None:
+        done = checkpoint.items('detail')
+        reused = sum(1 for item in items if item['detail_url'] in done)
+        if reused:
+            print(f"チェックポイントから {reused}件の詳細情報を再利用します")
+    
+    def fetch_one(indexed_item):
+        idx, item = indexed_item
+        check_cancelled(cancel_event)
+        if checkpoint is not None:
+            saved = checkpoint.get('detail', item['detail_url'])
+            if saved is not None:
+                return saved
+        print(f"[{idx}/{total}] {item['facility_name']} の詳細情報を取得中...")
+        try:
+            detail_info = extract_detail_info(item['detail_url'])
+        except gogoev_fetch.FetchError:
+            # 記録しないため、再開時に取得し直す
+            return None
+        if checkpoint is not None and item['detail_url']:
+            checkpoint.record('detail', item['detail_url'], detail_info)
+        return detail_info
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        # map は入力と同じ順序で結果を返す
+        return list(executor.map(in_caller_context(fetch_one), enumerate(items, 1)))
+
 def geocode_address(address):
-    """住所を緯度・経度に変換する関数"""
+    """住所を緯度・経度に変換する関数（永続キャッシュ付き）
+
+    見つからなかった住所は (None, None) を返し、問い合わせに失敗した場合は gogoev_fetch.FetchError を送出する。
+    """
     if not address or len(address) < 3:
         return None, None
     
+    cache = get_geocode_cache()
+    cached = cache.get(address)
+    if cached is not None:
+        return cached['lat'], cached['lon']
+    
     try:
         # OpenStreetMap Nominatim APIを使用（無料）
+        # リクエスト間隔は gogoev_fetch のホストごとの上限（1件/秒）で制御される
         url = "https://nominatim.openstreetmap.org/search"
         params = {
             "q": address,
@@ -269,41 +497,99 @@ def geocode_address(address):
             "User-Agent": "EV-Charger-Scraper/1.0"
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        
+        response = gogoev_fetch.get_page(url, params=params, headers=headers, raise_on_error=True)
         data = response.json()
         if data and len(data) > 0:
             result = data[0]
-            return float(result["lat"]), float(result["lon"])
+            lat, lon = float(result["lat"]), float(result["lon"])
+            cache.put(address, lat, lon, result.get("display_name", address))
+            return lat, lon
         else:
+            # 見つからなかった住所もキャッシュして再問い合わせを避ける
+            cache.put(address, None, None)
             return None, None
+    except gogoev_fetch.FetchError:
+        raise
     except Exception as e:
         print(f"ジオコーディングエラー ({address}): {e}")
         return None, None
 
-def get_all_pages(url, status_type):
-    """全ページを取得してリストを結合"""
+def is_last_page(soup, page):
+    """ページネーションから、現在のページ（page）が最後のページか判定"""
+    # ページネーションのボタンを確認
+    pagination = soup.find('nav', {'aria-label': 'Pagination Navigation'})
+    if pagination:
+        # 現在のページが最後のページか確認
+        current_page_span = pagination.find('span', {'aria-current': 'page'})
+        if current_page_span:
+            current_page_num = current_page_span.get_text(strip=True)
+            try:
+                if int(current_page_num) == page:
+                    # 次のページボタンを確認
+                    next_buttons = pagination.find_all('button', {'aria-label': lambda x: x and 'Next' in x})
+                    if not next_buttons:
+                        # 最後のページ番号を取得
+                        page_buttons = pagination.find_all('button', {'aria-label': lambda x: x and 'Go to page' in x})
+                        if page_buttons:
+                            page_numbers = []
+                            for btn in page_buttons:
+                                text = btn.get_text(strip=True)
+                                if text.isdigit():
+                                    page_numbers.append(int(text))
+                            if page_numbers and page >= max(page_numbers):
+                                return True
+                        else:
+                            # ページ番号が表示されていない場合、次のページがないと判断
+                            return True
+            except ValueError:
+                pass
+    return False
+
+def get_last_page_number(soup):
+    """ページネーションに表示されている最大のページ番号を返す（ページネーションがない場合は None）"""
+    pagination = soup.find('nav', {'aria-label': 'Pagination Navigation'})
+    if not pagination:
+        return None
+    page_numbers = []
+    page_buttons = pagination.find_all('button', {'aria-label': lambda x: x and 'Go to page' in x})
+    current_page_span = pagination.find('span', {'aria-current': 'page'})
+    for elem in page_buttons + ([current_page_span] if current_page_span else []):
+        text = elem.get_text(strip=True)
+        if text.isdigit():
+            page_numbers.append(int(text))
+    return max(page_numbers) if page_numbers else None
+
+def fetch_list_page(url, status_type, page, cancel_event=None):
+    """一覧の指定ページを取得して解析
+
+    取得に失敗した場合は gogoev_fetch.FetchError を送出する（一覧が途中で欠けたまま保存しない）。
+    """
+    check_cancelled(cancel_event)
+    # Livewireを使用している場合、ページパラメータの形式が異なる可能性がある
+    # まず通常の形式を試す
+    if page == 1:
+        page_url = url
+    else:
+        page_url = f"{url}?page={page}"
+    
+    print(f"{status_type}情報 - ページ {page} を取得中...")
+    
+    response = get_page(page_url)
+    return parse_list_page(response.content, status_type)
+
+def get_all_pages(url, status_type, parallel=PARALLEL_LIST_PAGES, cancel_event=None):
+    """全ページを取得してリストを結合
+    
+    parallel=True の場合は get_all_pages_parallel で残りのページを並列に取得する。
+    """
+    if parallel:
+        return get_all_pages_parallel(url, status_type, cancel_event=cancel_event)
+    
     all_items = []
     page = 1
-    max_pages = 100  # 無限ループ防止
     
-    while page <= max_pages:
-        # Livewireを使用している場合、ページパラメータの形式が異なる可能性がある
-        # まず通常の形式を試す
-        if page == 1:
-            page_url = url
-        else:
-            page_url = f"{url}?page={page}"
-        
-        print(f"{status_type}情報 - ページ {page} を取得中...")
-        
-        response = get_page(page_url)
-        if not response:
-            break
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        items = extract_list_items(soup, status_type)
+    while page <= MAX_LIST_PAGES:
+        items, soup = fetch_list_page(url, status_type, page, cancel_event)
         
         if not items:
             print(f"ページ {page} にデータがありません。終了します。")
@@ -313,57 +599,107 @@ def get_all_pages(url, status_type):
         print(f"ページ {page}: {len(items)}件の施設を取得")
         
         # 次のページがあるか確認
-        # ページネーションのボタンを確認
-        pagination = soup.find('nav', {'aria-label': 'Pagination Navigation'})
-        if pagination:
-            # 現在のページが最後のページか確認
-            current_page_span = pagination.find('span', {'aria-current': 'page'})
-            if current_page_span:
-                current_page_num = current_page_span.get_text(strip=True)
-                try:
-                    if int(current_page_num) == page:
-                        # 次のページボタンを確認
-                        next_buttons = pagination.find_all('button', {'aria-label': lambda x: x and 'Next' in x})
-                        if not next_buttons:
-                            # 最後のページ番号を取得
-                            page_buttons = pagination.find_all('button', {'aria-label': lambda x: x and 'Go to page' in x})
-                            if page_buttons:
-                                page_numbers = []
-                                for btn in page_buttons:
-                                    text = btn.get_text(strip=True)
-                                    if text.isdigit():
-                                        page_numbers.append(int(text))
-                                if page_numbers and page >= max(page_numbers):
-                                    break
-                            else:
-                                # ページ番号が表示されていない場合、次のページがないと判断
-                                break
-                except ValueError:
-                    pass
+        if is_last_page(soup, page):
+            break
         
         page += 1
-        time.sleep(1)  # リクエスト間の待機
     
     return all_items
 
-def main():
-    """メイン処理"""
+def get_all_pages_parallel(url, status_type, concurrency=LIST_CONCURRENCY, cancel_event=None):
+    """全ページを取得してリストを結合（並列取得）
+    
+    1ページ目のページネーションから最後のページ番号を読み取り、残りのページを並列に取得する。
+    取得間隔はホストごとのリクエスト上限（gogoev_fetch.set_rate_limit）で制御する。
+    結果はページ順に結合し、データのないページ以降は使わない（取得に失敗したページがあれば FetchError を送出）。
+    ページネーションから最後のページが分からない場合は1ページずつ取得する。
+    """
+    all_items = []
+    pages = [1]
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while pages:
+            results = executor.map(
+                in_caller_context(lambda page: fetch_list_page(url, status_type, page, cancel_event)), pages)
+            for page, (items, soup) in zip(pages, results):
+                
+                if not items:
+                    print(f"ページ {page} にデータがありません。終了します。")
+                    return all_items
+                
+                all_items.extend(items)
+                print(f"ページ {page}: {len(items)}件の施設を取得")
+                
+                # 次のページがあるか確認
+                if is_last_page(soup, page):
+                    return all_items
+            
+            # 最後に取得したページのページネーションから、残りのページ番号を決める
+            next_page = pages[-1] + 1
+            if next_page > MAX_LIST_PAGES:
+                break
+            last_page = max(get_last_page_number(soup) or next_page, next_page)
+            pages = list(range(next_page, min(last_page, MAX_LIST_PAGES) + 1))
+    
+    return all_items
+
+def main(resume=False, cancel_event=None):
+    """メイン処理
+    
+    resume=True の場合、前回中断した実行のチェックポイントから一覧・取得済みの詳細情報・
+    位置情報を読み込み、残りの作業だけを行う。
+    cancel_event（threading.Event）がセットされると、次のページ・施設の取得前に
+    ScrapeCancelled を送出して中止する（チェックポイントは残るため resume=True で再開できる）。
+    一覧ページの取得に失敗した場合は gogoev_fetch.FetchError で中止する。詳細ページ・位置情報の
+    取得に失敗した場合は取得できた分を保存したうえで IncompleteScrape を送出する
+    （どちらもチェックポイントは残るため、resume=True で失敗した分だけを取得し直せる）。
+    """
+    checkpoint = None
+    metrics_start = gogoev_metrics.snapshot()
     try:
         print("=" * 60)
         print("GOGOEV 故障・メンテナンス情報収集スクリプト")
         print("=" * 60)
         
         all_data = []
+        gogoev_fetch.set_rate_limit(urlsplit(BASE_URL).hostname, HOST_REQUESTS_PER_SEC, HOST_MAX_REQUESTS_PER_SEC)
+        checkpoint = Checkpoint(CHECKPOINT_FILE, resume=resume)
+        if resume:
+            print(f"チェックポイントから再開します: {CHECKPOINT_FILE}（記録 {len(checkpoint)}件）")
+        
+        saved_lists = checkpoint.get('list', 'items')
+        if saved_lists is not None:
+            accident_items = saved_lists['accident']
+            maintenance_items = saved_lists['maintenance']
+            print("\n【一覧はチェックポイントの記録を使用】")
+            print(f"故障情報: {len(accident_items)}件")
+            print(f"メンテナンス情報: {len(maintenance_items)}件")
+        elif PARALLEL_LIST_PAGES:
+            # 故障情報とメンテナンス情報の一覧を並列に取得
+            print("\n【故障情報・メンテナンス情報の取得を開始】")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                accident_future = executor.submit(in_caller_context(get_all_pages), ACCIDENT_URL, "故障",
+                                                  cancel_event=cancel_event)
+                maintenance_future = executor.submit(in_caller_context(get_all_pages), MAINTENANCE_URL, "メンテナンス",
+                                                     cancel_event=cancel_event)
+                accident_items = accident_future.result()
+                maintenance_items = maintenance_future.result()
+            print(f"故障情報: {len(accident_items)}件取得")
+            print(f"メンテナンス情報: {len(maintenance_items)}件取得")
+        else:
+            # 故障情報を取得
+            print("\n【故障情報の取得を開始】")
+            accident_items = get_all_pages(ACCIDENT_URL, "故障", cancel_event=cancel_event)
+            print(f"故障情報: {len(accident_items)}件取得")
+            
+            # メンテナンス情報を取得
+            print("\n【メンテナンス情報の取得を開始】")
+            maintenance_items = get_all_pages(MAINTENANCE_URL, "メンテナンス", cancel_event=cancel_event)
+            print(f"メンテナンス情報: {len(maintenance_items)}件取得")
         
-        # 故障情報を取得
-        print("\n【故障情報の取得を開始】")
-        accident_items = get_all_pages(ACCIDENT_URL, "故障")
-        print(f"故障情報: {len(accident_items)}件取得")
-        
-        # メンテナンス情報を取得
-        print("\n【メンテナンス情報の取得を開始】")
-        maintenance_items = get_all_pages(MAINTENANCE_URL, "メンテナンス")
-        print(f"メンテナンス情報: {len(maintenance_items)}件取得")
+        check_cancelled(cancel_event)
+        if saved_lists is None:
+            checkpoint.record('list', 'items', {'accident': accident_items, 'maintenance': maintenance_items})
         
         # 全データを結合
         all_items = accident_items + maintenance_items
@@ -371,13 +707,19 @@ def main():
         
         # 詳細ページから追加情報を取得
         print("\n【詳細ページからの追加情報取得を開始】")
+        detail_infos = fetch_detail_infos(all_items, checkpoint=checkpoint, cancel_event=cancel_event)
         detailed_data = []
-        
-        for idx, item in enumerate(all_items, 1):
-            print(f"[{idx}/{len(all_items)}] {item['facility_name']} の詳細情報を取得中...")
-            
-            detail_info = extract_detail_info(item['detail_url'])
-            
+        failed_details = sum(1 for detail_info in detail_infos if detail_info is None)
+        if failed_details:
+            print(f"詳細ページの取得に失敗した施設: {failed_details}件")
+        
+        # 取得に失敗した行（詳細ページ・位置情報）。保存済みの充電スポット情報を空の値で上書きしないよう、
+        # 充電スポットの保存からは除く
+        failed_rows = set()
+        for idx, (item, detail_info) in enumerate(zip(all_items, detail_infos)):
+            if detail_info is None:
+                failed_rows.add(idx)
+                detail_info = {'address': '', 'charge_type': '', 'output': '', 'charger_count': '', 'maker': ''}
             # 詳細ページの住所が取得できた場合は上書き
             if detail_info['address']:
                 item['address'] = detail_info['address']
@@ -398,18 +740,28 @@ def main():
             }
             
             detailed_data.append(row)
-            
-            # リクエスト間の待機
-            time.sleep(1.5)
         
         # ジオコーディングを実行
         print("\n【住所から位置情報（緯度・経度）を取得中】")
         geocoded_count = 0
+        failed_geocodes = 0
         for idx, row in enumerate(detailed_data, 1):
             address = row['住所'] or row['都道府県'] or row['施設名']
             if address and len(address) > 3:
-                print(f"[{idx}/{len(detailed_data)}] {address} の位置情報を取得中...")
-                lat, lon = geocode_address(address)
+                saved = checkpoint.get('geocode', address)
+                if saved is not None:
+                    lat, lon = saved
+                else:
+                    check_cancelled(cancel_event)
+                    print(f"[{idx}/{len(detailed_data)}] {address} の位置情報を取得中...")
+                    try:
+                        lat, lon = geocode_address(address)
+                    except gogoev_fetch.FetchError:
+                        failed_geocodes += 1
+                        failed_rows.add(idx - 1)
+                        lat, lon = None, None
+                    if lat and lon:
+                        checkpoint.record('geocode', address, [lat, lon])
                 if lat and lon:
                     row['緯度'] = lat
                     row['経度'] = lon
@@ -417,14 +769,29 @@ def main():
                 else:
                     row['緯度'] = ''
                     row['経度'] = ''
-                
-                # レート制限を考慮して1秒待機
-                time.sleep(1)
             else:
                 row['緯度'] = ''
                 row['経度'] = ''
         
         print(f"位置情報取得完了: {geocoded_count}/{len(detailed_data)}件の施設の位置情報を取得しました。")
+        if failed_geocodes:
+            print(f"位置情報の問い合わせに失敗した住所: {failed_geocodes}件")
+        
+        # データベースに保存（詳細URLが同じ施設・同じ更新日の情報は上書き）
+        print("\n【データベースに保存中】")
+        storage = get_storage()
+        storage.upsert_stations(row for idx, row in enumerate(detailed_data) if idx not in failed_rows)
+        storage.upsert_outages(detailed_data)
+        print(f"DB: {storage.path} に {len(detailed_data)}件のデータを保存しました。")
+        # 前回の実行との差分（掲載開始・内容の更新・掲載終了）を変更セットとして保存
+        # （取得に失敗した詳細ページがある場合は誤った掲載終了・追加を通知しないよう、
+        # 変更セットを作らず次の完全な実行でまとめて記録する）
+        if failed_details:
+            print("差分: 取得に失敗した詳細ページがあるため、変更セットの記録を省略しました")
+        else:
+            version, counts = storage.record_station_changes(detailed_data)
+            print(f"差分: 追加 {counts['added']}件、更新 {counts['updated']}件、掲載終了 {counts['resolved']}件"
+                  f"（変更セット version {version}）")
         
         # CSVに出力
         print("\n【CSVファイルに出力中】")
@@ -447,20 +814,44 @@ def main():
         
         json_file = os.path.join(public_dir, 'data.json')
         # orient='records'で配列形式のJSONに変換
+        # 改行・インデントなしの JSON と、その gzip・brotli 圧縮版・ハッシュ（APIサーバーの ETag）を書き出す
         json_data = df.to_dict(orient='records')
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
+        sizes = publish_json(json_data, json_file)
         print(f"JSON: {json_file} に {len(detailed_data)}件のデータを保存しました。")
+        print("  サイズ: " + "、".join(f"{name} {size / 1024:.1f}KB" for name, size in sizes.items()))
         
+        gogoev_metrics.print_summary(metrics_start)
+        if failed_details or failed_geocodes:
+            checkpoint.close()
+            raise IncompleteScrape(f"詳細ページ {failed_details}件・位置情報 {failed_geocodes}件の取得に失敗しました")
         print(f"\n完了！合計 {len(detailed_data)}件のデータを保存しました。")
         print("=" * 60)
         
+        checkpoint.complete()
         return detailed_data
+    except ScrapeCancelled:
+        if checkpoint is not None:
+            checkpoint.close()
+        print(f"スクレイピングを中止しました。--resume で再開できます: {CHECKPOINT_FILE}")
+        raise
+    except IncompleteScrape as e:
+        print(f"{e}。--resume で失敗した分だけを取得し直せます: {CHECKPOINT_FILE}", file=sys.stderr)
+        raise
     except Exception as e:
+        if checkpoint is not None:
+            checkpoint.close()
+            print(f"途中までの作業を記録しました。--resume で再開できます: {CHECKPOINT_FILE}", file=sys.stderr)
         import traceback
         error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
         print(error_msg, file=sys.stderr)
         raise  # エラーを再発生させて、APIサーバーがキャッチできるようにする
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="GOGOEV 故障・メンテナンス情報収集スクリプト")
+    parser.add_argument('--resume', action='store_true',
+                        help='前回中断した実行のチェックポイントから再開する')
+    args = parser.parse_args()
+    try:
+        main(resume=args.resume)
+    except (IncompleteScrape, ScrapeCancelled):
+        sys.exit(1)
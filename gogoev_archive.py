@@ -0,0 +1,82 @@
+"""
+HTTPレスポンスの記録・再生用アーカイブ
+取得したレスポンス（URL・ステータス・ヘッダー・本文）を gzip 圧縮の JSON Lines に追記し、
+再生時はネットワークに接続せず同じレスポンスを返す。
+パーサーの変更をオフラインで固定のページ群に対して計測するために使う。
+"""
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+
+# 本文はデコード済みで保存するため、転送時のエンコーディング関連ヘッダーは保存しない
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class ArchiveWriter:
+    """レスポンスをアーカイブファイルに追記する"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 既存のアーカイブには新しい gzip メンバーとして追記する
+        self._file = gzip.open(path, 'ab')
+
+    def write(self, url, status, headers, body):
+        record = {
+            'url': url,
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            'body': base64.b64encode(body).decode('ascii'),
+            'fetched_at': time.time(),
+        }
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            # 途中で異常終了してもそこまでの記録を読めるよう、1件ごとに同期フラッシュする
+            self._file.flush(zlib_mode=zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def iter_archive(path):
+    """アーカイブの記録を順に返す（末尾が途中で切れている場合はそこまで）"""
+    with gzip.open(path, 'rb') as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                record['body'] = base64.b64decode(record['body'])
+                yield record
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+class ArchiveReader:
+    """アーカイブを読み込み、URLごとのレスポンスを返す（同じURLは最後の記録を使う）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        for record in iter_archive(path):
+            self._records[record['url']] = record
+
+    def get(self, url):
+        return self._records.get(url)
+
+    def urls(self):
+        return list(self._records)
+
+    def __len__(self):
+        return len(self._records)
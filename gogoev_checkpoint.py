@@ -0,0 +1,75 @@
+"""
+長時間のスクレイピングを途中から再開するためのチェックポイント
+完了した作業（取得済みのページ・詳細URL・ジオコーディング済みの住所など）を
+1件ごとに JSON Lines のファイルへ追記する。
+追記のみのため記録の手間は件数に関係なく一定で、書き込み途中で終了しても
+それまでの記録は読み込める（末尾の壊れた行は無視する）。
+"""
+import json
+import os
+import threading
+
+
+class Checkpoint:
+    """種類（kind）ごとに キー → 値 を記録するチェックポイント
+
+    resume=False の場合は既存のチェックポイントを破棄して最初から記録する。
+    同じキーを複数回記録した場合は最後の値を使う。
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self._data.setdefault(entry['kind'], {})[entry['key']] = entry['value']
+                valid_size += len(line)
+        # 書き込み途中で終了した末尾の行を切り捨て、続きを正しい位置から追記する
+        os.truncate(self.path, valid_size)
+
+    def __len__(self):
+        return sum(len(values) for values in self._data.values())
+
+    def get(self, kind, key, default=None):
+        """記録済みの値を返す（未記録の場合は default）"""
+        with self._lock:
+            return self._data.get(kind, {}).get(key, default)
+
+    def items(self, kind):
+        """種類ごとの記録（キー → 値）を返す"""
+        with self._lock:
+            return dict(self._data.get(kind, {}))
+
+    def record(self, kind, key, value):
+        """値を記録してファイルに書き出す"""
+        line = json.dumps({'kind': kind, 'key': key, 'value': value}, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._data.setdefault(kind, {})[key] = value
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def complete(self):
+        """すべての作業が完了したらチェックポイントを削除する"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
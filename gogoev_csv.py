@@ -0,0 +1,52 @@
+"""
+CSVの逐次書き込み
+ページを解析するたびにその行をCSVに追記し、すぐにファイルへ書き出す。
+全件をメモリに保持しないためページ数が増えてもメモリ使用量は一定で、
+途中で異常終了してもそれまでに取得した行はCSVとして読める。
+"""
+import csv
+import os
+
+
+class CsvStreamWriter:
+    """CSVファイルに行を追記する（pandas の to_csv(index=False, encoding='utf-8-sig') と同じ形式）"""
+
+    def __init__(self, path, columns, resume_size=None):
+        self.path = path
+        self.columns = list(columns)
+        self.count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume_size is not None and os.path.exists(path):
+            # 再開時は前回記録したサイズまで切り詰め、記録後に書き込まれた途中の行を除く
+            os.truncate(path, resume_size)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        # BOM（Excel用）とヘッダーは新規ファイルの先頭にだけ書く
+        self._file = open(path, 'a', encoding='utf-8-sig' if is_new else 'utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore',
+                                      lineterminator=os.linesep)
+        if is_new:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def write_rows(self, rows):
+        """行（列名 → 値の辞書）を追記してファイルに書き出し、追記した件数を返す"""
+        written = 0
+        for row in rows:
+            self._writer.writerow(row)
+            written += 1
+        self._file.flush()
+        self.count += written
+        return written
+
+    def size(self):
+        """書き出し済みのファイルサイズ（バイト）を返す（再開時の resume_size に使う）"""
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,264 @@
+"""
+GOGOEV スクレイパー共通のHTTP取得モジュール
+keep-aliveの接続プールを全スクレイパーで共有し、リトライ・タイムアウト設定を統一する
+ホストごとの送信レートとリトライ時の待機は gogoev_rate_limit で制御する
+"""
+import atexit
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import gogoev_metrics
+import gogoev_rate_limit
+from gogoev_archive import ArchiveReader, ArchiveWriter
+from gogoev_http_cache import HttpCache
+
+# User-Agent設定（403エラー回避）
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# 共通の取得設定
+TIMEOUT_SEC = 10        # 1リクエストあたりのタイムアウト秒数
+MAX_RETRIES = 3         # 最大試行回数（リトライ前の待機は指数バックオフ + ジッター、Retry-After があればそれ以上）
+POOL_CONNECTIONS = 10   # 接続プールを保持するホスト数
+POOL_MAXSIZE = 4        # ホストごとの最大同時接続数
+
+# 条件付きGETキャッシュの保存先とサイズ上限
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HTTP_CACHE_PATH = os.path.join(SCRIPT_DIR, 'DB', 'http_cache.sqlite3')
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# レスポンスの記録・再生（オフライン実行・計測用）
+# GOGOEV_ARCHIVE_MODE=record で取得したレスポンスをアーカイブに追記し、
+# GOGOEV_ARCHIVE_MODE=replay でネットワークに接続せずアーカイブから返す
+ARCHIVE_MODE = os.environ.get('GOGOEV_ARCHIVE_MODE', '')
+ARCHIVE_PATH = os.environ.get('GOGOEV_ARCHIVE_PATH', os.path.join(SCRIPT_DIR, 'DB', 'http_archive.jsonl.gz'))
+
+
+class FetchError(Exception):
+    """リトライしてもページを取得できなかった（get_page(..., raise_on_error=True) で送出する）"""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+_http_cache = None
+_archive_writer = None
+_archive_reader = None
+
+
+def _create_session():
+    """接続プール付きのセッションを作成"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    # pool_block=True でホストごとの接続数を POOL_MAXSIZE 以下に抑える
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=0,  # リトライは get_page 側で統一して行う
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """共有セッションを取得する（初回呼び出し時に作成）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def close_session():
+    """共有セッションを閉じる（プール内の接続を解放）"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_http_cache():
+    """共有の条件付きGETキャッシュを取得する（初回呼び出し時に作成）"""
+    global _http_cache
+    if _http_cache is None:
+        with _session_lock:
+            if _http_cache is None:
+                _http_cache = HttpCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES)
+    return _http_cache
+
+
+def _build_response(url, status, headers, body):
+    """保存済みの本文からレスポンスを組み立てる（キャッシュ・アーカイブ再生用）"""
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def start_recording(path=None):
+    """以降に取得したレスポンスをアーカイブに記録する"""
+    global _archive_writer
+    stop_archive()
+    _archive_writer = ArchiveWriter(path or ARCHIVE_PATH)
+    print(f"レスポンスを記録します: {_archive_writer.path}")
+
+
+def start_replay(path=None):
+    """以降の取得をネットワークに接続せずアーカイブから返す"""
+    global _archive_reader
+    stop_archive()
+    _archive_reader = ArchiveReader(path or ARCHIVE_PATH)
+    print(f"アーカイブから再生します: {_archive_reader.path}（{len(_archive_reader)}件）")
+
+
+def stop_archive():
+    """記録・再生を終了する"""
+    global _archive_writer, _archive_reader
+    if _archive_writer is not None:
+        _archive_writer.close()
+        _archive_writer = None
+    _archive_reader = None
+
+
+def _replay_page(url, request_url, detect_encoding):
+    """アーカイブからレスポンスを返す（記録がない・エラー応答の場合は None）"""
+    record = _archive_reader.get(request_url)
+    if record is None:
+        print(f"エラー: {url} はアーカイブに記録されていません")
+        return None
+    response = _build_response(request_url, record['status'], record['headers'], record['body'])
+    try:
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"エラー: {url} の取得に失敗しました: {e}")
+        return None
+    if detect_encoding:
+        response.encoding = response.apparent_encoding
+    return response
+
+
+def set_rate_limit(host, requests_per_sec, max_requests_per_sec=None):
+    """ホストごとのリクエスト上限（件/秒）を設定する（None または 0 で解除）
+
+    requests_per_sec から始め、速いレスポンスが続けば max_requests_per_sec まで上げ、
+    403・429・503・5xx・接続エラー・遅いレスポンスでは requests_per_sec の 1/4 まで下げる（それ以外の 4xx では変えない）。
+    max_requests_per_sec を省略した場合は requests_per_sec を超えない。
+    """
+    gogoev_rate_limit.configure(host, requests_per_sec, max_rate=max_requests_per_sec)
+
+
+def _wait_for_slot(limiter, host):
+    """ホストのリクエスト上限を超えないよう、送信枠が空くまで待機する"""
+    waited = limiter.acquire()
+    if waited > 0:
+        gogoev_metrics.RATE_LIMIT_WAIT_SECONDS.inc(waited, host=host)
+
+
+def _timed_get(session, url, **kwargs):
+    """session.get を実行し、所要時間・ステータス・受信バイト数を計測値に記録する"""
+    host = urlsplit(url).hostname
+    start = time.perf_counter()
+    try:
+        response = session.get(url, **kwargs)
+    except requests.exceptions.RequestException:
+        gogoev_metrics.FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+        gogoev_metrics.FETCH_RESPONSES.inc(host=host, status='error')
+        raise
+    gogoev_metrics.FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+    gogoev_metrics.FETCH_RESPONSES.inc(host=host, status=response.status_code)
+    gogoev_metrics.FETCH_BYTES.inc(len(response.content), host=host)
+    return response
+
+
+def get_page(url, max_retries=MAX_RETRIES, params=None, headers=None,
+             timeout=TIMEOUT_SEC, detect_encoding=False, use_cache=False, raise_on_error=False):
+    """ページを取得する（共有接続プール・リトライ機能付き）
+
+    取得に失敗した場合は None を返す（raise_on_error=True の場合は FetchError を送出する。
+    取得の失敗を「データのないページ」と区別する必要があるスクレイパーで使う）。
+    headers は共通ヘッダー（User-Agent）に上書きマージされる。
+    detect_encoding=True の場合、本文からエンコーディングを推定して設定する。
+    use_cache=True の場合、条件付きGETを送り、304 ならキャッシュ本文を返す。
+    アーカイブ再生中はネットワークに接続せず、記録済みのレスポンスを返す。
+    """
+    request_url = requests.Request('GET', url, params=params).prepare().url
+    if _archive_reader is not None:
+        response = _replay_page(url, request_url, detect_encoding)
+        if response is None and raise_on_error:
+            raise FetchError(f"{url} をアーカイブから再生できませんでした")
+        return response
+
+    session = get_session()
+    cache = None
+    entry = None
+    if use_cache:
+        cache = get_http_cache()
+        entry = cache.get(request_url)
+        if entry is not None:
+            headers = {**(headers or {}), **cache.validation_headers(entry)}
+
+    host = urlsplit(url).hostname
+    for attempt in range(max_retries):
+        limiter = gogoev_rate_limit.get_limiter(host)
+        if limiter is not None:
+            _wait_for_slot(limiter, host)
+        retry_after = None
+        try:
+            try:
+                response = _timed_get(session, url, params=params, headers=headers, timeout=timeout)
+            except requests.exceptions.RequestException:
+                if limiter is not None:
+                    limiter.observe_error()
+                raise
+            if response.status_code in gogoev_rate_limit.THROTTLE_STATUS_CODES:
+                retry_after = gogoev_rate_limit.parse_retry_after(response.headers.get('Retry-After'))
+            if limiter is not None:
+                limiter.observe(response.status_code, response.elapsed.total_seconds(), retry_after)
+            if entry is not None and response.status_code == 304:
+                # 変更なし: キャッシュ本文を再利用
+                cache.touch(request_url)
+                response = _build_response(request_url, 200, entry['headers'], entry['body'])
+                response.from_cache = True
+            elif cache is not None and response.ok:
+                cache.put(request_url, response)
+            if _archive_writer is not None:
+                _archive_writer.write(request_url, response.status_code, response.headers, response.content)
+            response.raise_for_status()
+            if detect_encoding:
+                # エンコーディングを明示的に設定
+                response.encoding = response.apparent_encoding
+            return response
+        except requests.exceptions.RequestException as e:
+            if attempt < max_retries - 1:
+                delay = max(gogoev_rate_limit.backoff_delay(attempt), retry_after or 0)
+                print(f"リトライ中... ({attempt + 1}/{max_retries}、{delay:.1f}秒後)")
+                gogoev_metrics.FETCH_RETRIES.inc(host=host)
+                time.sleep(delay)
+            else:
+                print(f"エラー: {url} の取得に失敗しました: {e}")
+                if raise_on_error:
+                    raise FetchError(f"{url} の取得に失敗しました: {e}") from e
+                return None
+    return None
+
+
+atexit.register(stop_archive)
+
+if ARCHIVE_MODE == 'record':
+    start_recording()
+elif ARCHIVE_MODE == 'replay':
+    start_replay()
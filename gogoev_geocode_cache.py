@@ -0,0 +1,107 @@
+"""
+ジオコーディング結果の永続キャッシュ
+スクレイパー（ev_scraper.geocode_address）とAPIサーバー（/geocode）で共有する。
+正規化した住所をキーに SQLite に保存し、有効期限（TTL）を過ぎたものは再取得する。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import gogoev_metrics
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GEOCODE_CACHE_PATH = os.path.join(SCRIPT_DIR, 'DB', 'geocode_cache.sqlite3')
+GEOCODE_CACHE_TTL_SEC = 30 * 24 * 60 * 60        # 見つかった住所の有効期限（30日）
+GEOCODE_NEGATIVE_TTL_SEC = 24 * 60 * 60          # 見つからなかった住所の有効期限（1日）
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def normalize_address(address):
+    """キャッシュキー用に住所を正規化する（全角英数の半角化・空白除去）"""
+    if not address:
+        return ''
+    normalized = unicodedata.normalize('NFKC', str(address))
+    return re.sub(r'\s+', '', normalized)
+
+
+class GeocodeCache:
+    """正規化住所 → 緯度・経度 の SQLite キャッシュ"""
+
+    def __init__(self, path, ttl_sec=GEOCODE_CACHE_TTL_SEC, negative_ttl_sec=GEOCODE_NEGATIVE_TTL_SEC):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # スクレイパーとAPIサーバーが同じファイルを同時に開けるよう WAL モードにする
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                address_key TEXT PRIMARY KEY,
+                address TEXT NOT NULL,
+                lat REAL,
+                lon REAL,
+                display_name TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, address):
+        """キャッシュを参照する
+
+        未登録または期限切れの場合は None を返す。
+        見つからなかった住所も {'lat': None, 'lon': None, ...} として返す（ネガティブキャッシュ）。
+        """
+        key = normalize_address(address)
+        if not key:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT lat, lon, display_name, updated_at FROM geocode_cache WHERE address_key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            gogoev_metrics.GEOCODE_CACHE.inc(result='miss')
+            return None
+        lat, lon, display_name, updated_at = row
+        ttl = self.ttl_sec if lat is not None else self.negative_ttl_sec
+        if time.time() - updated_at > ttl:
+            gogoev_metrics.GEOCODE_CACHE.inc(result='miss')
+            return None
+        gogoev_metrics.GEOCODE_CACHE.inc(result='hit')
+        return {'lat': lat, 'lon': lon, 'display_name': display_name}
+
+    def put(self, address, lat, lon, display_name=None):
+        """ジオコーディング結果を保存する（見つからなかった場合は lat, lon に None を渡す）"""
+        key = normalize_address(address)
+        if not key:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO geocode_cache (address_key, address, lat, lon, display_name, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, address, lat, lon, display_name, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_geocode_cache():
+    """共有のジオコーディングキャッシュを取得する（初回呼び出し時に作成）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeocodeCache(GEOCODE_CACHE_PATH)
+    return _cache
@@ -0,0 +1,107 @@
+"""
+GOGOEV スクレイパー用の永続HTTPキャッシュ（条件付きGET）
+URLをキーに本文と ETag / Last-Modified を SQLite に保存し、
+再取得時は If-None-Match / If-Modified-Since を送って 304 ならキャッシュ本文を再利用する。
+合計サイズが上限を超えた場合は最終利用時刻の古いものから削除する（LRU）。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 再検証ヘッダーとして保存し、キャッシュ応答にも復元するレスポンスヘッダー
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HttpCache:
+    """SQLite に本文を保存する条件付きGET用キャッシュ"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # スレッドプールから共有するため、接続は1本にしてロックで保護する
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access)')
+        self._conn.commit()
+
+    def get(self, url):
+        """キャッシュエントリを取得する（なければ None）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, headers, body FROM http_cache WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': json.loads(headers),
+            'body': body,
+        }
+
+    def validation_headers(self, entry):
+        """キャッシュエントリから条件付きGET用のリクエストヘッダーを作成"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url):
+        """キャッシュ本文を再利用したときに最終利用時刻を更新する"""
+        with self._lock:
+            self._conn.execute('UPDATE http_cache SET last_access = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+    def put(self, url, response):
+        """レスポンスを保存する（ETag も Last-Modified もない場合は再検証できないので保存しない）"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO http_cache (url, etag, last_modified, headers, body, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, json.dumps(headers), body, len(body), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """合計サイズが上限以下になるまで、最終利用時刻の古いものから削除する（ロック取得済みで呼ぶ）"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT url, size FROM http_cache ORDER BY last_access').fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM http_cache WHERE url = ?', (url,))
+            total -= size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,245 @@
+"""
+スクレイパーの処理段階ごとの計測値（カウンター・ヒストグラム）
+取得（HTTPリクエストの所要時間・受信バイト数・リトライ・ステータス）、解析（1ページの所要時間・抽出件数）、
+ジオコーディングキャッシュのヒット・ミス、口コミの分類時間をプロセス内に集計する。
+APIサーバーは /metrics で Prometheus のテキスト形式（render）を返し、
+各スクレイパーは実行の最後に今回の実行分の集計（print_summary）を表示する。
+"""
+import functools
+import math
+import threading
+import time
+
+# ヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_metrics = []  # 登録順（/metrics の出力順）
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    """増加のみのカウンター（ラベルの値の組ごとに集計）"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        """{ラベルの値の組: 値}"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """上下する現在の値（ラベルの値の組ごと）"""
+
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class Histogram:
+    """値の分布（区切りごとの件数・合計・件数）"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}  # ラベルの値の組 → [区切りごとの件数（累積でない）, 合計, 件数]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """with ブロックの所要時間（秒）を記録する"""
+        return _Timer(self, labels)
+
+    def values(self):
+        """{ラベルの値の組: (合計, 件数)}"""
+        with self._lock:
+            return {key: (state[1], state[2]) for key, state in self._values.items()}
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+# 取得
+FETCH_SECONDS = Histogram('gogoev_fetch_seconds', 'HTTPリクエストの所要時間（秒、待機を除く）', ['host'])
+FETCH_BYTES = Counter('gogoev_fetch_bytes_total', '受信したレスポンス本文のバイト数', ['host'])
+FETCH_RESPONSES = Counter('gogoev_fetch_responses_total',
+                          'HTTPレスポンス数（status は HTTP ステータス、接続エラー・タイムアウトは error）',
+                          ['host', 'status'])
+FETCH_RETRIES = Counter('gogoev_fetch_retries_total', '失敗したリクエストのリトライ回数', ['host'])
+RATE_LIMIT_WAIT_SECONDS = Counter('gogoev_rate_limit_wait_seconds_total',
+                                  'ホストごとのリクエスト上限による待機時間（秒、Retry-After による待機を含む）', ['host'])
+RATE_LIMIT_REQUESTS_PER_SEC = Gauge('gogoev_rate_limit_requests_per_sec',
+                                    '現在のリクエスト上限（件/秒、レスポンスに応じて自動で調整）', ['host'])
+RATE_LIMIT_DECREASES = Counter('gogoev_rate_limit_decreases_total',
+                               'リクエスト上限を下げた回数（reason は throttle（403・429・503）/ error / slow）',
+                               ['host', 'reason'])
+# 解析
+PARSE_SECONDS = Histogram('gogoev_parse_seconds', '1ページの解析・抽出の所要時間（秒）', ['page'],
+                          buckets=PARSE_BUCKETS)
+RECORDS_EXTRACTED = Counter('gogoev_records_extracted_total', 'ページから抽出した件数', ['page'])
+# ジオコーディング
+GEOCODE_CACHE = Counter('gogoev_geocode_cache_total', 'ジオコーディングキャッシュの参照数（hit / miss）', ['result'])
+# 口コミの分類
+CLASSIFY_SECONDS = Histogram('gogoev_classify_seconds', '口コミの充電結果の分類にかかった時間（秒、1回の分類処理ごと）')
+CLASSIFIED_REVIEWS = Counter('gogoev_classified_reviews_total', '充電結果を分類した口コミ数', ['result'])
+
+
+def timed_parse(page, count_records):
+    """解析関数の所要時間と抽出件数（count_records(戻り値)）を page の種類で記録するデコレーター"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            PARSE_SECONDS.observe(time.perf_counter() - start, page=page)
+            RECORDS_EXTRACTED.inc(count_records(result), page=page)
+            return result
+        return wrapper
+    return decorator
+
+
+def render():
+    """全計測値を Prometheus のテキスト形式で返す"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot():
+    """現在の計測値（print_summary で差分を表示するために使う）"""
+    return {metric.name: metric.values() for metric in _metrics}
+
+
+def _since(metric, previous):
+    """previous（snapshot の戻り値）からの増加分 {ラベルの値の組: 値}"""
+    before = (previous or {}).get(metric.name, {})
+    changes = {}
+    for key, value in metric.values().items():
+        if isinstance(value, tuple):
+            old_total, old_count = before.get(key, (0.0, 0))
+            if value[1] > old_count:
+                changes[key] = (value[0] - old_total, value[1] - old_count)
+        elif value > before.get(key, 0):
+            changes[key] = value - before.get(key, 0)
+    return changes
+
+
+def print_summary(since=None):
+    """処理段階ごとの集計を表示する（since に snapshot() の戻り値を渡すとそれ以降の分だけ）"""
+    lines = []
+    fetch_bytes = _since(FETCH_BYTES, since)
+    retries = _since(FETCH_RETRIES, since)
+    waits = _since(RATE_LIMIT_WAIT_SECONDS, since)
+    errors = {key[0]: value for key, value in _since(FETCH_RESPONSES, since).items() if key[1] == 'error'}
+    throttled = {key[0]: value for key, value in _since(FETCH_RESPONSES, since).items() if key[1] in ('403', '429', '503')}
+    rates = RATE_LIMIT_REQUESTS_PER_SEC.values()
+    for (host,), (total, count) in sorted(_since(FETCH_SECONDS, since).items()):
+        rate = f"、現在の上限 {rates[(host,)]:.2f}件/秒" if (host,) in rates else ''
+        lines.append(f"  取得 {host}: {count}件 合計 {total:.1f}秒（平均 {total / count * 1000:.0f}ms）、"
+                     f"{fetch_bytes.get((host,), 0) / 1024:.0f}KB、リトライ {retries.get((host,), 0)}回、"
+                     f"接続エラー {errors.get(host, 0)}件、403・429・503 {throttled.get(host, 0)}件、"
+                     f"上限による待機 {waits.get((host,), 0):.1f}秒{rate}")
+    records = _since(RECORDS_EXTRACTED, since)
+    for (page,), (total, count) in sorted(_since(PARSE_SECONDS, since).items()):
+        lines.append(f"  解析 {page}: {count}ページ 合計 {total:.2f}秒（平均 {total / count * 1000:.1f}ms）、"
+                     f"抽出 {records.get((page,), 0)}件")
+    geocode = _since(GEOCODE_CACHE, since)
+    if geocode:
+        lines.append(f"  ジオコーディングキャッシュ: ヒット {geocode.get(('hit',), 0)}件、"
+                     f"ミス {geocode.get(('miss',), 0)}件")
+    for _, (total, count) in _since(CLASSIFY_SECONDS, since).items():
+        lines.append(f"  分類: {count}回 合計 {total:.2f}秒")
+    if lines:
+        print("\n【処理段階ごとの計測】")
+        print("\n".join(lines))
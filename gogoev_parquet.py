@@ -0,0 +1,198 @@
+"""
+充電記録の型付き Parquet エクスポート
+文字列で保存されている充電記録（充電量「10.5kWh」、充電時間「1時間5分」、利用日時「2026年2月7日 0:00」など）を
+数値・日時・カテゴリ型に変換し、都道府県・年月ごとに分割した Parquet データセットとして書き出す。
+分析時は load_using_records() で必要な都道府県・期間だけを型付きのまま読み込める。
+
+使い方:
+    python gogoev_parquet.py                       # データベースの充電記録を DB/parquet/using_records に書き出す
+    python gogoev_parquet.py --csv DB/gogoev_using_20260208_122138.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+except ImportError:  # pyarrow が未インストールの場合はエクスポートできない
+    pa = None
+    pa_dataset = None
+
+from gogoev_storage import get_storage, prefecture_of
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARQUET_DIR = os.path.join(SCRIPT_DIR, 'DB', 'parquet', 'using_records')
+PARTITION_COLUMNS = ['都道府県', '年月']
+UNKNOWN_PARTITION = '不明'  # 都道府県・年月が分からない記録の分割先
+
+# カテゴリ型にする列（値の種類が少ない列）
+CATEGORY_COLUMNS = ['充電タイプ', '充電結果', '混雑状況', '車種', '認証']
+
+# 「2026年2月7日 0:00」「2026/02/07 13:05」などの日時
+DATETIME_PATTERN = (
+    r'(?P<year>\d{4})\s*[年/.\-]\s*(?P<month>\d{1,2})\s*[月/.\-]\s*(?P<day>\d{1,2})\s*日?'
+    r'(?:[^\d]*(?P<hour>\d{1,2})\s*[:時]\s*(?P<minute>\d{1,2})?)?'
+)
+
+
+# 日付部分（年・月・日）を「YYYY-M-D」に置き換え、「%Y-%m-%d %H:%M」として一括で読み取る
+# （読み取れない値だけを DATETIME_PATTERN で1件ずつ読み取る）
+DATE_PART_PATTERN = r'(\d{4})\s*[年/.\-]\s*(\d{1,2})\s*[月/.\-]\s*(\d{1,2})\s*日?'
+
+
+def _parse_unique(values, parse):
+    """値の種類ごとに1回だけ parse を実行し、元の並びに戻す（同じ値が多い列を速く変換する）"""
+    values = values.fillna('').astype(str)
+    uniques = pd.Series(values.unique())
+    parsed = parse(uniques)
+    return pd.Series(parsed.to_numpy(), index=uniques.to_numpy()).reindex(values.to_numpy()).set_axis(values.index)
+
+
+def _parse_kwh(values):
+    number = values.str.replace(',', '', regex=False).str.extract(r'(\d+(?:\.\d+)?)', expand=False)
+    return pd.to_numeric(number, errors='coerce').astype('float64')
+
+
+def _parse_minutes(values):
+    hours = pd.to_numeric(values.str.extract(r'(\d+)\s*時間', expand=False), errors='coerce')
+    minutes = pd.to_numeric(values.str.extract(r'(\d+)\s*分', expand=False), errors='coerce')
+    total = hours.fillna(0) * 60 + minutes.fillna(0)
+    return total.where(hours.notna() | minutes.notna()).astype('Int64')
+
+
+def _parse_datetime(values):
+    result = pd.to_datetime(
+        values.str.replace(DATE_PART_PATTERN, r'\1-\2-\3', regex=True).str.strip(),
+        format='%Y-%m-%d %H:%M', errors='coerce',
+    ).astype('datetime64[ns]')
+    pending = result.isna() & (values != '')
+    if not pending.any():
+        return result
+    parts = values[pending].str.extract(DATETIME_PATTERN)
+    frame = pd.DataFrame({name: pd.to_numeric(parts[name], errors='coerce') for name in parts.columns})
+    frame[['hour', 'minute']] = frame[['hour', 'minute']].fillna(0)
+    valid = frame[['year', 'month', 'day']].notna().all(axis=1)
+    if valid.any():
+        result[valid[valid].index] = pd.to_datetime(frame[valid], errors='coerce')
+    return result
+
+
+def parse_kwh(values):
+    """「10.5kWh」などの充電量を kWh の数値にする（読み取れない値は NaN）"""
+    return _parse_unique(values, _parse_kwh).astype('float64')
+
+
+def parse_minutes(values):
+    """「15分」「1時間5分」「1時間」などの充電時間を分の整数にする（読み取れない値は欠損）"""
+    return _parse_unique(values, _parse_minutes).astype('Int64')
+
+
+def parse_datetime(values):
+    """「2026年2月7日 0:00」などの利用日時を日時型にする（読み取れない値は NaT）"""
+    return _parse_datetime(values.fillna('').astype(str))
+
+
+def month_of(used_at):
+    """日時を分割用の年月（YYYY-MM）にする（NaT は「不明」）"""
+    months = pd.Series(np.datetime_as_string(used_at.to_numpy().astype('datetime64[M]'), unit='M'),
+                       index=used_at.index)
+    return months.where(used_at.notna(), UNKNOWN_PARTITION)
+
+
+def typed_using_records(df):
+    """充電記録（CSV と同じ列の DataFrame）を型付きの DataFrame に変換する
+
+    充電量は 充電量_kWh（float）、充電時間は 充電時間_分（整数）、利用日時は日時型、
+    充電タイプ・充電結果・混雑状況・車種・認証はカテゴリ型にする。
+    分割用に 都道府県（住所の先頭）と 年月（YYYY-MM）を追加する。
+    """
+    address = df['充電器の住所'].fillna('').astype(str)
+    used_at = parse_datetime(df['利用日時'].fillna(''))
+    typed = pd.DataFrame({
+        '充電器名': df['充電器名'].fillna('').astype(str),
+        '充電器の住所': address,
+        '利用日時': used_at,
+        '充電量_kWh': parse_kwh(df['充電量'].fillna('')),
+        '充電時間_分': parse_minutes(df['充電時間'].fillna('')),
+    })
+    for column in CATEGORY_COLUMNS:
+        typed[column] = df[column].fillna('').astype(str).astype('category')
+    typed['都道府県'] = _parse_unique(address, lambda a: a.map(prefecture_of)).replace('', UNKNOWN_PARTITION)
+    typed['年月'] = month_of(used_at)
+    return typed
+
+
+def export_using_records(df=None, output_dir=PARQUET_DIR, partition=True):
+    """充電記録を Parquet に書き出し、書き出した件数を返す
+
+    df を省略した場合はデータベースの充電記録を書き出す。
+    partition=True の場合は 都道府県=…/年月=… のディレクトリに分割し、
+    書き出す都道府県・年月の既存ファイルは置き換える（それ以外の分割はそのまま残る）。
+    """
+    if pa is None:
+        raise RuntimeError('pyarrow がインストールされていないため Parquet に書き出せません（pip install pyarrow）')
+    if df is None:
+        df = get_storage().read('using_records')
+    typed = typed_using_records(df)
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    os.makedirs(output_dir, exist_ok=True)
+    if partition:
+        pa_dataset.write_dataset(
+            table, output_dir, format='parquet',
+            partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+            existing_data_behavior='delete_matching',
+            basename_template='part-{i}.parquet',
+        )
+    else:
+        pa_dataset.write_dataset(
+            table, output_dir, format='parquet',
+            existing_data_behavior='delete_matching',
+            basename_template='part-{i}.parquet',
+        )
+    return len(typed)
+
+
+def load_using_records(prefecture=None, months=None, input_dir=PARQUET_DIR):
+    """書き出した充電記録を型付きの DataFrame として読み込む
+
+    prefecture（例: '東京都'）・months（例: ['2026-01', '2026-02']）を指定すると、
+    該当する分割のファイルだけを読み込む。
+    """
+    filters = []
+    if prefecture:
+        filters.append(('都道府県', '=', prefecture))
+    if months:
+        filters.append(('年月', 'in', list(months)))
+    return pd.read_parquet(input_dir, engine='pyarrow', filters=filters or None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='充電記録を型付きの Parquet に書き出す')
+    parser.add_argument('--csv', help='データベースの代わりに読み込む充電記録CSV')
+    parser.add_argument('--output', default=PARQUET_DIR, help='書き出し先ディレクトリ')
+    parser.add_argument('--no-partition', action='store_true', help='都道府県・年月で分割しない')
+    args = parser.parse_args()
+
+    if pa is None:
+        print('エラー: pyarrow がインストールされていません（pip install pyarrow）')
+        return 1
+    if args.csv:
+        print('読み込み中:', args.csv)
+        df = pd.read_csv(args.csv, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    else:
+        print('読み込み中:', get_storage().path)
+        df = get_storage().read('using_records')
+    if df.empty:
+        print('充電記録がありません。')
+        return 1
+    count = export_using_records(df, args.output, partition=not args.no_partition)
+    print(f'Parquet: {args.output} に {count}件の充電記録を書き出しました。')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+HTMLパーサーエンジンの切り替え
+環境変数 GOGOEV_PARSER で各スクレイパーが使うパーサーを選択する。
+- html.parser: BeautifulSoup + 標準ライブラリのパーサー（既定）
+- lxml: BeautifulSoup + lxml
+- lexbor: selectolax（lexbor）のCSSセレクタで主要な抽出処理を行う。
+  テキストベースのフォールバック抽出は BeautifulSoup（html.parser）で行う
+"""
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax が未インストールの場合は lexbor エンジンを使わない
+    LexborHTMLParser = None
+
+ENGINES = ('html.parser', 'lxml', 'lexbor')
+PARSER_ENGINE = os.environ.get('GOGOEV_PARSER', 'html.parser')
+
+# BeautifulSoup の get_text() がテキストとして扱わない要素（html.parser / lxml 共通）
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+
+def get_engine():
+    """使用するパーサーエンジン名を返す（lexbor が使えない場合は html.parser）"""
+    engine = PARSER_ENGINE if PARSER_ENGINE in ENGINES else 'html.parser'
+    if engine == 'lexbor' and LexborHTMLParser is None:
+        print("selectolax がインストールされていないため html.parser を使用します")
+        return 'html.parser'
+    return engine
+
+
+def make_soup(content, engine=None):
+    """BeautifulSoup を作成する（lexbor 指定時はフォールバック用に html.parser を使う）"""
+    engine = engine or get_engine()
+    builder = 'lxml' if engine == 'lxml' else 'html.parser'
+    return BeautifulSoup(content, builder)
+
+
+def make_tree(content):
+    """selectolax（lexbor）のツリーを作成する"""
+    return LexborHTMLParser(content)
+
+
+def pagination_soup(tree):
+    """ページネーション判定に使う部分（ナビゲーションと aria-label 付きボタン）だけを BeautifulSoup で解析する
+
+    lexbor エンジンでもページ送りの判定は既存の BeautifulSoup 用の関数をそのまま使う。
+    """
+    fragments = [node.html for node in tree.css('nav[aria-label="Pagination Navigation"], button[aria-label]')]
+    return BeautifulSoup(''.join(fragments), 'html.parser')
+
+
+# 以下は selectolax のノードで BeautifulSoup と同じ結果を得るための補助関数
+
+def node_text(node, separator='', strip=False):
+    """Tag.get_text(separator, strip) と同じ規則でテキストを連結する"""
+    parts = []
+    for child in node.traverse(include_text=True):
+        if child.tag != '-text':
+            continue
+        parent = child.parent
+        if parent is not None and parent.tag in NON_TEXT_TAGS:
+            continue
+        text = child.text_content or ''
+        if strip:
+            text = text.strip()
+            if not text:
+                continue
+        parts.append(text)
+    return separator.join(parts)
+
+
+def node_string(node):
+    """Tag.string と同じく、子要素が1つだけの場合にその文字列を返す（それ以外は None）"""
+    while node is not None:
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if child.tag == '-text':
+            return child.text_content
+        node = child
+    return None
+
+
+def next_element_sibling(node, tag=None):
+    """Tag.find_next_sibling(tag) と同じく、後続の兄弟要素を返す"""
+    sibling = node.next
+    while sibling is not None:
+        if not sibling.tag.startswith('-') and (tag is None or sibling.tag == tag):
+            return sibling
+        sibling = sibling.next
+    return None
+
+
+def find_parent(node, tag):
+    """Tag.find_parent(tag) と同じく、祖先要素を返す"""
+    parent = node.parent
+    while parent is not None:
+        if parent.tag == tag:
+            return parent
+        parent = parent.parent
+    return None
+
+
+def find_first(node, tags):
+    """Tag.find([...]) と同じく、子孫のうち文書順で最初に現れる指定タグの要素を返す"""
+    descendants = node.traverse()
+    next(descendants, None)  # 先頭は node 自身
+    for child in descendants:
+        if child.tag in tags:
+            return child
+    return None
+
+
+def child_elements(node, tag):
+    """find_all(tag, recursive=False) と同じく、直下の指定タグの要素を返す"""
+    return [child for child in node.iter() if child.tag == tag]
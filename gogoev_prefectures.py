@@ -0,0 +1,42 @@
+"""
+都道府県コード（JIS X 0401）
+口コミ・充電記録の一覧は都道府県コードごとの URL（https://ev.gogo.gs/review/13 など）に分かれているため、
+各スクレイパーは取得する都道府県をコードのリストで受け取る。
+"""
+import argparse
+
+PREFECTURE_NAMES = dict(enumerate([
+    '北海道', '青森県', '岩手県', '宮城県', '秋田県', '山形県', '福島県', '茨城県', '栃木県', '群馬県',
+    '埼玉県', '千葉県', '東京都', '神奈川県', '新潟県', '富山県', '石川県', '福井県', '山梨県', '長野県',
+    '岐阜県', '静岡県', '愛知県', '三重県', '滋賀県', '京都府', '大阪府', '兵庫県', '奈良県', '和歌山県',
+    '鳥取県', '島根県', '岡山県', '広島県', '山口県', '徳島県', '香川県', '愛媛県', '高知県', '福岡県',
+    '佐賀県', '長崎県', '熊本県', '大分県', '宮崎県', '鹿児島県', '沖縄県',
+], start=1))
+
+
+def parse_prefecture_codes(text):
+    """「13」「13,14,27」「1-47」「all」を都道府県コードのリストにする（argparse の type に使う）"""
+    if text.strip().lower() == 'all':
+        return list(PREFECTURE_NAMES)
+    codes = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                first, last = (int(value) for value in part.split('-', 1))
+                codes.extend(range(first, last + 1))
+            else:
+                codes.append(int(part))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"都道府県コードが正しくありません: {part}")
+    invalid = [code for code in codes if code not in PREFECTURE_NAMES]
+    if invalid or not codes:
+        raise argparse.ArgumentTypeError(f"都道府県コードは 1～47 で指定してください: {text}")
+    return list(dict.fromkeys(codes))
+
+
+def prefecture_label(code):
+    """進捗表示用の「13 東京都」形式の名前"""
+    return f"{code:02d} {PREFECTURE_NAMES[code]}"
@@ -0,0 +1,160 @@
+"""
+ダッシュボード用 data.json の書き出しと配信
+書き出し時に改行・インデントのない JSON と、その gzip・brotli 圧縮版、内容のハッシュ（SHA-256）を作る。
+APIサーバーはハッシュを ETag として、クライアントの Accept-Encoding に合わせた圧縮版を返し、
+内容が変わっていなければ 304（本文なし）を返す。
+
+書き出すファイル（path が data.json の場合）:
+    data.json          改行・インデントのない JSON
+    data.json.gz       gzip 圧縮版
+    data.json.br       brotli 圧縮版（brotli がインストールされている場合）
+    data.json.sha256   data.json の SHA-256（圧縮版が data.json と同じ内容かの確認にも使う）
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli が未インストールの場合は gzip 版のみ作成する
+    brotli = None
+
+# 圧縮版の拡張子（Content-Encoding → 拡張子）。同じ優先度の場合は前にあるものを優先する
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+HASH_SUFFIX = '.sha256'
+
+
+def _write_atomic(path, data):
+    """一時ファイルに書いてから置き換える（読み込み中のクライアントに書きかけの内容を返さない）"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def publish_json(records, path):
+    """records を JSON として path に書き出し、圧縮版とハッシュも作成する
+
+    圧縮版 → JSON 本体 → ハッシュの順に書くため、ハッシュが JSON 本体と一致していれば
+    圧縮版も同じ内容であることが保証される。書き出したファイルごとのサイズ（バイト）を返す。
+    """
+    body = json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()
+    sizes = {'json': len(body)}
+
+    # mtime=0 にして、内容が同じなら圧縮版も同じバイト列になるようにする
+    compressed = gzip.compress(body, compresslevel=9, mtime=0)
+    _write_atomic(path + ENCODING_SUFFIXES['gzip'], compressed)
+    sizes['gzip'] = len(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=11)
+        _write_atomic(path + ENCODING_SUFFIXES['br'], compressed)
+        sizes['br'] = len(compressed)
+    elif os.path.exists(path + ENCODING_SUFFIXES['br']):
+        os.remove(path + ENCODING_SUFFIXES['br'])  # 古い内容の brotli 版を残さない
+
+    _write_atomic(path, body)
+    _write_atomic(path + HASH_SUFFIX, digest.encode('ascii'))
+    return sizes
+
+
+def parse_accept_encoding(header):
+    """Accept-Encoding を {エンコーディング: q値} にする"""
+    encodings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(header, available):
+    """Accept-Encoding と利用できる圧縮版から返すエンコーディングを選ぶ（圧縮しない場合は None）"""
+    accepted = parse_accept_encoding(header)
+    best = None
+    best_q = 0.0
+    for encoding in ENCODING_SUFFIXES:
+        if encoding not in available:
+            continue
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match が ETag と一致するか（弱い比較、* は常に一致）"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+class PublishedJson:
+    """書き出された JSON（本体・圧縮版・ETag）をメモリに保持し、ファイルが更新されたら読み込み直す"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.etag = None
+        self.variants = {}  # Content-Encoding（非圧縮は None）→ 本文
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """ファイルが更新されていれば読み込み直す。ファイルがない場合は False を返す"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self._load(version)
+        return True
+
+    def _load(self, version):
+        with open(self.path, 'rb') as f:
+            body = f.read()
+        digest = hashlib.sha256(body).hexdigest()
+        variants = {None: body}
+        try:
+            with open(self.path + HASH_SUFFIX, encoding='ascii') as f:
+                published = f.read().strip() == digest
+        except FileNotFoundError:
+            published = False
+        if published:
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                try:
+                    with open(self.path + suffix, 'rb') as f:
+                        variants[encoding] = f.read()
+                except FileNotFoundError:
+                    pass
+        else:
+            # publish_json 以外で書かれたファイル（圧縮版がない・古い）は gzip 版をここで作る
+            variants['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        self.etag = f'"{digest[:32]}"'
+        self.variants = variants
+        self.version = version
+
+    def get(self, accept_encoding=None):
+        """(本文, Content-Encoding, ETag) を返す（Content-Encoding は非圧縮の場合 None）"""
+        with self._lock:
+            variants, etag = self.variants, self.etag
+        encoding = choose_encoding(accept_encoding, variants)
+        return variants[encoding], encoding, etag
@@ -0,0 +1,142 @@
+"""
+ホストごとの適応型レート制限
+トークンバケットでリクエストの送信間隔を制御し、レスポンスに応じて送信レートを自動で調整する（AIMD）。
+- 速いレスポンスが続く間は少しずつ上げる（最大 max_rate まで）
+- 403・429・503（Retry-After があればその時刻まで送信を止める）、5xx・接続エラー、遅いレスポンスでは下げる（最小 min_rate まで）
+- それ以外の 4xx（404 など）はリクエスト側の問題のため、送信レートを変えない
+リトライ時の待機は backoff_delay（指数バックオフ + ジッター）と Retry-After の長い方を使う。
+gogoev_fetch.get_page がすべてのリクエストで使うため、スクレイパー側では待機しない。
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import gogoev_metrics
+
+THROTTLE_STATUS_CODES = (403, 429, 503)  # 送信を控えるよう求めるステータス（403 はアクセス過多による拒否とみなす）
+INCREASE_STEP = 0.05  # 速いレスポンス1件ごとに上げるレート（件/秒）
+DECREASE_FACTOR = 0.5  # 403・429・503・5xx・接続エラーで下げる割合
+SLOW_DECREASE_FACTOR = 0.8  # 遅いレスポンスで下げる割合
+SLOW_LATENCY_SEC = 3.0  # これより遅いレスポンスはサーバーの負荷が高いとみなす
+DECREASE_COOLDOWN_SEC = 2.0  # 下げた後、この秒数は続けて下げない（並列リクエストの失敗をまとめて1回と数える）
+MAX_RETRY_AFTER_SEC = 120.0  # Retry-After に従って待つ最大秒数
+RETRY_BASE_DELAY_SEC = 1.0  # リトライ前の待機の基準秒数（試行ごとに2倍）
+RETRY_MAX_DELAY_SEC = 30.0  # リトライ前の待機の上限秒数
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def parse_retry_after(value):
+    """Retry-After（秒数または HTTP-date）を待機秒数にする（読めない場合は None、上限 MAX_RETRY_AFTER_SEC）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SEC)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY_SEC, cap=RETRY_MAX_DELAY_SEC):
+    """attempt 回目（0始まり）の失敗後に待つ秒数（指数バックオフ、後半をランダムにして同時リトライを分散）"""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class AdaptiveRateLimiter:
+    """1つのホストのトークンバケット（送信レートはレスポンスに応じて min_rate ～ max_rate で調整）"""
+
+    def __init__(self, host, rate, min_rate=None, max_rate=None, burst=1.0):
+        self.host = host
+        self.min_rate = float(min_rate if min_rate is not None else rate / 4)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.rate = min(max(float(rate), self.min_rate), self.max_rate)
+        self.burst = float(burst)  # まとめて送れるリクエスト数（1 なら常に 1/rate 秒間隔）
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0  # Retry-After で指定された送信再開時刻
+        self._decreased_at = -DECREASE_COOLDOWN_SEC
+        self._lock = threading.Lock()
+        gogoev_metrics.RATE_LIMIT_REQUESTS_PER_SEC.set(self.rate, host=host)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """送信できるまで待機し、待機した秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, status, latency, retry_after=None):
+        """レスポンスのステータス・所要時間（秒）から送信レートを調整する"""
+        if status in THROTTLE_STATUS_CODES:
+            self._decrease(DECREASE_FACTOR, 'throttle', retry_after)
+        elif status >= 500:
+            self._decrease(DECREASE_FACTOR, 'error')
+        elif status >= 400:
+            return
+        elif latency > SLOW_LATENCY_SEC:
+            self._decrease(SLOW_DECREASE_FACTOR, 'slow')
+        else:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+            gogoev_metrics.RATE_LIMIT_REQUESTS_PER_SEC.set(self.rate, host=self.host)
+
+    def observe_error(self):
+        """接続エラー・タイムアウトで送信レートを下げる"""
+        self._decrease(DECREASE_FACTOR, 'error')
+
+    def _decrease(self, factor, reason, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            if now - self._decreased_at < DECREASE_COOLDOWN_SEC:
+                return
+            self._decreased_at = now
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._tokens = 0.0  # 下げた直後にたまっていた分をまとめて送らない
+        gogoev_metrics.RATE_LIMIT_REQUESTS_PER_SEC.set(self.rate, host=self.host)
+        gogoev_metrics.RATE_LIMIT_DECREASES.inc(host=self.host, reason=reason)
+        print(f"{self.host} への送信レートを {self.rate:.2f}件/秒 に下げました（{reason}）")
+
+
+def configure(host, rate, min_rate=None, max_rate=None):
+    """ホストのレート制限を設定する（rate は初期値。設定し直すと調整済みのレートは初期値に戻る。None または 0 で解除）"""
+    with _limiters_lock:
+        if rate:
+            _limiters[host] = AdaptiveRateLimiter(host, rate, min_rate, max_rate)
+        elif _limiters.pop(host, None) is not None:
+            gogoev_metrics.RATE_LIMIT_REQUESTS_PER_SEC.remove(host=host)
+
+
+def get_limiter(host):
+    """ホストのレート制限（設定されていない場合は None）"""
+    return _limiters.get(host)
+
+
+# Nominatim は利用規約で 1件/秒 までのため、上げずに既定で制限しておく
+configure('nominatim.openstreetmap.org', 1.0, min_rate=0.25, max_rate=1.0)
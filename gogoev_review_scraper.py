@@ -1,15 +1,26 @@
 """
 GOGOEV 口コミ投稿一覧スクレイピングスクリプト
-東京都の口コミ投稿一覧から情報を抽出してCSVに保存
+都道府県別の口コミ投稿一覧から情報を抽出してCSVに保存（既定は東京都、--prefectures で指定）
 """
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
 import re
 import sys
 import os
+import json
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit
+
+import gogoev_fetch
+import gogoev_metrics
+import gogoev_parser
+from gogoev_checkpoint import Checkpoint
+from gogoev_csv import CsvStreamWriter
+from gogoev_prefectures import parse_prefecture_codes, prefecture_label
+from gogoev_storage import get_storage
 
 # Windows環境での標準出力のエンコーディングをUTF-8に設定
 if sys.platform == 'win32':
@@ -22,35 +33,28 @@ if sys.platform == 'win32':
         pass
 
 # 設定
-REVIEW_BASE_URL = "https://ev.gogo.gs/review/13"  # 東京都の口コミ投稿一覧
+REVIEW_URL_TEMPLATE = "https://ev.gogo.gs/review/{code}"  # 都道府県別の口コミ投稿一覧（code は都道府県コード）
+DEFAULT_PREFECTURES = [13]  # 取得する都道府県コード（既定は東京都）
+PREFECTURE_CONCURRENCY = 8  # 同時に取得する都道府県の数
+HOST_REQUESTS_PER_SEC = 2.0  # ev.gogo.gs へのリクエスト上限の初期値（全都道府県の合計、件/秒、サーバー負荷軽減）
+HOST_MAX_REQUESTS_PER_SEC = 4.0  # 速いレスポンスが続いた場合に上げるリクエスト上限の最大値（件/秒）
 # CSV保存先: プロジェクト直下の DB フォルダ
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "DB")
-PAGE_DELAY_SEC = 1  # ページ間の待機秒数（サーバー負荷軽減）
 MAX_PAGES = None  # 取得する最大ページ数（None=全ページ。確認用は 10 などに変更）
+# 差分取得モード（--incremental）の累積保存先と、取得済みの最新口コミキー（high-water mark）
+CUMULATIVE_FILE = os.path.join(OUTPUT_DIR, "gogoev_reviews.csv")
+STATE_FILE = os.path.join(OUTPUT_DIR, "gogoev_reviews_state.json")
+REVIEW_COLUMNS = ['充電器名', '充電器住所', '口コミ内容', '投稿日時', '投稿者']
+# 通常モードを途中から再開するためのチェックポイント（--resume で使用、正常終了時に削除）
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "gogoev_reviews_checkpoint.jsonl")
+
+_state_lock = threading.Lock()
 
-# User-Agent設定（403エラー回避）
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-}
 
 def get_page(url, max_retries=3):
-    """ページを取得する（リトライ機能付き）"""
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            # エンコーディングを明示的に設定
-            response.encoding = response.apparent_encoding
-            return response
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"リトライ中... ({attempt + 1}/{max_retries})")
-                time.sleep(2)
-            else:
-                print(f"エラー: {url} の取得に失敗しました: {e}")
-                return None
-    return None
+    """ページを取得する（共有接続プール・リトライ機能付き）"""
+    return gogoev_fetch.get_page(url, max_retries=max_retries, detect_encoding=True, raise_on_error=True)
 
 def extract_reviews(soup):
     """口コミ投稿一覧ページから情報を抽出"""
@@ -70,7 +74,10 @@ def extract_reviews(soup):
     if not reviews:
         reviews = extract_reviews_from_text(soup)
     
-    # 重複を除去
+    return dedupe_reviews(reviews)
+
+def dedupe_reviews(reviews):
+    """同一ページ内の重複した口コミを除去"""
     seen = set()
     unique_reviews = []
     for review in reviews:
@@ -151,6 +158,77 @@ def extract_review_from_block(block):
     
     return None
 
+# lexbor エンジン用のセレクタ（BeautifulSoup のクラス判定と同じく class 属性の部分一致）
+REVIEW_BLOCK_SELECTOR = 'div[class*="bg-white"][class*="border"]'
+REVIEW_NAME_TAGS = {'h2', 'h3', 'h4', 'h5'}
+
+def extract_review_from_block_lexbor(block):
+    """HTMLブロックから口コミ情報を抽出（lexbor エンジン用。extract_review_from_block と同じ結果を返す）"""
+    try:
+        text = gogoev_parser.node_text
+        charger_name = ""
+        address = ""
+        review_content = ""
+        post_date = ""
+        post_author = ""
+        
+        # 充電器名を探す（h2, h3, h4, h5タグまたは太字のリンク）
+        name_elem = gogoev_parser.find_first(block, REVIEW_NAME_TAGS) or block.css_first('a[class*="font-bold"]')
+        if name_elem:
+            name_text = text(name_elem, strip=True)
+            if '/' in name_text:
+                charger_name = name_text.split('/')[0].strip()
+            else:
+                charger_name = name_text
+        
+        # 住所を探す（pタグでtext-smクラスを持つ要素）
+        address_elem = block.css_first('p[class*="text-sm"]')
+        if address_elem:
+            address = text(address_elem, strip=True)
+            if not ('都' in address or '県' in address or '府' in address):
+                address = ""
+        
+        # 口コミ内容を探す（区切り線の後のテキスト）
+        hr = block.css_first('hr')
+        if hr:
+            content_elem = gogoev_parser.next_element_sibling(hr)
+            if content_elem:
+                review_content = text(content_elem, separator='\n', strip=True)
+        else:
+            if address_elem:
+                next_elem = gogoev_parser.next_element_sibling(address_elem)
+                if next_elem:
+                    review_content = text(next_elem, separator='\n', strip=True)
+        
+        # 投稿日時を探す（<span class="mr-4">投稿日時</span>の後のテキスト）
+        for span in block.css('span'):
+            span_string = gogoev_parser.node_string(span)
+            if span_string is not None and '投稿日時' in span_string:
+                date_parent = gogoev_parser.find_parent(span, 'p')
+                if date_parent:
+                    date_text = text(date_parent, strip=True)
+                    post_date = re.sub(r'投稿日時\s*', '', date_text).strip()
+                break
+        
+        # 投稿者を探す（<a class="u-id">タグの中のテキスト）
+        author_link = block.css_first('a[class*="u-id"]')
+        if author_link:
+            post_author = text(author_link, strip=True)
+        
+        if charger_name or address or review_content:
+            return {
+                '充電器名': charger_name,
+                '充電器住所': address,
+                '口コミ内容': review_content,
+                '投稿日時': post_date,
+                '投稿者': post_author
+            }
+    
+    except Exception as e:
+        print(f"ブロックからの抽出エラー: {e}")
+    
+    return None
+
 def extract_review_info(element):
     """要素から口コミ情報を抽出"""
     try:
@@ -340,15 +418,22 @@ def get_has_next_page(soup):
 
 
 def scrape_reviews_page(url):
-    """口コミ投稿一覧ページを1ページ分スクレイピング"""
+    """口コミ投稿一覧ページを1ページ分スクレイピング
+
+    取得に失敗した場合は gogoev_fetch.FetchError を送出する（0件のページとは区別し、
+    都道府県をエラーとしてチェックポイントを残す）。
+    """
     print(f"ページを取得中: {url}")
     response = get_page(url)
+    return parse_reviews_page(response.content)
+
+@gogoev_metrics.timed_parse('review', lambda result: len(result[0]))
+def parse_reviews_page(content):
+    """口コミ投稿一覧ページのHTMLを解析。 (reviews, has_next) を返す。"""
+    if gogoev_parser.get_engine() == 'lexbor':
+        return parse_reviews_page_lexbor(content)
     
-    if not response:
-        print("ページの取得に失敗しました")
-        return [], False
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = gogoev_parser.make_soup(content)
     
     # 口コミ情報を抽出
     reviews = extract_reviews(soup)
@@ -360,6 +445,25 @@ def scrape_reviews_page(url):
     has_next = get_has_next_page(soup)
     return reviews, has_next
 
+def parse_reviews_page_lexbor(content):
+    """口コミ投稿一覧ページを lexbor エンジンで解析（テキストベースの抽出が必要な場合のみ BeautifulSoup を使う）"""
+    tree = gogoev_parser.make_tree(content)
+    soup = None
+    
+    reviews = [r for r in map(extract_review_from_block_lexbor, tree.css(REVIEW_BLOCK_SELECTOR)) if r]
+    if not reviews:
+        soup = gogoev_parser.make_soup(content, 'html.parser')
+        reviews = extract_reviews_from_text(soup)
+    reviews = dedupe_reviews(reviews)
+    
+    # 抽出結果が少ない場合、別の方法を試す
+    if len(reviews) < 5:
+        soup = soup or gogoev_parser.make_soup(content, 'html.parser')
+        reviews = extract_reviews_alternative(soup)
+    
+    has_next = get_has_next_page(gogoev_parser.pagination_soup(tree))
+    return reviews, has_next
+
 def extract_reviews_alternative(soup):
     """代替の抽出方法 - より正確なパターンマッチング"""
     reviews = []
@@ -473,72 +577,340 @@ def extract_reviews_alternative(soup):
     
     return reviews
 
-def main():
-    """メイン処理（1ページ目から次のページへ順に取得し、DBフォルダにCSV保存）"""
+def review_key(review):
+    """口コミを一意に識別するキー（充電器名, 住所, 投稿日時, 内容ハッシュ）"""
+    content = review.get('口コミ内容') or ''
+    content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+    return (review.get('充電器名') or '', review.get('充電器住所') or '', review.get('投稿日時') or '', content_hash)
+
+
+def load_known_keys(path):
+    """累積保存先CSVから取得済み口コミのキー集合を読み込む"""
+    if not os.path.exists(path):
+        return set()
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    return {review_key(r) for r in df.to_dict(orient='records')}
+
+
+def load_state(path):
+    """差分取得の状態を読み込む（都道府県コード → {'high_water_mark', 'in_progress', 'updated_at'}）
+
+    都道府県ごとの状態を持たない旧形式のファイルは東京都（13）の状態として読み込む。
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if 'prefectures' in state:
+        return state['prefectures']
+    return {'13': state}
+
+
+def load_high_water_mark(path, code):
+    """前回取得した都道府県の最新口コミのキーを読み込む（なければ None）"""
+    key = load_state(path).get(str(code), {}).get('high_water_mark')
+    return tuple(key) if key else None
+
+
+def is_run_interrupted(path, code):
+    """都道府県の前回の差分取得が途中で終了したか（累積CSVへの追記中に終了した場合は True）"""
+    return bool(load_state(path).get(str(code), {}).get('in_progress'))
+
+
+def save_high_water_mark(path, code, key, in_progress=False):
+    """都道府県の最新口コミのキーを保存する（in_progress=True は累積CSVへの追記中であることを示す）"""
+    # 複数の都道府県を並列に取得するため、読み込みから書き込みまでをロックする
+    with _state_lock:
+        prefectures = load_state(path)
+        prefectures[str(code)] = {
+            'high_water_mark': list(key) if key else None,
+            'in_progress': in_progress,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'prefectures': prefectures}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def review_list_url(code, page):
+    """都道府県の口コミ投稿一覧の URL"""
+    url = REVIEW_URL_TEMPLATE.format(code=code)
+    return url if page == 1 else f"{url}?page={page}"
+
+
+def crawl_prefectures(crawl, prefectures):
+    """都道府県ごとの取得（crawl）を並列に実行し、結果を prefectures の順に返す
+
+    ev.gogo.gs へのリクエストは全都道府県の合計で HOST_REQUESTS_PER_SEC 件/秒から始め、
+    レスポンスに応じて HOST_MAX_REQUESTS_PER_SEC 件/秒まで上げる（403・429・503・エラーでは下げる）。
+    """
+    gogoev_fetch.set_rate_limit(urlsplit(REVIEW_URL_TEMPLATE).hostname, HOST_REQUESTS_PER_SEC, HOST_MAX_REQUESTS_PER_SEC)
+    concurrency = max(1, min(PREFECTURE_CONCURRENCY, len(prefectures)))
+    print(f"対象: {len(prefectures)}都道府県（同時に{concurrency}件、合計 {HOST_REQUESTS_PER_SEC:g}～{HOST_MAX_REQUESTS_PER_SEC:g}件/秒）")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(crawl, prefectures))
+
+
+def print_prefecture_summary(results):
+    """都道府県別の取得結果を表示"""
+    print("\n" + "=" * 50)
+    print("【確認】都道府県別の取得結果")
+    print("=" * 50)
+    for result in results:
+        status = {'ok': 'OK', 'error': 'エラー'}[result['status']]
+        if result['status'] == 'ok' and result['empty_pages']:
+            status = f"要確認(0件のページ: {result['empty_pages']})"
+        print(f"  {prefecture_label(result['code'])}: {result['pages']:4d}ページ {result['count']:6d}件  {status}")
+    print("=" * 50)
+
+
+def incremental_prefecture(code, cumulative):
+    """差分取得モードで1つの都道府県の新着口コミを取得し、累積CSVに追記する
+
+    口コミは新しい順に並んでいるため、前回の最新口コミ（high-water mark）に到達するか、
+    ページ内がすべて取得済みの口コミになった時点でページ送りを終了する。
+    cumulative は全都道府県で共有する累積CSVの書き込み先・取得済みキー・ロック。
+    """
+    label = prefecture_label(code)
+    result = {'code': code, 'pages': 0, 'count': 0, 'empty_pages': [], 'status': 'ok'}
+    high_water_mark = load_high_water_mark(STATE_FILE, code)
+    # 前回が途中で終了した場合、追記済みの新着が先頭に並ぶため「取得済みのみのページ」では終了しない
+    interrupted = is_run_interrupted(STATE_FILE, code)
+    if interrupted:
+        print(f"[{label}] 前回の差分取得が途中で終了しているため、前回の最新口コミまで取得します。")
+    
+    newest_key = None
+    appending = False
+    page = 1
+    try:
+        while True:
+            reviews, has_next = scrape_reviews_page(review_list_url(code, page))
+            result['pages'] = page
+            page_keys = [review_key(r) for r in reviews]
+            if newest_key is None and page_keys:
+                newest_key = page_keys[0]
+            
+            get_storage().upsert_reviews(reviews)
+            with cumulative['lock']:
+                page_new_reviews = []
+                for r, key in zip(reviews, page_keys):
+                    if key not in cumulative['known_keys']:
+                        cumulative['known_keys'].add(key)
+                        page_new_reviews.append(r)
+                if page_new_reviews:
+                    if not appending:
+                        save_high_water_mark(STATE_FILE, code, high_water_mark, in_progress=True)
+                        appending = True
+                    if cumulative['writer'] is None:
+                        cumulative['writer'] = CsvStreamWriter(CUMULATIVE_FILE, REVIEW_COLUMNS)
+                    cumulative['writer'].write_rows(page_new_reviews)
+            page_new = len(page_new_reviews)
+            result['count'] += page_new
+            
+            print(f"  [{label}] ページ{page}: {len(reviews)}件取得（新着: {page_new}件）")
+            
+            if not reviews:
+                print(f"  [{label}] ページ{page}で0件のため終了します。")
+                break
+            if page_new == 0 and not interrupted:
+                print(f"  [{label}] ページ{page}は取得済みの口コミのみのため終了します。")
+                break
+            if high_water_mark is not None and high_water_mark in page_keys:
+                print(f"  [{label}] ページ{page}で前回取得した最新の口コミに到達したため終了します。")
+                break
+            if MAX_PAGES is not None and page >= MAX_PAGES:
+                print(f"  [{label}] {MAX_PAGES}ページ目まで取得しました（確認用で打ち切り）。")
+                break
+            if not has_next:
+                break
+            page += 1
+        
+        if newest_key is not None:
+            save_high_water_mark(STATE_FILE, code, newest_key)
+    except Exception as e:
+        result['status'] = 'error'
+        print(f"[{label}] エラーが発生しました: {e}")
+        import traceback
+        traceback.print_exc()
+    return result
+
+
+def main_incremental(prefectures=DEFAULT_PREFECTURES):
+    """差分取得モード: 新着の口コミだけを取得して累積CSVに追記する
+
+    都道府県ごとに並列に取得し（incremental_prefecture）、新着の口コミはページごとに
+    全都道府県で共有する累積CSVへ追記する。すべての都道府県を取得できた場合は True を返す。
+    """
+    cumulative = {'writer': None, 'known_keys': set(), 'lock': threading.Lock()}
+    metrics_start = gogoev_metrics.snapshot()
     try:
         print("=" * 60)
-        print("GOGOEV 口コミ投稿一覧スクレイピング")
+        print("GOGOEV 口コミ投稿一覧スクレイピング（差分取得）")
         print("=" * 60)
         
-        # 保存先ディレクトリを作成
         os.makedirs(OUTPUT_DIR, exist_ok=True)
-        print(f"保存先: {OUTPUT_DIR}")
-        max_pages = MAX_PAGES
-        if max_pages is not None:
-            print(f"取得ページ数: 1 ～ {max_pages} ページまで（確認用）")
+        cumulative['known_keys'] = load_known_keys(CUMULATIVE_FILE)
+        print(f"累積保存先: {CUMULATIVE_FILE}（取得済み {len(cumulative['known_keys'])}件）")
+        
+        results = crawl_prefectures(lambda code: incremental_prefecture(code, cumulative), prefectures)
+        print_prefecture_summary(results)
+        gogoev_metrics.print_summary(metrics_start)
         
-        all_reviews = []
-        seen_keys = set()
-        page = 1
-        page_counts = []  # ページごとの取得件数（確認用）
+        new_count = sum(result['count'] for result in results)
+        if new_count:
+            print(f"\n新着 {new_count}件を追記しました: {CUMULATIVE_FILE}")
+        else:
+            print("\n新着の口コミはありませんでした。")
+        if any(result['status'] != 'ok' for result in results):
+            print("\n取得に失敗した都道府県があります。次回の差分取得で前回の最新口コミまで取得し直します。")
+            return False
+        return True
         
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+        if cumulative['writer'] is not None:
+            print(f"途中までの新着 {cumulative['writer'].count}件は {cumulative['writer'].path} に追記されています。")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        if cumulative['writer'] is not None:
+            cumulative['writer'].close()
+
+def duplicate_key(review):
+    """通常モードで重複を除くためのキー（充電器名, 住所, 内容の先頭80文字）"""
+    return (review['充電器名'], review['充電器住所'], (review['口コミ内容'] or '')[:80])
+
+def crawl_prefecture(code, timestamp, checkpoint):
+    """1つの都道府県の口コミを1ページ目から順に取得し、都道府県ごとのCSVに追記する
+
+    ページごとの進捗はチェックポイントの 'progress'（キーは都道府県コード）に記録し、
+    記録があれば前回中断したページの次から同じCSVへの追記を再開する。
+    """
+    label = prefecture_label(code)
+    output_file = os.path.join(OUTPUT_DIR, f"gogoev_reviews_{timestamp}_{code:02d}.csv")
+    result = {'code': code, 'output_file': output_file, 'pages': 0, 'count': 0,
+              'empty_pages': [], 'samples': [], 'status': 'ok'}
+    writer = None
+    seen_keys = set()
+    page = 1
+    
+    progress = checkpoint.get('progress', str(code))
+    if progress is not None:
+        result.update(pages=progress['page'], count=progress['total'])
+        if progress['done']:
+            print(f"[{label}] 前回の実行で取得済みです（{progress['total']}件）")
+            return result
+        page = progress['page'] + 1
+        if progress['size'] is not None:
+            writer = CsvStreamWriter(output_file, REVIEW_COLUMNS, resume_size=progress['size'])
+            df = pd.read_csv(output_file, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+            seen_keys = {duplicate_key(r) for r in df.to_dict(orient='records')}
+        print(f"[{label}] ページ{page}から再開します（取得済み: {progress['total']}件）")
+    
+    try:
         while True:
-            if page == 1:
-                url = REVIEW_BASE_URL
-            else:
-                url = f"{REVIEW_BASE_URL}?page={page}"
+            reviews, has_next = scrape_reviews_page(review_list_url(code, page))
+            result['pages'] = page
+            if not reviews:
+                result['empty_pages'].append(page)
             
-            reviews, has_next = scrape_reviews_page(url)
-            page_counts.append((page, len(reviews)))
+            get_storage().upsert_reviews(reviews)
             
-            # 重複を除いて追加
+            # 重複を除いてCSVに追記
+            page_reviews = []
             for r in reviews:
-                key = (r['充電器名'], r['充電器住所'], (r['口コミ内容'] or '')[:80])
+                key = duplicate_key(r)
                 if key not in seen_keys:
                     seen_keys.add(key)
-                    all_reviews.append(r)
-            
-            print(f"  ページ{page}: {len(reviews)}件取得（累計: {len(all_reviews)}件）")
+                    page_reviews.append(r)
+            if page_reviews:
+                if writer is None:
+                    writer = CsvStreamWriter(output_file, REVIEW_COLUMNS)
+                result['count'] += writer.write_rows(page_reviews)
+                result['samples'].extend(page_reviews[:3 - len(result['samples'])])
             
+            done = True
             if not reviews:
-                print(f"  ページ{page}で0件のため終了します。")
-                break
-            if max_pages is not None and page >= max_pages:
-                print(f"  {max_pages}ページ目まで取得しました（確認用で打ち切り）。")
-                break
-            if not has_next:
+                print(f"  [{label}] ページ{page}で0件のため終了します。")
+            elif MAX_PAGES is not None and page >= MAX_PAGES:
+                print(f"  [{label}] {MAX_PAGES}ページ目まで取得しました（確認用で打ち切り）。")
+            else:
+                done = not has_next
+            checkpoint.record('progress', str(code), {
+                'page': page,
+                'output_file': output_file,
+                'size': writer.size() if writer is not None else None,
+                'total': result['count'],
+                'done': done,
+            })
+            
+            print(f"  [{label}] ページ{page}: {len(reviews)}件取得（累計: {result['count']}件）")
+            if done:
                 break
             page += 1
-            time.sleep(PAGE_DELAY_SEC)
-        
-        # 1～10ページの取得結果サマリ（確認用）
-        print("\n" + "=" * 50)
-        print("【確認】ページ別取得件数（1～10ページ）")
-        print("=" * 50)
-        for p, cnt in page_counts:
-            status = "OK" if cnt > 0 else "要確認(0件)"
-            print(f"  ページ{p:3d}: {cnt:3d}件  {status}")
-        print("=" * 50)
-        print(f"\n取得した口コミ数（重複除く）: {len(all_reviews)}件")
-        
-        if all_reviews:
-            df = pd.DataFrame(all_reviews)
-            output_file = os.path.join(OUTPUT_DIR, f"gogoev_reviews_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-            df.to_csv(output_file, index=False, encoding='utf-8-sig')
-            print(f"\nCSVファイルに保存しました: {output_file}")
+    except Exception as e:
+        result['status'] = 'error'
+        print(f"[{label}] エラーが発生しました: {e}")
+        if writer is not None:
+            print(f"[{label}] 途中までの口コミは {writer.path} に保存されています。")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if writer is not None:
+            writer.close()
+    return result
+
+def main(resume=False, prefectures=DEFAULT_PREFECTURES):
+    """メイン処理（都道府県ごとに1ページ目から次のページへ順に取得し、DBフォルダにCSV保存）
+
+    都道府県は並列に取得し（crawl_prefecture）、都道府県ごとのCSV
+    （gogoev_reviews_<実行日時>_<都道府県コード>.csv）にページごとに追記する。
+    resume=True の場合は前回の実行と同じ都道府県・CSVで、中断したページの次から再開する。
+    すべての都道府県を取得できた場合は True を返す（失敗した場合はチェックポイントを残して False）。
+    """
+    checkpoint = None
+    metrics_start = gogoev_metrics.snapshot()
+    try:
+        print("=" * 60)
+        print("GOGOEV 口コミ投稿一覧スクレイピング")
+        print("=" * 60)
+        
+        # 保存先ディレクトリを作成
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        print(f"保存先: {OUTPUT_DIR}")
+        print(f"データベース: {get_storage().path}")
+        if MAX_PAGES is not None:
+            print(f"取得ページ数: 1 ～ {MAX_PAGES} ページまで（確認用）")
+        
+        checkpoint = Checkpoint(CHECKPOINT_FILE, resume=resume)
+        run = checkpoint.get('state', 'run')
+        if run is not None:
+            timestamp = run['timestamp']
+            prefectures = run['prefectures']
+            print(f"前回の実行（{timestamp}）を再開します")
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            prefectures = list(prefectures)
+            checkpoint.record('state', 'run', {'timestamp': timestamp, 'prefectures': prefectures})
+        
+        results = crawl_prefectures(lambda code: crawl_prefecture(code, timestamp, checkpoint), prefectures)
+        print_prefecture_summary(results)
+        gogoev_metrics.print_summary(metrics_start)
+        
+        total_reviews = sum(result['count'] for result in results)
+        print(f"\n取得した口コミ数（重複除く）: {total_reviews}件")
+        
+        if total_reviews:
+            print("\nCSVファイルに保存しました:")
+            for result in results:
+                if result['count']:
+                    print(f"  {result['output_file']}")
             
+            sample_reviews = [review for result in results for review in result['samples']][:3]
             print("\n=== 取得したデータのサンプル（先頭3件） ===")
-            for idx, review in enumerate(all_reviews[:3], 1):
+            for idx, review in enumerate(sample_reviews, 1):
                 print(f"\n【口コミ {idx}】")
                 print(f"充電器名: {review['充電器名']}")
                 print(f"住所: {review['充電器住所']}")
@@ -549,10 +921,33 @@ def main():
         else:
             print("\n口コミデータを取得できませんでした。")
         
+        if all(result['status'] == 'ok' for result in results):
+            checkpoint.complete()
+            return True
+        checkpoint.close()
+        print("\n取得に失敗した都道府県があります。--resume で中断したページの次から再開できます。")
+        return False
+        
     except Exception as e:
         print(f"エラーが発生しました: {e}")
+        if checkpoint is not None:
+            checkpoint.close()
+            print("--resume で中断したページの次から再開できます。")
         import traceback
         traceback.print_exc()
+        return False
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="GOGOEV 口コミ投稿一覧スクレイピング")
+    parser.add_argument('--prefectures', type=parse_prefecture_codes, default=DEFAULT_PREFECTURES,
+                        help='取得する都道府県コード（例: 13、13,14,27、1-47、all。既定は 13＝東京都）')
+    parser.add_argument('--incremental', action='store_true',
+                        help='新着の口コミだけを取得して累積CSV（DB/gogoev_reviews.csv）に追記する')
+    parser.add_argument('--resume', action='store_true',
+                        help='前回中断した取得を、中断したページの次から再開する（通常モード）')
+    args = parser.parse_args()
+    if args.incremental:
+        ok = main_incremental(args.prefectures)
+    else:
+        ok = main(resume=args.resume, prefectures=args.prefectures)
+    sys.exit(0 if ok else 1)
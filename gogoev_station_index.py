@@ -0,0 +1,220 @@
+"""
+充電スポット一覧（data.json）の検索用インデックス
+ev_scraper が出力する data.json を列ごとの配列として保持し、種別・都道府県・キーワード・
+表示範囲（緯度・経度）で絞り込んだ結果をカーソルで分割して返す。
+種別・都道府県はカテゴリの番号、表示範囲は緯度順に並べた配列の二分探索で絞り込むため、
+数十万件でも1回の検索は数ミリ秒で終わる。data.json が更新されると次の検索時に読み込み直す。
+"""
+import base64
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATION_DATA_PATH = os.path.join(SCRIPT_DIR, 'ev-charger-dashboard', 'public', 'data.json')
+
+# キーワード検索の対象列（ダッシュボードの検索と同じ）
+TEXT_COLUMNS = ['施設名', '住所', '都道府県']
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# キーワードの一致がこの割合を超えたら、全体の文字列での検索をやめて行ごとの照合に切り替える
+TEXT_SCAN_MATCH_RATIO = 0.2
+FILTER_CACHE_SIZE = 64  # 絞り込み結果（行番号）を保持する条件の数（カーソルで続きを取得する際に再利用）
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class StaleCursorError(ValueError):
+    """カーソルを発行した後に data.json が更新された"""
+
+
+def _coordinates(records, column):
+    """緯度・経度の列を float の配列にする（空欄・変換できない値は NaN）"""
+    return pd.to_numeric(pd.Series([record.get(column) for record in records], dtype=object),
+                         errors='coerce').to_numpy(dtype='float64')
+
+
+class StationSnapshot:
+    """ある時点の data.json の列ごとの配列（読み込み直す際は丸ごと置き換える）"""
+
+    def __init__(self, records, version):
+        self.records = records
+        self.version = version
+        self.columns = list(dict.fromkeys(key for record in records[:1000] for key in record))
+
+        status = pd.Categorical([record.get('種別') or '' for record in records])
+        prefecture = pd.Categorical([record.get('都道府県') or '' for record in records])
+        self.status_codes = {value: code for code, value in enumerate(status.categories)}
+        self.status = status.codes
+        self.prefecture_codes = {value: code for code, value in enumerate(prefecture.categories)}
+        self.prefecture = prefecture.codes
+        texts = ['\0'.join(str(record.get(column) or '') for column in TEXT_COLUMNS).lower() for record in records]
+        self.text = pd.Series(texts, dtype='string')
+        # 全行のキーワード検索用に、検索対象の列を区切り文字（\0）でつないだ1つの文字列と各行の開始位置
+        self.text_blob = '\0'.join(texts)
+        self.text_starts = np.zeros(len(texts), dtype=np.int64)
+        if texts:
+            np.cumsum([len(text) + 1 for text in texts[:-1]], out=self.text_starts[1:])
+        self.lat = _coordinates(records, '緯度')
+        self.lon = _coordinates(records, '経度')
+        # 表示範囲の検索用に、緯度のある行を緯度順に並べておく
+        located = np.flatnonzero(~np.isnan(self.lat) & ~np.isnan(self.lon))
+        self.lat_order = located[np.argsort(self.lat[located], kind='stable')]
+        self.lat_sorted = self.lat[self.lat_order]
+        self._filter_cache = OrderedDict()
+        self._filter_lock = threading.Lock()
+
+    def in_bbox(self, bbox):
+        """表示範囲 (最小経度, 最小緯度, 最大経度, 最大緯度) に入る行番号（昇順）"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        start = np.searchsorted(self.lat_sorted, min_lat, side='left')
+        end = np.searchsorted(self.lat_sorted, max_lat, side='right')
+        rows = np.sort(self.lat_order[start:end])
+        lon = self.lon[rows]
+        return rows[(lon >= min_lon) & (lon <= max_lon)]
+
+    def search_text(self, q, rows):
+        """rows（昇順の行番号）のうち、検索対象の列のどれかに q を含む行番号を返す
+
+        候補が多い場合は全体の文字列を1回だけ検索して一致位置を行番号に変換し（一致が少ないほど速い）、
+        一致が多すぎる場合や候補が少ない場合は候補の行ごとに照合する。
+        """
+        q = q.lower().replace('\0', '')
+        if not q:
+            return rows
+        if len(rows) * 4 >= len(self.records):
+            limit = int(len(self.records) * TEXT_SCAN_MATCH_RATIO)
+            positions = []
+            for match in re.finditer(re.escape(q), self.text_blob):
+                positions.append(match.start())
+                if len(positions) > limit:
+                    break
+            else:
+                matched = np.unique(np.searchsorted(self.text_starts, positions, side='right') - 1)
+                return matched if len(rows) == len(self.records) else rows[np.isin(rows, matched)]
+        text = self.text if len(rows) == len(self.records) else self.text.take(rows)
+        return rows[text.str.contains(q, regex=False).to_numpy(dtype=bool, na_value=False)]
+
+    def filter(self, status_type=None, prefecture=None, q=None, bbox=None):
+        """条件に一致する行番号（昇順）を返す（同じ条件の結果は再利用する）"""
+        key = (status_type, prefecture, q, tuple(bbox) if bbox else None)
+        with self._filter_lock:
+            if key in self._filter_cache:
+                self._filter_cache.move_to_end(key)
+                return self._filter_cache[key]
+
+        # 絞り込みの効く条件から順に候補の行番号を減らしていく（キーワードは最後に残った行だけを照合）
+        rows = self.in_bbox(bbox) if bbox else np.arange(len(self.records))
+        if status_type:
+            rows = rows[self.status[rows] == self.status_codes.get(status_type, -2)]
+        if prefecture:
+            rows = rows[self.prefecture[rows] == self.prefecture_codes.get(prefecture, -2)]
+        if q:
+            rows = self.search_text(q, rows)
+
+        with self._filter_lock:
+            self._filter_cache[key] = rows
+            while len(self._filter_cache) > FILTER_CACHE_SIZE:
+                self._filter_cache.popitem(last=False)
+        return rows
+
+
+class StationIndex:
+    """data.json の検索用インデックス"""
+
+    def __init__(self, path=STATION_DATA_PATH):
+        self.path = path
+        self._snapshot = StationSnapshot([], None)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def refresh(self):
+        """data.json が更新されていれば読み込み直す（変更がなければ何もしない）"""
+        try:
+            stat = os.stat(self.path)
+            version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        except FileNotFoundError:
+            version = None
+        if version == self.version:
+            return self
+        with self._lock:
+            if version != self.version:
+                self._load(version)
+        return self
+
+    def _load(self, version):
+        records = []
+        if version is not None:
+            with open(self.path, encoding='utf-8') as f:
+                records = json.load(f)
+        # 検索中のリクエストは読み込み前のスナップショットを使い続ける
+        self._snapshot = StationSnapshot(records, version)
+
+    @staticmethod
+    def _encode_cursor(snapshot, row):
+        return base64.urlsafe_b64encode(f'{snapshot.version}:{row}'.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(snapshot, cursor):
+        try:
+            version, row = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().rsplit(':', 1)
+            row = int(row)
+        except ValueError:
+            raise ValueError('カーソルが正しくありません')
+        if version != snapshot.version:
+            raise StaleCursorError('データが更新されたため、カーソルは使用できません。最初から取得し直してください')
+        return row
+
+    def query(self, status_type=None, prefecture=None, q=None, bbox=None,
+              cursor=None, limit=DEFAULT_LIMIT, fields=None):
+        """条件に一致する行を data.json の順に返す
+
+        bbox は (最小経度, 最小緯度, 最大経度, 最大緯度)。fields を指定した場合はその列だけを返す。
+        結果が limit 件を超える場合は next_cursor を返し、cursor に渡すと続きを取得できる。
+        """
+        snapshot = self.refresh()._snapshot
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        if fields:
+            unknown = [field for field in fields if field not in snapshot.columns]
+            if unknown:
+                raise ValueError(f"存在しない列です: {', '.join(unknown)}")
+        start_row = self._decode_cursor(snapshot, cursor) if cursor else 0
+
+        rows = snapshot.filter(status_type, prefecture, q, bbox)
+        total = len(rows)
+        position = np.searchsorted(rows, start_row)
+        page = rows[position:position + limit]
+        next_cursor = None
+        if position + limit < total:
+            next_cursor = self._encode_cursor(snapshot, int(rows[position + limit]))
+
+        records = snapshot.records
+        if fields:
+            items = [{field: records[row].get(field) for field in fields} for row in page]
+        else:
+            items = [records[row] for row in page]
+        return {
+            'items': items,
+            'total': total,
+            'next_cursor': next_cursor,
+            'version': snapshot.version,
+        }
+
+
+def get_station_index():
+    """共有のインデックスを取得する（初回呼び出し時に作成）"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = StationIndex(STATION_DATA_PATH)
+    return _index
@@ -0,0 +1,448 @@
+"""
+スクレイピング結果の保存先（SQLite）
+充電スポット（stations）・故障/メンテナンス情報（outages）・口コミ（reviews）・充電記録（using_records）を
+1つのデータベースに保存する。各テーブルは自然キー（詳細URL、充電器名+住所+投稿日時+内容など）で
+upsert するため、何度取得しても重複しない。分析スクリプトは実行ごとのCSVを探して読み込み、
+重複を除く代わりに、ここから必要な行だけを読み込む。
+故障・メンテナンス情報は実行ごとの差分も変更セットとして保存する。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORAGE_PATH = os.path.join(SCRIPT_DIR, 'DB', 'gogoev.sqlite3')
+
+# テーブル定義
+# columns: (テーブルの列名, CSV・DataFrame の列名) の組。CSV の列名が None の列は内部用
+# key: 自然キー（upsert の一致条件）
+# day: 日付（YYYY-MM-DD）で絞り込むための列
+TABLES = {
+    'stations': {
+        'columns': [
+            ('station_key', None),
+            ('detail_url', '詳細URL'),
+            ('facility_name', '施設名'),
+            ('prefecture', '都道府県'),
+            ('address', '住所'),
+            ('charge_type', '充電タイプ'),
+            ('output', '出力'),
+            ('charger_count', '充電器数'),
+            ('maker', 'メーカー'),
+            ('lat', '緯度'),
+            ('lon', '経度'),
+            ('updated_at', None),
+        ],
+        'key': ['station_key'],
+        'day': None,
+        'indexes': [['prefecture']],
+        # 詳細ページ・位置情報から得る列。空の値（取得できなかった値）では保存済みの値を上書きしない
+        'keep': ['charge_type', 'output', 'charger_count', 'maker', 'lat', 'lon'],
+    },
+    'outages': {
+        'columns': [
+            ('station_key', None),
+            ('status_type', '種別'),
+            ('update_date', '更新日'),
+            ('update_day', None),
+            ('facility_name', '施設名'),
+            ('prefecture', '都道府県'),
+            ('detail_content', '詳細内容'),
+            ('detail_url', '詳細URL'),
+            ('updated_at', None),
+        ],
+        'key': ['station_key', 'status_type', 'update_date'],
+        'day': 'update_day',
+        'indexes': [['station_key'], ['prefecture'], ['update_day']],
+    },
+    'reviews': {
+        'columns': [
+            ('charger_name', '充電器名'),
+            ('address', '充電器住所'),
+            ('content', '口コミ内容'),
+            ('post_date', '投稿日時'),
+            ('author', '投稿者'),
+            ('content_hash', None),
+            ('post_day', None),
+            ('prefecture', None),
+            ('charging_result', '充電結果'),
+            ('updated_at', None),
+        ],
+        'key': ['charger_name', 'address', 'post_date', 'content_hash'],
+        'day': 'post_day',
+        'indexes': [['charger_name', 'address'], ['prefecture'], ['post_day']],
+    },
+    'using_records': {
+        'columns': [
+            ('charger_name', '充電器名'),
+            ('address', '充電器の住所'),
+            ('used_at', '利用日時'),
+            ('charge_type', '充電タイプ'),
+            ('result', '充電結果'),
+            ('congestion', '混雑状況'),
+            ('vehicle', '車種'),
+            ('auth', '認証'),
+            ('amount', '充電量'),
+            ('duration', '充電時間'),
+            ('record_hash', None),
+            ('used_day', None),
+            ('prefecture', None),
+            ('updated_at', None),
+        ],
+        'key': ['charger_name', 'address', 'used_at', 'record_hash'],
+        'day': 'used_day',
+        'indexes': [['charger_name', 'address'], ['prefecture'], ['used_day']],
+    },
+}
+
+# 数値として保存する列
+REAL_COLUMNS = {'lat', 'lon', 'updated_at'}
+
+# 故障・メンテナンス情報の差分（変更セット）
+# station_snapshot: 前回の実行で出力した行（行キー → 行のJSON）。次の実行の差分の基準にする
+# changesets: 実行ごとの変更セット（version は1から増える番号）
+# station_changes: 変更セットに含まれる行ごとの変更（added / updated / resolved）
+CHANGE_TABLES_SQL = [
+    'CREATE TABLE IF NOT EXISTS station_snapshot (row_key TEXT PRIMARY KEY, row_json TEXT)',
+    'CREATE TABLE IF NOT EXISTS changesets (version INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL, '
+    'added INTEGER, updated INTEGER, resolved INTEGER, total INTEGER)',
+    'CREATE TABLE IF NOT EXISTS station_changes (version INTEGER, row_key TEXT, change_type TEXT, '
+    'row_json TEXT, previous_json TEXT)',
+    'CREATE INDEX IF NOT EXISTS idx_station_changes_version ON station_changes (version)',
+]
+CHANGE_ADDED = 'added'        # 新たに掲載された
+CHANGE_UPDATED = 'updated'    # 掲載中の内容（詳細内容・更新日など）が変わった
+CHANGE_RESOLVED = 'resolved'  # 掲載されなくなった（復旧・メンテナンス終了）
+# 更新の判定に使う列（故障・メンテナンスの状況だけを比べ、詳細ページ・ジオコーディングの結果の揺れは更新としない）
+CHANGE_STATUS_COLUMNS = ('更新日', '種別', '詳細内容')
+
+PREFECTURE_PATTERN = re.compile(r'^\s*(北海道|東京都|(?:京都|大阪)府|\S{2,3}?県)')
+DATE_PATTERN = re.compile(r'(\d{4})\s*[年/.\-]\s*(\d{1,2})\s*[月/.\-]\s*(\d{1,2})')
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def prefecture_of(address):
+    """住所の先頭から都道府県名を取り出す（取り出せない場合は空文字）"""
+    match = PREFECTURE_PATTERN.match(address or '')
+    return match.group(1) if match else ''
+
+
+def normalize_day(text):
+    """「2026年1月11日（日） 13時」「2026/01/11 13:00」などを YYYY-MM-DD にする（日付がなければ空文字）"""
+    match = DATE_PATTERN.search(text or '')
+    if not match:
+        return ''
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def content_hash(text):
+    """口コミ内容のハッシュ（差分取得の review_key と同じ形式）"""
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()[:16]
+
+
+def _text(value):
+    """CSV・DataFrame の値を文字列にする（None・NaN は空文字）"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+
+def _number(value):
+    """緯度・経度を数値にする（空欄・変換できない値は None）"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def station_key(row):
+    """充電スポットの自然キー（詳細URL、なければ施設名と住所）"""
+    return _text(row.get('詳細URL')) or f"{_text(row.get('施設名'))}|{_text(row.get('住所'))}"
+
+
+def change_key(row):
+    """差分の行キー（充電スポットの自然キーと種別。同じ施設の故障とメンテナンスは別の行）"""
+    return f"{station_key(row)}|{_text(row.get('種別'))}"
+
+
+def _row_json(row):
+    return json.dumps(row, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _status_of(row_json):
+    row = json.loads(row_json)
+    return tuple(_text(row.get(column)) for column in CHANGE_STATUS_COLUMNS)
+
+
+def diff_snapshot(previous, rows):
+    """前回の行（行キー → 行のJSON）と今回の行から変更のリストを返す
+
+    変更は (行キー, 種類, 今回の行のJSON, 前回の行のJSON) の組で、今回の行の順、掲載されなくなった行の順に並ぶ。
+    同じ行キーの行が複数ある場合（同じ施設の過去の報告）は最初の行（一覧は新しい順のため最新の報告）を使う。
+    更新は CHANGE_STATUS_COLUMNS の列が変わった行だけとする。
+    """
+    current = {}
+    for row in rows:
+        current.setdefault(change_key(row), _row_json(row))
+    changes = []
+    for key, row_json in current.items():
+        previous_json = previous.get(key)
+        if previous_json is None:
+            changes.append((key, CHANGE_ADDED, row_json, None))
+        elif previous_json != row_json and _status_of(previous_json) != _status_of(row_json):
+            changes.append((key, CHANGE_UPDATED, row_json, previous_json))
+    for key, previous_json in previous.items():
+        if key not in current:
+            changes.append((key, CHANGE_RESOLVED, None, previous_json))
+    return current, changes
+
+
+class Storage:
+    """スクレイピング結果の SQLite データベース"""
+
+    def __init__(self, path=STORAGE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # スクレイパー・APIサーバー・分析スクリプトが同じファイルを同時に開けるよう WAL モードにする
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        for table, spec in TABLES.items():
+            columns = ', '.join(
+                f"{name} {'REAL' if name in REAL_COLUMNS else 'TEXT'}" for name, _ in spec['columns']
+            )
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ({columns}, PRIMARY KEY ({', '.join(spec['key'])}))"
+            )
+            for index_columns in spec['indexes']:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index_columns)} "
+                    f"ON {table} ({', '.join(index_columns)})"
+                )
+        for sql in CHANGE_TABLES_SQL:
+            self._conn.execute(sql)
+        self._conn.commit()
+
+    def _upsert(self, table, rows):
+        """自然キーが一致する行は更新し、それ以外は追加する（渡した列だけを更新。keep の列は空の値では更新しない）"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        key = TABLES[table]['key']
+        keep = TABLES[table].get('keep', [])
+        updates = ', '.join(
+            f"{c} = COALESCE(NULLIF(excluded.{c}, ''), {c})" if c in keep else f"{c} = excluded.{c}"
+            for c in columns if c not in key
+        )
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+        )
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(sql, [tuple(row[c] for c in columns) for row in rows])
+        return len(rows)
+
+    def upsert_stations(self, rows):
+        """ev_scraper の出力行（施設名・住所・詳細URL・緯度・経度など）から充電スポットを保存"""
+        now = time.time()
+        return self._upsert('stations', ({
+            'station_key': station_key(row),
+            'detail_url': _text(row.get('詳細URL')),
+            'facility_name': _text(row.get('施設名')),
+            'prefecture': _text(row.get('都道府県')),
+            'address': _text(row.get('住所')),
+            'charge_type': _text(row.get('充電タイプ')),
+            'output': _text(row.get('出力')),
+            'charger_count': _text(row.get('充電器数')),
+            'maker': _text(row.get('メーカー')),
+            'lat': _number(row.get('緯度')),
+            'lon': _number(row.get('経度')),
+            'updated_at': now,
+        } for row in rows))
+
+    def upsert_outages(self, rows):
+        """ev_scraper の出力行から故障・メンテナンス情報を保存"""
+        now = time.time()
+        return self._upsert('outages', ({
+            'station_key': station_key(row),
+            'status_type': _text(row.get('種別')),
+            'update_date': _text(row.get('更新日')),
+            'update_day': normalize_day(_text(row.get('更新日'))),
+            'facility_name': _text(row.get('施設名')),
+            'prefecture': _text(row.get('都道府県')),
+            'detail_content': _text(row.get('詳細内容')),
+            'detail_url': _text(row.get('詳細URL')),
+            'updated_at': now,
+        } for row in rows))
+
+    def upsert_reviews(self, reviews):
+        """口コミを保存（充電結果の分類は上書きしない）"""
+        now = time.time()
+        return self._upsert('reviews', ({
+            'charger_name': _text(r.get('充電器名')),
+            'address': _text(r.get('充電器住所')),
+            'content': _text(r.get('口コミ内容')),
+            'post_date': _text(r.get('投稿日時')),
+            'author': _text(r.get('投稿者')),
+            'content_hash': content_hash(_text(r.get('口コミ内容'))),
+            'post_day': normalize_day(_text(r.get('投稿日時'))),
+            'prefecture': prefecture_of(_text(r.get('充電器住所'))),
+            'updated_at': now,
+        } for r in reviews))
+
+    def upsert_using_records(self, records):
+        """充電記録を保存（同じ充電器・利用日時・内容の記録は1件にまとめる）"""
+        now = time.time()
+        fields = [(name, label) for name, label in TABLES['using_records']['columns'] if label]
+        rows = []
+        for record in records:
+            row = {name: _text(record.get(label)) for name, label in fields}
+            row['record_hash'] = hashlib.sha1(
+                '\x1f'.join(row[name] for name, _ in fields).encode('utf-8')
+            ).hexdigest()[:16]
+            row['used_day'] = normalize_day(row['used_at'])
+            row['prefecture'] = prefecture_of(row['address'])
+            row['updated_at'] = now
+            rows.append(row)
+        return self._upsert('using_records', rows)
+
+    def set_charging_results(self, reviews):
+        """口コミの「充電結果」の分類を保存（reviews は 充電器名・充電器住所・投稿日時・口コミ内容・充電結果 を持つ DataFrame）"""
+        params = [
+            (_text(r['充電結果']), _text(r['充電器名']), _text(r['充電器住所']), _text(r['投稿日時']),
+             content_hash(_text(r['口コミ内容'])))
+            for r in reviews.to_dict(orient='records')
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'UPDATE reviews SET charging_result = ? '
+                    'WHERE charger_name = ? AND address = ? AND post_date = ? AND content_hash = ?',
+                    params,
+                )
+        return len(params)
+
+    def record_station_changes(self, rows):
+        """ev_scraper の出力行を前回の出力と比べ、差分を変更セットとして保存する
+
+        変更がない場合は変更セットを作らない。(最新の version, {種類: 件数}) を返す。
+        """
+        with self._lock:
+            with self._conn:
+                previous = dict(self._conn.execute('SELECT row_key, row_json FROM station_snapshot'))
+                current, changes = diff_snapshot(previous, rows)
+                counts = {kind: sum(1 for _, k, _, _ in changes if k == kind)
+                          for kind in (CHANGE_ADDED, CHANGE_UPDATED, CHANGE_RESOLVED)}
+                if changes:
+                    version = self._conn.execute(
+                        'INSERT INTO changesets (created_at, added, updated, resolved, total) VALUES (?, ?, ?, ?, ?)',
+                        (time.time(), counts[CHANGE_ADDED], counts[CHANGE_UPDATED], counts[CHANGE_RESOLVED],
+                         len(current)),
+                    ).lastrowid
+                    self._conn.executemany(
+                        'INSERT INTO station_changes (version, row_key, change_type, row_json, previous_json) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        [(version, key, kind, row_json, previous_json)
+                         for key, kind, row_json, previous_json in changes],
+                    )
+                    self._conn.execute('DELETE FROM station_snapshot')
+                    self._conn.executemany(
+                        'INSERT INTO station_snapshot (row_key, row_json) VALUES (?, ?)',
+                        list(current.items()),
+                    )
+                version = self._conn.execute('SELECT COALESCE(MAX(version), 0) FROM changesets').fetchone()[0]
+        return version, counts
+
+    def read_station_changes(self, since=0, limit=100):
+        """version が since より大きい変更セットを古い順に最大 limit 件返す
+
+        各変更セットは {'version', 'created_at', 'added', 'updated', 'resolved', 'total', 'changes'} で、
+        changes は {'type', 'key', 'row', 'previous'}（row は今回の行、previous は前回の行。ない場合は None）。
+        """
+        with self._lock:
+            changesets = self._conn.execute(
+                'SELECT version, created_at, added, updated, resolved, total FROM changesets '
+                'WHERE version > ? ORDER BY version LIMIT ?', (since, limit)
+            ).fetchall()
+            changes = []
+            if changesets:
+                changes = self._conn.execute(
+                    'SELECT version, row_key, change_type, row_json, previous_json FROM station_changes '
+                    'WHERE version > ? AND version <= ? ORDER BY version, rowid', (since, changesets[-1][0])
+                ).fetchall()
+        result = []
+        by_version = {}
+        for version, created_at, added, updated, resolved, total in changesets:
+            changeset = {'version': version, 'created_at': created_at, 'added': added, 'updated': updated,
+                         'resolved': resolved, 'total': total, 'changes': []}
+            by_version[version] = changeset
+            result.append(changeset)
+        for version, key, kind, row_json, previous_json in changes:
+            by_version[version]['changes'].append({
+                'type': kind,
+                'key': key,
+                'row': json.loads(row_json) if row_json else None,
+                'previous': json.loads(previous_json) if previous_json else None,
+            })
+        return result
+
+    def latest_change_version(self):
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(version), 0) FROM changesets').fetchone()[0]
+
+    def read(self, table, prefecture=None, since=None, until=None):
+        """テーブルを DataFrame として読み込む（列名は CSV と同じ日本語名、内部用の列は除く）
+
+        prefecture で都道府県、since / until（YYYY-MM-DD）で日付の範囲を絞り込む。
+        """
+        spec = TABLES[table]
+        labeled = [(name, label) for name, label in spec['columns'] if label]
+        conditions = []
+        params = []
+        if prefecture:
+            conditions.append('prefecture = ?')
+            params.append(prefecture)
+        if since and spec['day']:
+            conditions.append(f"{spec['day']} >= ?")
+            params.append(since)
+        if until and spec['day']:
+            conditions.append(f"{spec['day']} <= ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(name for name, _ in labeled)} FROM {table}"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if spec['day']:
+            sql += f" ORDER BY {spec['day']}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=[label for _, label in labeled])
+
+    def count(self, table):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_storage():
+    """共有のデータベースを取得する（初回呼び出し時に作成）"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = Storage(STORAGE_PATH)
+    return _storage
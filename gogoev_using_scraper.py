@@ -1,16 +1,30 @@
 """
 GOGOEV 充電記録一覧スクレイピングスクリプト
-東京都の充電記録一覧から情報を抽出してCSVに保存
+都道府県別の充電記録一覧から情報を抽出してCSVに保存（既定は東京都、--prefectures で指定）
 https://ev.gogo.gs/using/13
+
+ページの取得（非同期I/O）と解析（プロセスプール）を別の段階に分け、間を上限付きのキューでつなぐ。
+取得はスレッドで並行に行い、解析は CPU コア数のプロセスに分散するため、
+BeautifulSoup の解析やテキストベースのフォールバック抽出が取得を止めない。
 """
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import re
 import sys
 import os
-import time
+import argparse
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit
+
+import gogoev_fetch
+import gogoev_metrics
+import gogoev_parser
+from gogoev_checkpoint import Checkpoint
+from gogoev_csv import CsvStreamWriter
+from gogoev_prefectures import parse_prefecture_codes, prefecture_label
+from gogoev_storage import get_storage
+import gogoev_parquet
 
 # Windows環境での標準出力のエンコーディングをUTF-8に設定
 if sys.platform == 'win32':
@@ -23,15 +37,27 @@ if sys.platform == 'win32':
         pass
 
 # 設定
-USING_BASE_URL = "https://ev.gogo.gs/using/13"  # 東京都の充電記録一覧
+USING_URL_TEMPLATE = "https://ev.gogo.gs/using/{code}"  # 都道府県別の充電記録一覧（code は都道府県コード）
+DEFAULT_PREFECTURES = [13]  # 取得する都道府県コード（既定は東京都）
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "DB")
-PAGE_DELAY_SEC = 1   # ページ間の待機秒数（サーバー負荷軽減）
+PREFECTURE_CONCURRENCY = 8  # 同時に取得する都道府県の数
+HOST_REQUESTS_PER_SEC = 2.0  # ev.gogo.gs へのリクエスト上限の初期値（全都道府県の合計、件/秒、サーバー負荷軽減）
+HOST_MAX_REQUESTS_PER_SEC = 4.0  # 速いレスポンスが続いた場合に上げるリクエスト上限の最大値（件/秒）
+PARSE_WORKERS = None  # ページを解析するプロセス数（None=CPUコア数）
+# 解析プロセスの起動方法。fork は取得スレッドが持っているロック（標準出力・requests/urllib3 など）を
+# ロックされたまま複製し、解析プロセスがデッドロックすることがあるため使わない
+PARSE_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+PAGE_QUEUE_SIZE = 16  # 解析待ちのページ数の上限（超えると取得を待機する）
+# 都道府県ごとに、書き出し済みのページから何ページ先まで取得してよいか
+# （この範囲のページは同時に取得する。2 なら解析中に次の1ページを先に取得する。
+# 最後のページの次も PREFETCH_PAGES - 1 回余分に取得することがある）
+PREFETCH_PAGES = 2
 MAX_PAGES = None     # 取得する最大ページ数（None=全ページ）
+EXPORT_PARQUET = True  # 取得後にデータベースの充電記録を型付き Parquet（DB/parquet/using_records）に書き出す
+# 途中から再開するためのチェックポイント（--resume で使用、正常終了時に削除）
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "gogoev_using_checkpoint.jsonl")
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-}
 
 # CSVカラム（指定の順序）
 CSV_COLUMNS = [
@@ -49,15 +75,8 @@ CSV_COLUMNS = [
 
 
 def get_page(url):
-    """ページを取得する"""
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        response.encoding = response.apparent_encoding
-        return response
-    except requests.exceptions.RequestException as e:
-        print(f"エラー: {url} の取得に失敗しました: {e}")
-        return None
+    """ページを取得する（共有接続プール・リトライ機能付き）"""
+    return gogoev_fetch.get_page(url, detect_encoding=True, raise_on_error=True)
 
 
 def extract_records_from_blocks(soup):
@@ -106,33 +125,83 @@ def extract_one_record(block):
                     value = cells[1].get_text(strip=True)
                     row_map[label] = value
 
-        # ラベル名のゆらぎに対応（スペースや全角含む）
-        def get_val(*keys):
-            for k in keys:
-                if k in row_map:
-                    return row_map[k]
-                # キーに含まれるもの
-                for mk, v in row_map.items():
-                    if k in mk or mk in k:
-                        return v
-            return ""
-
-        record = {
-            '充電器名': charger_name,
-            '充電器の住所': address,
-            '利用日時': get_val('利用日時'),
-            '充電タイプ': get_val('充電タイプ'),
-            '充電結果': get_val('充電結果'),
-            '混雑状況': get_val('混雑状況'),
-            '車種': get_val('車種'),
-            '認証': get_val('認証'),
-            '充電量': get_val('充電量'),
-            '充電時間': get_val('充電時間'),
-        }
-
-        # 充電器名か住所が取れていれば有効レコードとする
-        if record['充電器名'] or record['充電器の住所']:
-            return record
+        return build_record(charger_name, address, row_map)
+
+    except Exception as e:
+        print(f"ブロック解析エラー: {e}")
+
+    return None
+
+
+def build_record(charger_name, address, row_map):
+    """充電器名・住所・表の項目からレコードを作成（充電器名も住所もなければ None）"""
+    # ラベル名のゆらぎに対応（スペースや全角含む）
+    def get_val(*keys):
+        for k in keys:
+            if k in row_map:
+                return row_map[k]
+            # キーに含まれるもの
+            for mk, v in row_map.items():
+                if k in mk or mk in k:
+                    return v
+        return ""
+
+    record = {
+        '充電器名': charger_name,
+        '充電器の住所': address,
+        '利用日時': get_val('利用日時'),
+        '充電タイプ': get_val('充電タイプ'),
+        '充電結果': get_val('充電結果'),
+        '混雑状況': get_val('混雑状況'),
+        '車種': get_val('車種'),
+        '認証': get_val('認証'),
+        '充電量': get_val('充電量'),
+        '充電時間': get_val('充電時間'),
+    }
+
+    # 充電器名か住所が取れていれば有効レコードとする
+    if record['充電器名'] or record['充電器の住所']:
+        return record
+    return None
+
+
+# lexbor エンジン用のセレクタ（BeautifulSoup のクラス判定と同じく class 属性の部分一致）
+RECORD_BLOCK_SELECTOR = 'div[class*="bg-white"][class*="border"]'
+
+
+def extract_one_record_lexbor(block):
+    """1ブロックから充電器名・住所・表の項目を抽出（lexbor エンジン用。extract_one_record と同じ結果を返す）"""
+    try:
+        text = gogoev_parser.node_text
+        charger_name = ""
+        address = ""
+
+        # 充電器名: 詳細ページへのリンクテキスト（「名前 / 運営」形式）
+        link = block.css_first('a[href*="/detail/"]')
+        if link:
+            charger_name = text(link, strip=True)
+
+        # 住所: 都道府県を含む p または次のテキスト
+        for p in block.css('p[class*="text-sm"]'):
+            t = text(p, strip=True)
+            if t and (('都' in t or '県' in t or '府' in t) and re.search(r'\d', t)):
+                address = t
+                break
+        if not address and link:
+            next_el = gogoev_parser.next_element_sibling(link)
+            if next_el:
+                address = text(next_el, strip=True)
+
+        # 表の行からキー・値を取得
+        row_map = {}
+        table = block.css_first('table')
+        if table:
+            for tr in table.css('tr'):
+                cells = [c for c in tr.traverse() if c.tag in ('th', 'td')]
+                if len(cells) >= 2:
+                    row_map[text(cells[0], strip=True)] = text(cells[1], strip=True)
+
+        return build_record(charger_name, address, row_map)
 
     except Exception as e:
         print(f"ブロック解析エラー: {e}")
@@ -229,14 +298,12 @@ def get_has_next_page(soup):
     return False
 
 
-def scrape_using_page(url):
-    """充電記録一覧ページを1ページ分スクレイピング。 (records, soup) を返す。"""
-    print(f"ページを取得中: {url}")
-    response = get_page(url)
-    if not response:
-        return [], None
+def parse_using_page(content):
+    """充電記録一覧ページのHTMLを解析。 (records, soup) を返す。"""
+    if gogoev_parser.get_engine() == 'lexbor':
+        return parse_using_page_lexbor(content)
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = gogoev_parser.make_soup(content)
     records = extract_records_from_blocks(soup)
 
     if not records:
@@ -245,8 +312,253 @@ def scrape_using_page(url):
     return records, soup
 
 
-def main():
-    """最初の MAX_PAGES ページを取得してCSV保存"""
+def parse_using_page_lexbor(content):
+    """充電記録一覧ページを lexbor エンジンで解析。 (records, ページネーション判定用のsoup) を返す。"""
+    tree = gogoev_parser.make_tree(content)
+    records = [r for r in map(extract_one_record_lexbor, tree.css(RECORD_BLOCK_SELECTOR)) if r]
+
+    if not records:
+        # テキストベースのフォールバック抽出は BeautifulSoup で行う
+        soup = gogoev_parser.make_soup(content, 'html.parser')
+        return extract_records_from_text(soup), soup
+
+    return records, gogoev_parser.pagination_soup(tree)
+
+
+def fetch_using_content(url):
+    """充電記録一覧ページを取得して本文を返す
+
+    取得できなかった場合は gogoev_fetch.FetchError を送出する（0件のページとは区別し、
+    都道府県をエラーとしてチェックポイントを残す）。
+    """
+    print(f"ページを取得中: {url}")
+    return get_page(url).content
+
+
+def parse_using_content(content):
+    """取得した本文を解析して (records, 次のページがあるか) を返す（解析用プロセスで実行する）"""
+    records, soup = parse_using_page(content)
+    return records, bool(soup) and get_has_next_page(soup)
+
+
+def using_list_url(code, page):
+    """都道府県の充電記録一覧の URL"""
+    url = USING_URL_TEMPLATE.format(code=code)
+    return url if page == 1 else f"{url}?page={page}"
+
+
+class PrefectureCrawl:
+    """1つの都道府県の取得状況
+
+    解析の終わった順に届くページを、ページ順に並べ直してCSV・データベース・チェックポイントに書き出す。
+    書き出しはイベントループを止めないよう別スレッドで行い、都道府県ごとに1ページずつ順に行う。
+    ページごとの進捗はチェックポイントの 'progress'（キーは都道府県コード）に記録し、
+    記録があれば前回中断したページの次から同じCSVへの追記を再開する。
+    """
+
+    def __init__(self, code, timestamp, checkpoint):
+        self.code = code
+        self.label = prefecture_label(code)
+        self.output_file = os.path.join(OUTPUT_DIR, f"gogoev_using_{timestamp}_{code:02d}.csv")
+        self.checkpoint = checkpoint
+        self.writer = None
+        self.next_page = 1  # 次に書き出すページ
+        self.pending = {}  # 前のページの書き出しを待っているページ → (records, has_next) または例外
+        self.total = 0
+        self.samples = []  # 確認用に表示する先頭3件
+        self.finished = False
+        self.error = None
+        self.changed = asyncio.Condition()  # 書き出しが進んだ（または終了した）ことを取得側に知らせる
+        self._write_lock = asyncio.Lock()  # ページの書き出しを1つずつ行う
+
+        progress = checkpoint.get('progress', str(code))
+        if progress is not None:
+            self.total = progress['total']
+            self.next_page = progress['page'] + 1
+            if progress['done']:
+                self.finished = True
+                print(f"[{self.label}] 前回の実行で取得済みです（{self.total}件）")
+                return
+            if progress['size'] is not None:
+                self.writer = CsvStreamWriter(self.output_file, CSV_COLUMNS, resume_size=progress['size'])
+            print(f"[{self.label}] ページ{self.next_page}から再開します（取得済み: {self.total}件）")
+
+    @property
+    def pages(self):
+        return self.next_page - 1
+
+    async def deliver(self, page, records, has_next):
+        """解析したページを受け取り、前のページまで書き出し済みなら順に書き出す"""
+        await self._receive(page, (records, has_next))
+
+    async def fail(self, page, error):
+        """取得・解析に失敗したページを受け取る（前のページまでは書き出し、それ以降は取得しない）"""
+        await self._receive(page, error)
+
+    async def _receive(self, page, result):
+        async with self._write_lock:
+            if self.finished or page < self.next_page:
+                return
+            self.pending[page] = result
+            while not self.finished and self.next_page in self.pending:
+                result = self.pending.pop(self.next_page)
+                if isinstance(result, Exception):
+                    self._fail_page(self.next_page, result)
+                    break
+                self.finished = await asyncio.to_thread(self._write_page, self.next_page, *result)
+                self.next_page += 1
+        async with self.changed:
+            self.changed.notify_all()
+
+    def _write_page(self, page, records, has_next):
+        """1ページをデータベース・CSV・チェックポイントに書き出す（別スレッドで実行、最後のページなら True を返す）"""
+        get_storage().upsert_using_records(records)
+        if records:
+            if self.writer is None:
+                self.writer = CsvStreamWriter(self.output_file, CSV_COLUMNS)
+            self.total += self.writer.write_rows(records)
+            self.samples.extend(records[:3 - len(self.samples)])
+
+        finished = True
+        if not records:
+            reason = f"ページ{page}で0件のため終了します。"
+        elif not has_next:
+            reason = "次のページがありません。"
+        elif MAX_PAGES is not None and page >= MAX_PAGES:
+            reason = f"{MAX_PAGES}ページ目まで取得しました。"
+        else:
+            reason = None
+            finished = False
+        self.checkpoint.record('progress', str(self.code), {
+            'page': page,
+            'output_file': self.output_file,
+            'size': self.writer.size() if self.writer is not None else None,
+            'total': self.total,
+            'done': finished,
+        })
+
+        print(f"  [{self.label}] ページ{page}: {len(records)}件取得（累計: {self.total}件）")
+        if reason:
+            print(f"  [{self.label}] {reason}")
+        return finished
+
+    def _fail_page(self, page, error):
+        self.finished = True
+        self.error = error
+        print(f"[{self.label}] ページ{page}でエラーが発生しました: {error}")
+        if self.writer is not None:
+            print(f"[{self.label}] 途中までのレコードは {self.writer.path} に保存されています。")
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def fetch_page(crawl, page, page_queue):
+    """1ページを取得して解析待ちのキューに入れる（キューが一杯の間は待機する）"""
+    try:
+        content = await asyncio.to_thread(fetch_using_content, using_list_url(crawl.code, page))
+    except Exception as e:
+        await crawl.fail(page, e)
+        return
+    await page_queue.put((crawl, page, content))
+
+
+async def fetch_stage(crawl, page_queue, semaphore):
+    """都道府県のページを取得して解析待ちのキューに入れる（取得段階）
+
+    書き出し済みのページから PREFETCH_PAGES 先までのページを同時に取得する。それより先は
+    取得しないため、最後のページが確定した後に余分なページを取得し続けることはない。
+    """
+    async with semaphore:
+        page = crawl.next_page
+        fetches = set()
+        while True:
+            async with crawl.changed:
+                await crawl.changed.wait_for(
+                    lambda: crawl.finished or page < crawl.next_page + PREFETCH_PAGES)
+            if crawl.finished or (MAX_PAGES is not None and page > MAX_PAGES):
+                break
+            fetches.add(asyncio.create_task(fetch_page(crawl, page, page_queue)))
+            page += 1
+        await asyncio.gather(*fetches)
+
+
+async def parse_stage(page_queue, pool):
+    """キューのページをプロセスプールで解析し、都道府県ごとに書き出す（解析段階）"""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await page_queue.get()
+        if item is None:
+            break
+        crawl, page, content = item
+        if not crawl.finished:
+            try:
+                # 解析は別プロセスで行うため、所要時間（プロセス間の受け渡しを含む）と抽出件数はこちらで記録する
+                with gogoev_metrics.PARSE_SECONDS.time(page='using'):
+                    records, has_next = await loop.run_in_executor(pool, parse_using_content, content)
+                gogoev_metrics.RECORDS_EXTRACTED.inc(len(records), page='using')
+                await crawl.deliver(page, records, has_next)
+            except Exception as e:
+                await crawl.fail(page, e)
+
+
+def parse_context():
+    """解析プロセスを起動する multiprocessing のコンテキスト"""
+    context = multiprocessing.get_context(PARSE_START_METHOD)
+    if PARSE_START_METHOD == 'forkserver':
+        # 解析に使うモジュールを読み込み済みのサーバープロセスから起動し、プロセスごとの読み込みを省く
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+async def run_pipeline(crawls):
+    """全都道府県の取得段階と解析段階を実行する
+
+    ev.gogo.gs へのリクエストは全都道府県の合計で HOST_REQUESTS_PER_SEC 件/秒から始め、
+    レスポンスに応じて HOST_MAX_REQUESTS_PER_SEC 件/秒まで上げる（403・429・503・エラーでは下げる）。
+    """
+    gogoev_fetch.set_rate_limit(urlsplit(USING_URL_TEMPLATE).hostname, HOST_REQUESTS_PER_SEC, HOST_MAX_REQUESTS_PER_SEC)
+    workers = PARSE_WORKERS or os.cpu_count() or 1
+    concurrency = max(1, min(PREFECTURE_CONCURRENCY, len(crawls)))
+    print(f"対象: {len(crawls)}都道府県（同時に{concurrency}件、合計 {HOST_REQUESTS_PER_SEC:g}～{HOST_MAX_REQUESTS_PER_SEC:g}件/秒、"
+          f"解析 {workers}プロセス）")
+    page_queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+    semaphore = asyncio.Semaphore(concurrency)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=parse_context()) as pool:
+        parsers = [asyncio.create_task(parse_stage(page_queue, pool)) for _ in range(workers)]
+        try:
+            await asyncio.gather(*(fetch_stage(crawl, page_queue, semaphore) for crawl in crawls))
+            for _ in parsers:
+                await page_queue.put(None)
+            await asyncio.gather(*parsers)
+        finally:
+            for task in parsers:
+                task.cancel()
+
+
+def print_prefecture_summary(crawls):
+    """都道府県別の取得結果を表示"""
+    print("\n" + "=" * 50)
+    print("【確認】都道府県別の取得結果")
+    print("=" * 50)
+    for crawl in crawls:
+        status = 'エラー' if crawl.error is not None else 'OK'
+        print(f"  {crawl.label}: {crawl.pages:4d}ページ {crawl.total:6d}件  {status}")
+    print("=" * 50)
+
+
+def main(resume=False, prefectures=DEFAULT_PREFECTURES):
+    """都道府県ごとに最初の MAX_PAGES ページを取得してCSV保存
+
+    ページの取得と解析は run_pipeline で並行に行い、都道府県ごとのCSV
+    （gogoev_using_<実行日時>_<都道府県コード>.csv）にページ順に追記する。
+    resume=True の場合は前回の実行と同じ都道府県・CSVで、中断したページの次から再開する。
+    すべての都道府県を取得できた場合は True を返す（失敗した場合はチェックポイントを残して False）。
+    """
+    crawls = []
+    checkpoint = None
+    metrics_start = gogoev_metrics.snapshot()
     try:
         print("=" * 60)
         print("GOGOEV 充電記録一覧スクレイピング" + (f"（先頭 {MAX_PAGES} ページ）" if MAX_PAGES else "（全ページ）"))
@@ -254,49 +566,40 @@ def main():
 
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         print(f"保存先: {OUTPUT_DIR}")
+        print(f"データベース: {get_storage().path}")
         if MAX_PAGES is not None:
             print(f"取得ページ: 1 ～ {MAX_PAGES} ページ\n")
         else:
             print("取得ページ: 全ページ\n")
 
-        all_records = []
-        page = 1
-
-        while True:
-            if page == 1:
-                url = USING_BASE_URL
-            else:
-                url = f"{USING_BASE_URL}?page={page}"
-
-            records, soup = scrape_using_page(url)
-            all_records.extend(records)
-
-            print(f"  ページ{page}: {len(records)}件取得（累計: {len(all_records)}件）")
-
-            if not records:
-                print(f"  ページ{page}で0件のため終了します。")
-                break
-            if soup and not get_has_next_page(soup):
-                print("  次のページがありません。")
-                break
-            if MAX_PAGES is not None and page >= MAX_PAGES:
-                print(f"  {MAX_PAGES}ページ目まで取得しました。")
-                break
+        checkpoint = Checkpoint(CHECKPOINT_FILE, resume=resume)
+        run = checkpoint.get('state', 'run')
+        if run is not None:
+            timestamp = run['timestamp']
+            prefectures = run['prefectures']
+            print(f"前回の実行（{timestamp}）を再開します")
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            prefectures = list(prefectures)
+            checkpoint.record('state', 'run', {'timestamp': timestamp, 'prefectures': prefectures})
 
-            page += 1
-            time.sleep(PAGE_DELAY_SEC)
+        crawls = [PrefectureCrawl(code, timestamp, checkpoint) for code in prefectures]
+        asyncio.run(run_pipeline(crawls))
+        print_prefecture_summary(crawls)
+        gogoev_metrics.print_summary(metrics_start)
 
-        print("\n" + "=" * 50)
-        print(f"合計取得件数: {len(all_records)} 件")
+        total_records = sum(crawl.total for crawl in crawls)
+        print(f"合計取得件数: {total_records} 件")
 
-        if all_records:
-            df = pd.DataFrame(all_records, columns=CSV_COLUMNS)
-            output_file = os.path.join(OUTPUT_DIR, f"gogoev_using_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-            df.to_csv(output_file, index=False, encoding='utf-8-sig')
-            print(f"\nCSVに保存しました: {output_file}")
+        if total_records:
+            print("\nCSVに保存しました:")
+            for crawl in crawls:
+                if crawl.total:
+                    print(f"  {crawl.output_file}")
 
+            sample_records = [rec for crawl in crawls for rec in crawl.samples][:3]
             print("\n=== 取得データのサンプル（先頭3件） ===")
-            for idx, rec in enumerate(all_records[:3], 1):
+            for idx, rec in enumerate(sample_records, 1):
                 print(f"\n【{idx}】 {(rec.get('充電器名') or '')[:40]}...")
                 print(f"  住所: {rec.get('充電器の住所', '')}")
                 print(f"  利用日時: {rec.get('利用日時', '')} | 充電タイプ: {rec.get('充電タイプ', '')} | 充電結果: {rec.get('充電結果', '')}")
@@ -305,11 +608,38 @@ def main():
         else:
             print("データを取得できませんでした。")
 
+        if EXPORT_PARQUET and total_records:
+            if gogoev_parquet.pa is None:
+                print("\npyarrow がインストールされていないため Parquet への書き出しを省略します。")
+            else:
+                count = gogoev_parquet.export_using_records()
+                print(f"\nParquet: {gogoev_parquet.PARQUET_DIR} に {count}件の充電記録を書き出しました。")
+
+        if all(crawl.error is None for crawl in crawls):
+            checkpoint.complete()
+            return True
+        checkpoint.close()
+        print("\n取得に失敗した都道府県があります。--resume で中断したページの次から再開できます。")
+        return False
+
     except Exception as e:
         print(f"エラー: {e}")
+        if checkpoint is not None:
+            checkpoint.close()
+            print("--resume で中断したページの次から再開できます。")
         import traceback
         traceback.print_exc()
+        return False
+    finally:
+        for crawl in crawls:
+            crawl.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="GOGOEV 充電記録一覧スクレイピング")
+    parser.add_argument('--prefectures', type=parse_prefecture_codes, default=DEFAULT_PREFECTURES,
+                        help='取得する都道府県コード（例: 13、13,14,27、1-47、all。既定は 13＝東京都）')
+    parser.add_argument('--resume', action='store_true',
+                        help='前回中断した取得を、中断したページの次から再開する')
+    args = parser.parse_args()
+    sys.exit(0 if main(resume=args.resume, prefectures=args.prefectures) else 1)